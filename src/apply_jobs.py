@@ -1,11 +1,40 @@
 import argparse
+import sys
 from core.job_applicator import JobApplicator
+from core.batch_runner import BatchRunner, read_job_queue
+from core.worker_pool import create_workers
 from utils.logger import logger
 
+def run_batch(runner, batch):
+    """Run a batch runner over a queue file, or stdin when batch is '-'."""
+    if batch == '-':
+        summary = runner.run(read_job_queue(sys.stdin))
+    else:
+        with open(batch, 'r', encoding='utf-8') as queue:
+            summary = runner.run(read_job_queue(queue))
+    if summary['failed']:
+        logger.error(f"{summary['failed']} application(s) failed!")
+
 def main():
     parser = argparse.ArgumentParser(description='Automate job applications')
-    parser.add_argument('--url', type=str, required=True, help='URL of the job posting')
-    parser.add_argument('--model', type=str, help='Path to trained model')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', type=str, help='URL of the job posting')
+    target.add_argument('--batch', type=str,
+                        help="Queue of job postings (one URL or JSON object per line, '-' for stdin)")
+    parser.add_argument('--report', type=str, help='Append per-job results to this JSONL file (batch mode)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Parallel workers, one per browser window or display (batch mode)')
+    parser.add_argument('--displays', type=str,
+                        help="Comma separated X displays, one per worker (e.g. ':1,:2,:3')")
+    parser.add_argument('--model', type=str,
+                        help='Path to trained model (.pt, .onnx, .torchscript or .export.json manifest)')
+    parser.add_argument('--backend', type=str, default='auto', choices=['auto', 'torch', 'torchscript', 'onnx'],
+                        help="Detector inference backend ('auto' uses the fastest exported variant if any)")
+    parser.add_argument('--quantize', action='store_true', help='Use int8 dynamic quantization (ONNX backend)')
+    parser.add_argument('--capture', type=str, default='auto', choices=['auto', 'mss', 'pyautogui'],
+                        help='Screen capture backend')
+    parser.add_argument('--settle-timeout', type=float, default=3.0,
+                        help='Max seconds to wait for the page to settle after each action')
     parser.add_argument('--name', type=str, help='Your full name')
     parser.add_argument('--email', type=str, help='Your email address')
     parser.add_argument('--phone', type=str, help='Your phone number')
@@ -16,12 +45,9 @@ def main():
     parser.add_argument('--experience', type=str, help='Your work experience')
     parser.add_argument('--education', type=str, help='Your education')
     parser.add_argument('--skills', type=str, help='Your skills')
-    
+
     args = parser.parse_args()
-    
-    # Initialize job applicator
-    applicator = JobApplicator(model_path=args.model)
-    
+
     # Set application data
     application_data = {
         'name': args.name,
@@ -35,16 +61,48 @@ def main():
         'education': args.education,
         'skills': args.skills
     }
-    
+
     # Remove empty values
     application_data = {k: v for k, v in application_data.items() if v}
-    
-    if not application_data:
+
+    # In batch mode every job may carry its own application data
+    if not application_data and not args.batch:
         logger.error("No application data provided!")
         return
-    
+
+    if args.batch and args.workers > 1:
+        displays = args.displays.split(',') if args.displays else None
+        applicators, shared_detector = create_workers(
+            args.workers,
+            model_path=args.model,
+            displays=displays,
+            detector_backend=args.backend,
+            quantize=args.quantize,
+            capture=args.capture,
+            settle_timeout=args.settle_timeout
+        )
+        for applicator in applicators:
+            applicator.set_application_data(application_data)
+        try:
+            run_batch(BatchRunner(applicators, report_path=args.report), args.batch)
+        finally:
+            shared_detector.close()
+        return
+
+    # Initialize job applicator (model is loaded once and reused for every job)
+    applicator = JobApplicator(
+        model_path=args.model,
+        settle_timeout=args.settle_timeout,
+        detector_backend=args.backend,
+        quantize=args.quantize,
+        capture=args.capture
+    )
     applicator.set_application_data(application_data)
-    
+
+    if args.batch:
+        run_batch(BatchRunner(applicator, report_path=args.report), args.batch)
+        return
+
     # Apply to the job
     logger.info(f"Applying to job at {args.url}")
     if applicator.apply_to_job(args.url):
@@ -53,4 +111,4 @@ def main():
         logger.error("Application process failed!")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,172 @@
+"""
+Batch runner that applies to a queue of job postings with one warm applicator.
+"""
+
+import json
+import threading
+import time
+from ..utils.logger import logger
+
+
+def read_job_queue(stream):
+    """
+    Read job entries from a queue file or stdin.
+
+    Each non-empty line is either a plain URL or a JSON object of the form
+    {"url": ..., "application_data": {...}} where application_data holds
+    per-job overrides. Lines starting with '#' are ignored.
+
+    Args:
+        stream: Iterable of text lines (open file or sys.stdin)
+
+    Yields:
+        dict: Job entry with 'url', 'application_data' and 'line' keys
+    """
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+
+        if not line.startswith('{'):
+            yield {'url': line, 'application_data': {}, 'line': line_no}
+            continue
+
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError as e:
+            logger.error(f"Skipping queue line {line_no}: invalid JSON ({str(e)})")
+            continue
+
+        url = entry.get('url')
+        if not url:
+            logger.error(f"Skipping queue line {line_no}: missing 'url'")
+            continue
+
+        overrides = entry.get('application_data') or {}
+        if not isinstance(overrides, dict):
+            logger.error(f"Skipping queue line {line_no}: 'application_data' must be an object")
+            continue
+
+        yield {'url': url, 'application_data': overrides, 'line': line_no}
+
+
+class BatchRunner:
+    def __init__(self, applicator, report_path=None):
+        """
+        Initialize the batch runner.
+
+        Args:
+            applicator: JobApplicator reused for every job in the queue, or a
+                list of applicators (one per browser window) run as parallel workers
+            report_path: Optional JSONL file receiving one result per job
+        """
+        self.applicators = list(applicator) if isinstance(applicator, (list, tuple)) else [applicator]
+        self.report_path = report_path
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _next_job(self, jobs):
+        """Take the next job from the shared queue, or None when done."""
+        with self._lock:
+            if self._stop.is_set():
+                return None
+            return next(jobs, None)
+
+    def _record(self, job, success, elapsed, worker_id, report):
+        """Count, log and report the outcome of one job."""
+        with self._lock:
+            if success:
+                self._succeeded += 1
+            else:
+                self._failed += 1
+            count = self._succeeded + self._failed
+            prefix = f"[{count}]" if len(self.applicators) == 1 else f"[{count}|w{worker_id}]"
+            if success:
+                logger.info(f"{prefix} OK {job['url']} ({elapsed:.1f}s)")
+            else:
+                logger.error(f"{prefix} FAILED {job['url']} ({elapsed:.1f}s)")
+
+            if report:
+                report.write(json.dumps({
+                    'url': job['url'],
+                    'line': job['line'],
+                    'worker': worker_id,
+                    'success': success,
+                    'elapsed': round(elapsed, 3)
+                }) + '\n')
+                report.flush()
+
+    def _work(self, worker_id, applicator, jobs, report):
+        """Apply to jobs from the shared queue until it is empty."""
+        while True:
+            job = self._next_job(jobs)
+            if job is None:
+                return
+            job_start = time.perf_counter()
+            success = applicator.apply_to_job(job['url'], job['application_data'])
+            self._record(job, success, time.perf_counter() - job_start, worker_id, report)
+
+    def run(self, jobs):
+        """
+        Apply to every job in the queue and report outcome and throughput.
+
+        Args:
+            jobs: Iterable of job entries as produced by read_job_queue
+
+        Returns:
+            dict: Summary with job counts, elapsed time and throughput
+        """
+        jobs = iter(jobs)
+        report = open(self.report_path, 'a', encoding='utf-8') if self.report_path else None
+        self._succeeded = 0
+        self._failed = 0
+        self._stop.clear()
+        workers = []
+        start = time.perf_counter()
+
+        try:
+            if len(self.applicators) == 1:
+                self._work(1, self.applicators[0], jobs, report)
+            else:
+                workers = [
+                    threading.Thread(target=self._work, args=(i + 1, applicator, jobs, report),
+                                     name=f'applicator-{i + 1}', daemon=True)
+                    for i, applicator in enumerate(self.applicators)
+                ]
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    while worker.is_alive():
+                        worker.join(timeout=0.5)
+        except KeyboardInterrupt:
+            logger.warning("Batch interrupted by user, stopping after current job(s).")
+            self._stop.set()
+            for worker in workers:
+                worker.join()
+        finally:
+            if report:
+                report.close()
+
+        total_elapsed = time.perf_counter() - start
+        succeeded, failed = self._succeeded, self._failed
+        total = succeeded + failed
+        summary = {
+            'total': total,
+            'succeeded': succeeded,
+            'failed': failed,
+            'workers': len(self.applicators),
+            'elapsed': total_elapsed,
+            'applications_per_hour': total / total_elapsed * 3600 if total_elapsed > 0 else 0.0
+        }
+
+        logger.info(
+            f"Batch finished: {succeeded}/{total} succeeded in {total_elapsed:.1f}s with "
+            f"{len(self.applicators)} worker(s) ({summary['applications_per_hour']:.1f} applications/hour)"
+        )
+        for applicator in self.applicators:
+            lookup = applicator.window_manager.get_lookup_stats()
+            logger.info(
+                f"Window lookups: {lookup['hits']} cached ({lookup['avg_hit_ms']:.2f}ms avg), "
+                f"{lookup['misses']} enumerated ({lookup['avg_miss_ms']:.2f}ms avg)"
+            )
+        return summary
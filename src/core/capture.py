@@ -0,0 +1,145 @@
+"""
+Screen capture backends returning NumPy frames.
+
+Frames are HxWx3 RGB or HxWx4 BGRA uint8 arrays (the native layout of
+screen grabs); consumers such as the detector accept both, so the fast
+backends can hand out views of the grab buffer without any conversion.
+"""
+
+import os
+import numpy as np
+from PIL import Image
+
+
+class CaptureBackend:
+    name = None
+
+    def grab(self, region):
+        """
+        Capture a screen region.
+
+        Args:
+            region: (left, top, width, height) in screen coordinates
+
+        Returns:
+            numpy.ndarray: HxWx3 RGB or HxWx4 BGRA uint8 frame
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the backend."""
+
+
+class PyAutoGuiCapture(CaptureBackend):
+    """Portable fallback using pyautogui (PIL ImageGrab / scrot)."""
+
+    name = 'pyautogui'
+
+    def __init__(self):
+        import pyautogui
+
+        self._pyautogui = pyautogui
+
+    def grab(self, region):
+        return np.asarray(self._pyautogui.screenshot(region=tuple(region)))
+
+
+class MssCapture(CaptureBackend):
+    """Fast path using mss (XGetImage/XShm on Linux, BitBlt on Windows)."""
+
+    name = 'mss'
+
+    def __init__(self, display=None):
+        """
+        Args:
+            display: Optional X11 display (e.g. ':1') to capture from
+        """
+        import mss
+
+        self._sct = mss.mss(display=display) if display else mss.mss()
+
+    def screen_region(self):
+        """(left, top, width, height) of the primary monitor."""
+        monitor = self._sct.monitors[1]
+        return (monitor['left'], monitor['top'], monitor['width'], monitor['height'])
+
+    def grab(self, region):
+        left, top, width, height = region
+        shot = self._sct.grab({'left': left, 'top': top, 'width': width, 'height': height})
+        # View of the BGRA grab buffer, no copy
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+    def close(self):
+        self._sct.close()
+
+
+class ReplayCapture(CaptureBackend):
+    """Serves recorded screenshots from disk, for tests and offline runs."""
+
+    name = 'replay'
+
+    def __init__(self, source, loop=True):
+        """
+        Args:
+            source: Image file, directory of images or list of image paths
+            loop: Start over after the last frame instead of staying on it
+        """
+        if isinstance(source, (list, tuple)):
+            paths = list(source)
+        elif os.path.isdir(source):
+            paths = sorted(
+                os.path.join(source, f) for f in os.listdir(source)
+                if f.endswith(('.png', '.jpg', '.jpeg'))
+            )
+        else:
+            paths = [source]
+
+        if not paths:
+            raise ValueError(f"No replay frames found in {source}")
+
+        self.paths = paths
+        self.loop = loop
+        self.index = 0
+        self._frames = {}
+
+    def advance(self):
+        """Move on to the next recorded frame."""
+        if self.index + 1 < len(self.paths):
+            self.index += 1
+        elif self.loop:
+            self.index = 0
+
+    def grab(self, region):
+        if self.index not in self._frames:
+            self._frames[self.index] = np.asarray(Image.open(self.paths[self.index]).convert('RGB'))
+        frame = self._frames[self.index]
+        _, _, width, height = region
+        return frame[:height, :width]
+
+
+CAPTURE_BACKENDS = {
+    PyAutoGuiCapture.name: PyAutoGuiCapture,
+    MssCapture.name: MssCapture
+}
+
+
+def create_capture_backend(name='auto', **kwargs):
+    """
+    Create a capture backend by name.
+
+    Args:
+        name: 'mss', 'pyautogui' or 'auto' (mss when installed)
+        **kwargs: Backend specific options (e.g. display for mss)
+
+    Returns:
+        CaptureBackend: Capture backend
+    """
+    if name == 'auto':
+        try:
+            return MssCapture(**kwargs)
+        except ImportError:
+            return PyAutoGuiCapture()
+
+    if name not in CAPTURE_BACKENDS:
+        raise ValueError(f"Unknown capture backend '{name}', expected one of {sorted(CAPTURE_BACKENDS)}")
+    return CAPTURE_BACKENDS[name](**kwargs)
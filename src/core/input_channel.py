@@ -0,0 +1,136 @@
+"""
+Mouse and keyboard input channels used by JobApplicator.
+"""
+
+import os
+import subprocess
+import threading
+from contextlib import contextmanager
+
+
+class InputChannel:
+    """
+    Sends mouse and keyboard events to one browser window.
+
+    Key names follow pyautogui ('enter', 'backspace', 'ctrl', ...).
+    """
+
+    def click(self, x, y):
+        raise NotImplementedError
+
+    def hotkey(self, *keys):
+        raise NotImplementedError
+
+    def press(self, key):
+        raise NotImplementedError
+
+    def write(self, text):
+        raise NotImplementedError
+
+    @contextmanager
+    def session(self):
+        """Group actions that must reach the window without interleaving."""
+        yield self
+
+
+class PyAutoGuiInput(InputChannel):
+    """
+    Drives the single global mouse/keyboard of the current desktop.
+
+    All instances share one lock, so several workers on the same desktop
+    take turns: each session brings its own window to the front first.
+    """
+
+    _lock = threading.RLock()
+
+    def __init__(self, focus=None):
+        """
+        Args:
+            focus: Optional callable bringing this channel's window to the front
+        """
+        import pyautogui
+
+        self._pyautogui = pyautogui
+        self.focus = focus
+
+    @contextmanager
+    def session(self):
+        with self._lock:
+            if self.focus is not None:
+                self.focus()
+            yield self
+
+    def click(self, x, y):
+        with self.session():
+            self._pyautogui.click(x, y)
+
+    def hotkey(self, *keys):
+        with self.session():
+            self._pyautogui.hotkey(*keys)
+
+    def press(self, key):
+        with self.session():
+            self._pyautogui.press(key)
+
+    def write(self, text):
+        with self.session():
+            self._pyautogui.write(text)
+
+
+# pyautogui key names that differ from X11 keysyms
+XDOTOOL_KEYS = {
+    'enter': 'Return',
+    'return': 'Return',
+    'backspace': 'BackSpace',
+    'tab': 'Tab',
+    'esc': 'Escape',
+    'escape': 'Escape',
+    'space': 'space',
+    'up': 'Up',
+    'down': 'Down',
+    'left': 'Left',
+    'right': 'Right',
+    'pageup': 'Prior',
+    'pagedown': 'Next'
+}
+
+
+class XdotoolInput(InputChannel):
+    """
+    Sends input to a separate X display (e.g. an Xvfb instance) via xdotool.
+
+    Every display has its own pointer and keyboard focus, so channels on
+    different displays never interfere and need no shared lock.
+    """
+
+    def __init__(self, display):
+        """
+        Args:
+            display: X display name such as ':1'
+        """
+        self.display = display
+        self._env = dict(os.environ, DISPLAY=display)
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def session(self):
+        with self._lock:
+            yield self
+
+    def _run(self, *args):
+        subprocess.run(['xdotool', *args], env=self._env, check=True)
+
+    def _keysym(self, key):
+        return XDOTOOL_KEYS.get(key.lower(), key)
+
+    def click(self, x, y):
+        self._run('mousemove', str(int(x)), str(int(y)), 'click', '1')
+
+    def hotkey(self, *keys):
+        self._run('key', '+'.join(self._keysym(k) for k in keys))
+
+    def press(self, key):
+        self._run('key', self._keysym(key))
+
+    def write(self, text):
+        self._run('type', '--delay', '0', '--', text)
@@ -1,15 +1,60 @@
-import time
-import pyautogui
 from ..utils.logger import logger
 from .window_manager import WindowManager
+from .input_channel import PyAutoGuiInput
+from .readiness import ReadinessWaiter
+from .page_state import PageDetections
+from ..utils.image_hash import dhash
 from ..ml.models.form_detector import FormElementDetector
 
+# Inputs that map directly to one application data field
+INPUT_FIELD_KEYS = {
+    'email_input': 'email',
+    'phone_input': 'phone'
+}
+
+# Generic text inputs are filled in reading order with these fields
+TEXT_FIELD_ORDER = ('name', 'address', 'city', 'state', 'zip', 'experience', 'education', 'skills')
+
 class JobApplicator:
-    def __init__(self, model_path=None):
-        self.window_manager = WindowManager()
-        self.model = FormElementDetector()
-        if model_path:
-            self.model.load_model(model_path)
+    def __init__(self, model_path=None, settle_timeout=3.0, page_load_timeout=10.0,
+                 page_hash_size=16, page_hash_tolerance=6, confidence_threshold=None,
+                 detector_backend='auto', quantize=False, capture='auto',
+                 window_manager=None, detector=None, input_channel=None):
+        """
+        Initialize the job applicator.
+
+        Args:
+            model_path: Optional path to trained detector weights
+            settle_timeout: Upper bound in seconds to wait for the UI to settle after an action
+            page_load_timeout: Upper bound in seconds to wait for navigation and submission
+            page_hash_size: Grid size of the perceptual hash identifying a page
+            page_hash_tolerance: Max differing hash bits for a capture to count as the same page
+            confidence_threshold: Optional extra minimum score for a detected box to be
+                acted on; by default only the detector's per-class conf_thres apply
+            detector_backend: Inference backend ('torch', 'torchscript', 'onnx' or 'auto')
+            quantize: Run the detector with int8 dynamic quantization (ONNX only)
+            capture: Screen capture backend ('auto', 'mss', 'pyautogui') or instance
+            window_manager: Optional WindowManager for this applicator's browser window
+            detector: Optional already loaded (possibly shared) detector; model_path,
+                detector_backend and quantize are ignored when given
+            input_channel: Optional InputChannel (defaults to the global pyautogui input)
+        """
+        self.window_manager = window_manager or WindowManager(capture=capture)
+        self.input = input_channel or PyAutoGuiInput(focus=self.window_manager.bring_to_front)
+        # Cached detections carry screen coordinates, so a moved window invalidates them
+        self.window_manager.add_geometry_listener(lambda old, new: self.invalidate_page())
+        self.readiness = ReadinessWaiter(self.session_thumbnail, timeout=settle_timeout)
+        self.page_load_timeout = page_load_timeout
+        self.page_hash_size = page_hash_size
+        self.page_hash_tolerance = page_hash_tolerance
+        self.confidence_threshold = confidence_threshold
+        self._page = None
+        if detector is not None:
+            self.model = detector
+        else:
+            self.model = FormElementDetector(backend=detector_backend, quantize=quantize)
+            if model_path:
+                self.model.load_model(model_path)
         self.model.eval()
         
         # Default application data
@@ -31,55 +76,109 @@ class JobApplicator:
         self.application_data.update(data)
 
     def detect_form_elements(self, screenshot):
-        """Detect form elements in the current view."""
-        predictions = self.model.predict(screenshot)
+        """
+        Detect form elements in the current view.
+
+        Args:
+            screenshot: Capture of the browser window
+
+        Returns:
+            Detections: Boxes in screen coordinates
+        """
+        predictions = self.model.predict(screenshot, offset=self.window_manager.get_window_position())
         return predictions
 
-    def fill_text_field(self, field_type, value):
-        """Fill a text input field with the appropriate value."""
-        # Click the field
-        pyautogui.click()
-        time.sleep(0.5)
-        
-        # Clear existing text
-        pyautogui.hotkey('ctrl', 'a')
-        pyautogui.press('backspace')
-        
-        # Type the value
-        pyautogui.write(value)
-        time.sleep(0.5)
-
-    def select_dropdown(self, option):
-        """Select an option from a dropdown menu."""
-        pyautogui.click()
-        time.sleep(0.5)
-        pyautogui.write(option)
-        pyautogui.press('enter')
-        time.sleep(0.5)
-
-    def check_checkbox(self):
-        """Check a checkbox."""
-        pyautogui.click()
-        time.sleep(0.5)
+    def session_thumbnail(self):
+        """
+        Thumbnail for readiness polls, grabbed inside an input session.
+
+        On a shared desktop the session brings this window to the front, so
+        reference frames and polls never read another worker's window.
+        """
+        with self.input.session():
+            return self.window_manager.take_thumbnail()
+
+    def invalidate_page(self):
+        """Drop cached detections, e.g. after navigating or submitting."""
+        self._page = None
+
+    def current_page(self):
+        """
+        Get detections for the page currently shown.
+
+        A cheap thumbnail hash is compared against the cached page; the full
+        screenshot and model inference only run when the page has changed.
+
+        Both grabs run inside an input session: on a shared desktop that brings
+        this window to the front and keeps other workers from raising theirs,
+        so an overlapping window is never captured in place of ours.
+
+        Returns:
+            PageDetections: Detections for the current page
+        """
+        with self.input.session():
+            page_hash = dhash(self.window_manager.take_thumbnail(), self.page_hash_size)
+            if self._page is not None and self._page.matches(page_hash, self.page_hash_tolerance):
+                logger.debug("Page unchanged, reusing cached detections")
+                return self._page
+
+            screenshot = self.window_manager.take_screenshot(as_array=True)
+        self._page = PageDetections(page_hash, screenshot, self.detect_form_elements(screenshot))
+        return self._page
+
+    def fill_text_field(self, box, value):
+        """Fill a detected text input field with the appropriate value."""
+        with self.input.session():
+            # Click the field
+            self.input.click(*box.center)
+            
+            # Clear existing text
+            self.input.hotkey('ctrl', 'a')
+            self.input.press('backspace')
+            
+            # Type the value
+            self.input.write(value)
+        self.readiness.wait_until_settled()
+
+    def select_dropdown(self, box, option):
+        """Select an option from a detected dropdown menu."""
+        self.input.click(*box.center)
+        self.readiness.wait_until_settled()
+        with self.input.session():
+            self.input.write(option)
+            self.input.press('enter')
+        self.readiness.wait_until_settled()
+
+    def check_checkbox(self, box):
+        """Check a detected checkbox."""
+        self.input.click(*box.center)
+        self.readiness.wait_until_settled()
+
+    def confident(self, predictions):
+        """Detections passing confidence_threshold (all of them when it is None)."""
+        if self.confidence_threshold is None:
+            return predictions
+        return predictions.filter(self.confidence_threshold)
 
     def submit_application(self):
         """Submit the job application."""
-        # Look for submit button
-        screenshot = self.window_manager.take_screenshot()
-        predictions = self.detect_form_elements(screenshot)
+        # Look for submit button (reuses the detections of the filled page)
+        predictions = self.current_page().predictions
+        submit_button = self.confident(predictions).best('submit_button')
         
-        if predictions['submit_button'] > 0.5:
-            pyautogui.click()
-            time.sleep(2)  # Wait for submission
+        if submit_button is not None:
+            before = self.readiness.frame()
+            self.input.click(*submit_button.center)
+            self.readiness.wait_for_change(before, timeout=self.page_load_timeout)  # Wait for submission
+            self.invalidate_page()
             
             # Check for success message
-            screenshot = self.window_manager.take_screenshot()
-            predictions = self.detect_form_elements(screenshot)
+            predictions = self.confident(self.current_page().predictions)
             
-            if predictions['success_message'] > 0.5:
+            if predictions.best('success_message') is not None:
                 logger.info("Application submitted successfully!")
                 return True
-            elif predictions['error_message'] > 0.5:
+            elif predictions.best('error_message') is not None:
                 logger.error("Error submitting application. Please check the form.")
                 return False
         
@@ -87,36 +186,56 @@ class JobApplicator:
 
     def process_application_page(self):
         """Process the current application page."""
-        screenshot = self.window_manager.take_screenshot()
-        predictions = self.detect_form_elements(screenshot)
+        predictions = self.current_page().predictions
+        boxes = self.confident(predictions).sorted_by_position()
+        text_values = iter([self.application_data[k] for k in TEXT_FIELD_ORDER if self.application_data.get(k)])
         
-        # Process each detected element
-        for element_type, confidence in predictions.items():
-            if confidence > 0.5:  # Confidence threshold
-                if element_type in ['text_input', 'email_input', 'phone_input']:
-                    value = self.application_data.get(element_type.split('_')[0], '')
-                    if value:
-                        self.fill_text_field(element_type, value)
-                
-                elif element_type == 'dropdown':
-                    # Handle dropdown selection
-                    pass
-                
-                elif element_type == 'checkbox':
-                    self.check_checkbox()
-                
-                elif element_type == 'required_field':
-                    logger.warning("Required field detected. Please ensure it's filled.")
-
-    def apply_to_job(self, url):
-        """Main method to apply to a job posting."""
+        # Process each detected element, top to bottom
+        for box in boxes:
+            if box.name in INPUT_FIELD_KEYS:
+                value = self.application_data.get(INPUT_FIELD_KEYS[box.name], '')
+                if value:
+                    self.fill_text_field(box, value)
+            
+            elif box.name == 'text_input':
+                value = next(text_values, None)
+                if value:
+                    self.fill_text_field(box, value)
+            
+            elif box.name == 'dropdown':
+                # Handle dropdown selection
+                pass
+            
+            elif box.name == 'checkbox':
+                self.check_checkbox(box)
+            
+            elif box.name == 'required_field':
+                logger.warning("Required field detected. Please ensure it's filled.")
+
+    def apply_to_job(self, url, application_data=None):
+        """
+        Main method to apply to a job posting.
+
+        Args:
+            url: URL of the job posting
+            application_data: Optional overrides applied to this posting only
+
+        Returns:
+            bool: True if the application was submitted successfully
+        """
+        base_data = self.application_data
+        if application_data:
+            self.application_data = {**base_data, **application_data}
+
         try:
             # Navigate to the job posting
-            pyautogui.hotkey('ctrl', 'l')  # Focus address bar
-            time.sleep(0.5)
-            pyautogui.write(url)
-            pyautogui.press('enter')
-            time.sleep(3)  # Wait for page load
+            with self.input.session():
+                self.input.hotkey('ctrl', 'l')  # Focus address bar
+                self.input.write(url)
+                before = self.readiness.frame()
+                self.input.press('enter')
+            self.readiness.wait_for_page_load(before, timeout=self.page_load_timeout)
+            self.invalidate_page()
             
             # Process the application
             self.process_application_page()
@@ -129,4 +248,6 @@ class JobApplicator:
             
         except Exception as e:
             logger.error(f"Error applying to job: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
+        finally:
+            self.application_data = base_data
@@ -0,0 +1,26 @@
+"""
+Per-page detection results shared by fill and submit decisions.
+"""
+
+import time
+from ..utils.image_hash import hamming_distance
+
+
+class PageDetections:
+    def __init__(self, page_hash, screenshot, predictions):
+        """
+        Detection result for one page, reused until the page visibly changes.
+
+        Args:
+            page_hash: Perceptual hash of the capture the detections were computed on
+            screenshot: The capture passed to the detector
+            predictions: Detector output for the capture
+        """
+        self.page_hash = page_hash
+        self.screenshot = screenshot
+        self.predictions = predictions
+        self.created_at = time.time()
+
+    def matches(self, page_hash, max_distance=0):
+        """Whether a new capture hash still describes this page."""
+        return hamming_distance(self.page_hash, page_hash) <= max_distance
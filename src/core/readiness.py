@@ -0,0 +1,126 @@
+"""
+Event-driven readiness waits used instead of fixed sleeps between UI actions.
+"""
+
+import time
+import numpy as np
+from ..utils.logger import logger
+
+
+class ReadinessWaiter:
+    def __init__(self, capture, timeout=3.0, poll_interval=0.05, settle_time=0.2,
+                 diff_threshold=1.0, driver=None):
+        """
+        Initialize the readiness waiter.
+
+        Args:
+            capture: Callable returning a small grayscale frame of the window
+                (see WindowManager.take_thumbnail)
+            timeout: Upper bound in seconds for any single wait
+            poll_interval: Delay between two captures in seconds
+            settle_time: How long the frame must stay unchanged to count as settled
+            diff_threshold: Mean absolute pixel difference (0-255) below which
+                two frames are considered identical
+            driver: Optional Selenium driver used for page-load signals
+        """
+        self.capture = capture
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.diff_threshold = diff_threshold
+        self.driver = driver
+
+    def frame(self):
+        """Capture a frame suitable for cheap differencing."""
+        return np.asarray(self.capture(), dtype=np.int16)
+
+    def frame_difference(self, a, b):
+        """Mean absolute difference between two frames."""
+        if a.shape != b.shape:
+            return float('inf')
+        return float(np.abs(a - b).mean())
+
+    def wait_until_settled(self, timeout=None):
+        """
+        Block until the window stops changing.
+
+        Args:
+            timeout: Optional override of the default timeout
+
+        Returns:
+            bool: True if the UI settled, False if the timeout was reached
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        deadline = start + timeout
+        previous = self.frame()
+        stable_since = time.perf_counter()
+
+        while True:
+            now = time.perf_counter()
+            if now - stable_since >= self.settle_time:
+                logger.debug(f"UI settled after {now - start:.2f}s")
+                return True
+            if now >= deadline:
+                logger.debug(f"UI did not settle within {timeout:.2f}s")
+                return False
+
+            time.sleep(self.poll_interval)
+            current = self.frame()
+            if self.frame_difference(previous, current) > self.diff_threshold:
+                stable_since = time.perf_counter()
+            previous = current
+
+    def wait_for_change(self, reference, timeout=None):
+        """
+        Block until the window differs from a reference frame, then until it settles.
+
+        Args:
+            reference: Frame captured before the triggering action
+            timeout: Optional override of the default timeout
+
+        Returns:
+            bool: True if a change was observed and the UI settled
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        deadline = start + timeout
+
+        while self.frame_difference(reference, self.frame()) <= self.diff_threshold:
+            if time.perf_counter() >= deadline:
+                logger.debug(f"No UI change observed within {timeout:.2f}s")
+                return False
+            time.sleep(self.poll_interval)
+
+        return self.wait_until_settled(timeout=max(deadline - time.perf_counter(), 0.0))
+
+    def wait_for_page_load(self, reference=None, timeout=None):
+        """
+        Block until a navigation has finished loading.
+
+        Uses document.readyState when a driver is available, otherwise waits
+        for the window to change from the reference frame and settle.
+
+        Args:
+            reference: Frame captured before navigating (visual fallback only)
+            timeout: Optional override of the default timeout
+
+        Returns:
+            bool: True if the page finished loading within the timeout
+        """
+        timeout = self.timeout if timeout is None else timeout
+
+        if self.driver is not None:
+            deadline = time.perf_counter() + timeout
+            while time.perf_counter() < deadline:
+                try:
+                    if self.driver.execute_script("return document.readyState") == "complete":
+                        return True
+                except Exception as e:
+                    logger.debug(f"readyState check failed: {str(e)}")
+                time.sleep(self.poll_interval)
+            return False
+
+        if reference is None:
+            return self.wait_until_settled(timeout=timeout)
+        return self.wait_for_change(reference, timeout=timeout)
@@ -0,0 +1,98 @@
+"""
+Thread-safe detector shared by several application workers.
+"""
+
+import queue
+import threading
+from concurrent.futures import Future
+from ..utils.logger import logger
+
+
+class SharedDetector:
+    def __init__(self, detector, max_batch=8, max_wait=0.01):
+        """
+        Batch predict() calls from many threads into single inference calls.
+
+        Args:
+            detector: Loaded FormElementDetector
+            max_batch: Maximum number of frames per forward pass
+            max_wait: Seconds to wait for more frames once one has arrived
+        """
+        self.detector = detector
+        self.class_names = detector.class_names
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._requests = queue.Queue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._serve, name='shared-detector', daemon=True)
+        self._thread.start()
+
+    def eval(self):
+        return self
+
+    def predict(self, image, offset=(0, 0)):
+        """
+        Queue a frame for the next batch and wait for its detections.
+
+        Args:
+            image: PIL Image or capture frame
+            offset: (x, y) added to every box
+
+        Returns:
+            Detections: Boxes for this frame
+
+        Raises:
+            RuntimeError: If the detector has been closed
+        """
+        future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("SharedDetector is closed")
+            self._requests.put((image, offset, future))
+        return future.result()
+
+    def close(self):
+        """Stop the batching thread; frames already queued are still served."""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._requests.put(None)
+        self._thread.join()
+
+    def _collect_batch(self):
+        """Block for one request, then gather more until the batch is full or max_wait passes."""
+        first = self._requests.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        while len(batch) < self.max_batch:
+            try:
+                request = self._requests.get(timeout=self.max_wait)
+            except queue.Empty:
+                break
+            if request is None:
+                self._requests.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _serve(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+
+            images, offsets, futures = zip(*batch)
+            try:
+                results = self.detector.predict_batch(list(images), list(offsets))
+            except Exception as e:
+                logger.error(f"Shared detector failed on a batch of {len(batch)}: {str(e)}")
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, detections in zip(futures, results):
+                future.set_result(detections)
@@ -1,14 +1,131 @@
-import pygetwindow as gw
-import pyautogui
+import cv2
 from PIL import Image
 import time
+from ..utils.logger import logger
+from .capture import MssCapture, create_capture_backend
+
+try:
+    import pygetwindow as gw
+except NotImplementedError:
+    # PyGetWindow has no Linux support; only virtual display windows work there
+    gw = None
+
+class DisplayWindow:
+    """A browser running fullscreen on its own X display (e.g. Xvfb)."""
+
+    isActive = True
+
+    def __init__(self, display, region):
+        self.title = f"Chrome on {display}"
+        self.left, self.top, self.width, self.height = region
+
+    def activate(self):
+        pass
 
 class WindowManager:
-    def __init__(self, window_title="Chrome"):
+    def __init__(self, window_title="Chrome", capture='auto', activate_timeout=0.5,
+                 window_index=0, display=None):
+        """
+        Initialize the window manager.
+
+        Args:
+            window_title: Title substring of the browser window
+            capture: Capture backend instance or name ('auto', 'mss', 'pyautogui')
+            activate_timeout: Max seconds to wait for the window to come to the front
+            window_index: Which of the matching browser windows to drive
+            display: Optional X display (e.g. ':1') whose whole screen is the browser
+        """
         self.window_title = window_title
+        self.display = display
+        if display is not None:
+            if capture in ('auto', 'mss'):
+                capture = MssCapture(display=display)
+            elif capture == 'pyautogui':
+                raise ValueError(f"pyautogui capture only sees the current desktop, not display {display}")
+        self.capture = create_capture_backend(capture) if isinstance(capture, str) else capture
+        self.activate_timeout = activate_timeout
+        self.window_index = window_index
+        self._window = None
+        self._geometry = None
+        self._geometry_listeners = []
+        self.lookup_stats = {
+            'hits': 0,
+            'misses': 0,
+            'hit_time': 0.0,
+            'miss_time': 0.0
+        }
+
+    def add_geometry_listener(self, callback):
+        """
+        Register a callback for window moves and resizes.
+
+        Args:
+            callback: Called with (old_geometry, new_geometry) as (left, top, width, height)
+        """
+        self._geometry_listeners.append(callback)
+
+    def invalidate(self):
+        """Forget the cached window handle so the next call re-enumerates windows."""
         self._window = None
 
+    def get_lookup_stats(self):
+        """Window lookup counters with average hit/miss times in milliseconds."""
+        stats = dict(self.lookup_stats)
+        stats['avg_hit_ms'] = stats['hit_time'] / stats['hits'] * 1000 if stats['hits'] else 0.0
+        stats['avg_miss_ms'] = stats['miss_time'] / stats['misses'] * 1000 if stats['misses'] else 0.0
+        return stats
+
+    def _read_geometry(self, window):
+        """
+        Read the current window rectangle, or None if the handle is no longer valid.
+        """
+        try:
+            if "Chrome" not in window.title:
+                return None
+            return (window.left, window.top, window.width, window.height)
+        except Exception:
+            return None
+
+    def _update_geometry(self, geometry):
+        """Store the window rectangle and notify listeners if it changed."""
+        previous = self._geometry
+        self._geometry = geometry
+        if previous is not None and previous != geometry:
+            logger.debug(f"Window geometry changed from {previous} to {geometry}")
+            for callback in self._geometry_listeners:
+                callback(previous, geometry)
+
     def _find_window(self):
+        """
+        Return the browser window, reusing the cached handle while it stays valid.
+
+        Enumerating all desktop windows only happens on the first call or after
+        the cached handle stops resolving (window closed or retitled).
+        """
+        start = time.perf_counter()
+        if self._window is not None:
+            geometry = self._read_geometry(self._window)
+            if geometry is not None:
+                self._update_geometry(geometry)
+                self.lookup_stats['hits'] += 1
+                self.lookup_stats['hit_time'] += time.perf_counter() - start
+                return self._window
+            logger.debug("Cached window handle is no longer valid, searching again")
+
+        window = self._enumerate_window()
+        self._update_geometry((window.left, window.top, window.width, window.height))
+        self.lookup_stats['misses'] += 1
+        self.lookup_stats['miss_time'] += time.perf_counter() - start
+        return window
+
+    def _enumerate_window(self):
+        if self.display is not None:
+            self._window = DisplayWindow(self.display, self.capture.screen_region())
+            return self._window
+
+        if gw is None:
+            raise RuntimeError("Window lookup is not supported on this platform, use a virtual display.")
+
         # Try to find Chrome window
         windows = gw.getWindowsWithTitle(self.window_title)
         if not windows:
@@ -18,35 +135,78 @@ class WindowManager:
         chrome_windows = [w for w in windows if "Chrome" in w.title]
         if not chrome_windows:
             raise RuntimeError("No Chrome windows found.")
+        if self.window_index >= len(chrome_windows):
+            raise RuntimeError(f"Chrome window #{self.window_index + 1} not found, only {len(chrome_windows)} open.")
         
-        self._window = chrome_windows[0]
+        self._window = chrome_windows[self.window_index]
         return self._window
 
-    def take_screenshot(self):
-        window = self._find_window()
-        # Bring window to front
+    def _bring_to_front(self, window):
+        """Activate the window unless it already is the foreground window."""
+        if getattr(window, 'isActive', False):
+            return
+
         window.activate()
-        # Small delay to ensure window is in front
-        time.sleep(0.5)
-        
-        # Get window position and size
-        x, y, width, height = window.left, window.top, window.width, window.height
+        # Wait until the window is in front instead of a fixed delay
+        deadline = time.perf_counter() + self.activate_timeout
+        while not getattr(window, 'isActive', True) and time.perf_counter() < deadline:
+            time.sleep(0.01)
+
+    def bring_to_front(self):
+        """Make the browser window the foreground window."""
+        self._bring_to_front(self._find_window())
+
+    def take_screenshot(self, as_array=False):
+        """
+        Capture the browser window.
+
+        Args:
+            as_array: Return the capture backend's NumPy frame (RGB or BGRA,
+                possibly a view of the grab buffer) instead of a PIL Image
+
+        Returns:
+            PIL.Image.Image or numpy.ndarray: Window capture
+        """
+        window = self._find_window()
+        self._bring_to_front(window)
         
         # Take screenshot of the window region
-        screenshot = pyautogui.screenshot(region=(x, y, width, height))
+        frame = self.capture.grab(self._geometry)
+        if as_array:
+            return frame
         
-        # Convert to PIL Image if not already
-        if not isinstance(screenshot, Image.Image):
-            screenshot = Image.fromarray(screenshot)
-        return screenshot
+        # Convert to PIL Image for callers that expect one
+        if frame.shape[2] == 4:
+            height, width = frame.shape[:2]
+            return Image.frombuffer('RGB', (width, height), frame, 'raw', 'BGRX', 0, 1)
+        return Image.fromarray(frame)
+
+    def take_thumbnail(self, size=(160, 90)):
+        """
+        Grab a small grayscale frame of the window for cheap change detection.
+
+        Unlike take_screenshot this never brings the window to the front; when
+        several workers share a desktop, grab inside the input channel's
+        session(), which does.
+
+        Args:
+            size: (width, height) of the returned frame
+
+        Returns:
+            numpy.ndarray: uint8 array of shape (height, width)
+        """
+        self._find_window()
+        frame = self.capture.grab(self._geometry)
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGRA2GRAY if small.shape[2] == 4 else cv2.COLOR_RGB2GRAY)
 
     def get_window_position(self):
-        window = self._find_window()
-        return (window.left, window.top)
+        self._find_window()
+        return self._geometry[:2]
 
     def get_window_size(self):
-        window = self._find_window()
-        return (window.width, window.height)
+        self._find_window()
+        return self._geometry[2:]
 
     def get_active_tab_title(self):
         """Get the title of the currently active Chrome tab."""
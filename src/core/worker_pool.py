@@ -0,0 +1,65 @@
+"""
+Factory for parallel application workers sharing one detector.
+"""
+
+from ..utils.logger import logger
+from ..ml.models.form_detector import FormElementDetector
+from .input_channel import PyAutoGuiInput, XdotoolInput
+from .job_applicator import JobApplicator
+from .shared_detector import SharedDetector
+from .window_manager import WindowManager
+
+
+def create_workers(num_workers, model_path=None, displays=None, detector_backend='auto',
+                   quantize=False, max_batch=None, capture='auto', **applicator_kwargs):
+    """
+    Create one JobApplicator per browser window around a shared detector.
+
+    With displays, every worker drives a browser running fullscreen on its own
+    X display (e.g. Xvfb :1, :2, ...) through xdotool, so workers run truly in
+    parallel. Without displays, workers drive the first num_workers Chrome
+    windows on the desktop and take turns with the single global mouse,
+    keyboard and screen: every input action and screen grab brings the
+    worker's window to the front under one lock. They still overlap page
+    loads, waits and inference.
+
+    Args:
+        num_workers: Number of workers
+        model_path: Path to trained detector weights
+        displays: Optional list of X display names, one per worker
+        detector_backend: Inference backend ('torch', 'torchscript', 'onnx' or 'auto')
+        quantize: Use int8 dynamic quantization (ONNX backend)
+        max_batch: Max frames per shared inference call (defaults to num_workers)
+        capture: Screen capture backend ('auto', 'mss' or 'pyautogui'; only
+            'auto' and 'mss' can grab a separate display)
+        **applicator_kwargs: Extra JobApplicator options (timeouts, thresholds...)
+
+    Returns:
+        tuple: (list of JobApplicator, SharedDetector)
+    """
+    if displays and len(displays) < num_workers:
+        raise ValueError(f"{num_workers} workers need {num_workers} displays, got {len(displays)}")
+
+    detector = FormElementDetector(backend=detector_backend, quantize=quantize)
+    if model_path:
+        detector.load_model(model_path)
+    shared_detector = SharedDetector(detector, max_batch=max_batch or num_workers)
+
+    applicators = []
+    for i in range(num_workers):
+        if displays:
+            window_manager = WindowManager(display=displays[i], capture=capture)
+            input_channel = XdotoolInput(displays[i])
+        else:
+            window_manager = WindowManager(window_index=i, capture=capture)
+            input_channel = PyAutoGuiInput(focus=window_manager.bring_to_front)
+
+        applicators.append(JobApplicator(
+            window_manager=window_manager,
+            detector=shared_detector,
+            input_channel=input_channel,
+            **applicator_kwargs
+        ))
+
+    logger.info(f"Created {num_workers} workers" + (f" on displays {', '.join(displays[:num_workers])}" if displays else ""))
+    return applicators, shared_detector
@@ -0,0 +1,155 @@
+"""
+Preprocessed, memory-mapped cache of training crops.
+
+The crops FormElementDataset cuts out of every screenshot are written once
+into a single uint8 array of shape (N, 3, crop_size, crop_size) stored as
+<cache>.npy, next to a small <cache>.json index mapping each screenshot to
+its rows. Loaders map the array instead of decoding PNGs, so epochs after
+the first touch no image files at all.
+
+Entries are keyed by screenshot name and invalidated by the mtime and size
+of both the image and its label file; refreshing the cache only decodes
+screenshots that changed and copies every other row from the old array.
+"""
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+from ...utils.logger import logger
+
+CACHE_VERSION = 1
+
+
+def file_signature(path):
+    """(mtime_ns, size) of a file, used to detect changes."""
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class CropCache:
+    def __init__(self, cache_path):
+        """
+        Args:
+            cache_path: Cache path without extension (e.g. data/crops.cache)
+        """
+        self.array_path = cache_path + '.npy'
+        self.index_path = cache_path + '.json'
+
+    def load_index(self):
+        """Return the stored index, or None when missing or unreadable."""
+        if not (os.path.exists(self.index_path) and os.path.exists(self.array_path)):
+            return None
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable crop cache index {self.index_path}: {str(e)}")
+            return None
+        return index if index.get('version') == CACHE_VERSION else None
+
+    def refresh(self, dataset):
+        """
+        Bring the cache in line with a dataset, decoding only changed screenshots.
+
+        Args:
+            dataset: FormElementDataset whose crops should be cached
+
+        Returns:
+            list: Row offset of every dataset image in the cached array
+        """
+        start = time.perf_counter()
+        crop_shape = (3, dataset.crop_size, dataset.crop_size)
+        old_index = self.load_index()
+        if old_index is not None and (old_index['crop_size'] != dataset.crop_size
+                                      or old_index['context'] != dataset.context):
+            old_index = None
+        old_entries = old_index['images'] if old_index else {}
+
+        signatures = []
+        for image_path, label_path in zip(dataset.images, dataset.label_paths):
+            signatures.append(file_signature(image_path) + file_signature(label_path))
+
+        # Nothing changed: reuse the array as is
+        names = [os.path.basename(path) for path in dataset.images]
+        offsets = []
+        total = 0
+        for name, labels in zip(names, dataset.labels):
+            offsets.append(total)
+            total += len(labels)
+        if old_index is not None and old_index['total'] == total and all(
+                old_entries.get(name) == {'signature': sig, 'offset': offset, 'count': len(labels)}
+                for name, sig, offset, labels in zip(names, signatures, offsets, dataset.labels)):
+            logger.info(f"Crop cache up to date: {total} crops in {self.array_path}")
+            return offsets
+
+        old_crops = np.load(self.array_path, mmap_mode='r') if old_index else None
+        tmp_path = self.array_path + '.tmp'
+        crops = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.uint8,
+                                          shape=(total,) + crop_shape)
+        entries = {}
+        decoded = 0
+        for i, (name, sig, offset, labels) in enumerate(zip(names, signatures, offsets, dataset.labels)):
+            count = len(labels)
+            old = old_entries.get(name)
+            if old is not None and old['signature'] == sig and old['count'] == count:
+                crops[offset:offset + count] = old_crops[old['offset']:old['offset'] + count]
+            else:
+                image = dataset.load_image(i)
+                for row, label in enumerate(labels):
+                    crops[offset + row] = dataset.crop(image, label).transpose(2, 0, 1)
+                decoded += 1
+            entries[name] = {'signature': sig, 'offset': offset, 'count': count}
+
+        crops.flush()
+        # Release both maps before replacing the file (required on Windows)
+        del crops, old_crops
+        os.replace(tmp_path, self.array_path)
+
+        index = {
+            'version': CACHE_VERSION,
+            'crop_size': dataset.crop_size,
+            'context': dataset.context,
+            'total': total,
+            'images': entries
+        }
+        with open(self.index_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(self.index_path + '.tmp', self.index_path)
+
+        logger.info(
+            f"Crop cache refreshed: {total} crops, {decoded}/{len(names)} screenshots decoded "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+        return offsets
+
+    def open(self):
+        """
+        Map the cached crops without reading them.
+
+        Copy-on-write mode gives writable views, so tensors can be built
+        from rows without copying and without touching the file.
+        """
+        return np.load(self.array_path, mmap_mode='c')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Precompute the training crop cache')
+    parser.add_argument('--data-dir', type=str, default='data',
+                        help='Directory containing images/ and labels/')
+    parser.add_argument('--crop-size', type=int, default=64,
+                        help='Side of the square crops')
+    return parser.parse_args()
+
+
+def main():
+    from .form_dataset import FormElementDataset
+
+    args = parse_args()
+    dataset = FormElementDataset(args.data_dir, crop_size=args.crop_size)
+    dataset.use_cache(CropCache(os.path.join(args.data_dir, 'crops.cache')))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Helpers for reading the YOLO dataset configuration (data.yaml).
+"""
+
+import os
+import yaml
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+DEFAULT_DATA_CONFIG = os.path.join(PROJECT_ROOT, 'data.yaml')
+
+
+def load_data_config(config_path=DEFAULT_DATA_CONFIG):
+    """
+    Load the dataset configuration.
+
+    Args:
+        config_path: Path to data.yaml
+
+    Returns:
+        dict: Parsed configuration
+    """
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+
+    names = config.get('names', [])
+    if isinstance(names, dict):
+        config['names'] = [names[i] for i in sorted(names)]
+    if config.get('nc') is not None and config['nc'] != len(config['names']):
+        raise ValueError(f"{config_path}: nc={config['nc']} but {len(config['names'])} names are listed")
+    return config
+
+
+def load_class_names(config_path=DEFAULT_DATA_CONFIG):
+    """
+    Load the ordered list of class names.
+
+    Args:
+        config_path: Path to data.yaml
+
+    Returns:
+        list: Class names indexed by class id
+    """
+    return list(load_data_config(config_path)['names'])
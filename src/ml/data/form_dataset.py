@@ -0,0 +1,223 @@
+"""
+Streaming dataset of labelled form element crops.
+
+Every labelled box in data/labels becomes one sample: the element cropped
+from its screenshot (with a little surrounding context), letterboxed to a
+small square and paired with its class id. Screenshots are decoded lazily,
+one worker at a time, so peak memory depends on the number of loader
+workers rather than on the size of the dataset. With a CropCache attached
+the crops are read from a memory-mapped array instead (see crop_cache).
+"""
+
+import os
+import random
+import numpy as np
+import torch
+from PIL import Image
+from torch.utils.data import DataLoader, IterableDataset, get_worker_info
+from ..utils.image_ops import letterbox
+from .dataset_config import DEFAULT_DATA_CONFIG
+from .label_index import LabelIndex
+from ...utils.logger import logger
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def read_image_list(list_path):
+    """
+    Read a split list written by tools/split_dataset.py.
+
+    Args:
+        list_path: Text file with one image path per line (e.g. './images/x.png')
+
+    Returns:
+        list: Image file names
+    """
+    with open(list_path, 'r', encoding='utf-8') as f:
+        return [os.path.basename(line.strip()) for line in f if line.strip()]
+
+
+class FormElementDataset(IterableDataset):
+    def __init__(self, data_dir='data', crop_size=64, context=0.1, shuffle=True,
+                 open_images=2, image_names=None, data_config=DEFAULT_DATA_CONFIG, seed=0,
+                 label_index=None):
+        """
+        Initialize the dataset.
+
+        Args:
+            data_dir: Directory containing images/ and labels/
+            crop_size: Side of the square crops
+            context: Fraction of the box size added around each crop
+            shuffle: Shuffle screenshots and crops every epoch
+            open_images: Decoded screenshots each worker draws crops from at
+                once; more mixes batches better at the cost of memory
+            image_names: Optional list of image file names to restrict to
+            data_config: Path to data.yaml
+            seed: Base seed for the per-epoch shuffle
+            label_index: Optional LabelIndex over data_dir/labels (built and
+                refreshed here when omitted)
+        """
+        super().__init__()
+        self.images_dir = os.path.join(data_dir, 'images')
+        self.labels_dir = os.path.join(data_dir, 'labels')
+        self.crop_size = crop_size
+        self.context = context
+        self.shuffle = shuffle
+        self.open_images = max(1, open_images)
+        self.label_index = label_index or LabelIndex(self.labels_dir, data_config=data_config)
+        self.class_names = self.label_index.class_names
+        self.num_classes = self.label_index.num_classes
+        self.seed = seed
+        self.epoch = 0
+
+        # Only the label rows are kept in memory, never pixels
+        self.images = []
+        self.label_paths = []
+        self.labels = []
+        names = image_names if image_names is not None else sorted(os.listdir(self.images_dir))
+        for name in names:
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            stem = os.path.splitext(name)[0]
+            labels = self.label_index.labels(stem)
+            if len(labels):
+                self.images.append(os.path.join(self.images_dir, name))
+                self.label_paths.append(os.path.join(self.labels_dir, stem + '.txt'))
+                self.labels.append(labels)
+
+        self.num_samples = sum(len(labels) for labels in self.labels)
+        self.cache = None
+        logger.info(f"Dataset: {self.num_samples} elements in {len(self.images)} labelled screenshots")
+
+    def __len__(self):
+        return self.num_samples
+
+    def use_cache(self, cache):
+        """
+        Serve crops from a memory-mapped cache, refreshing it first.
+
+        Args:
+            cache: CropCache to read from
+        """
+        cache.refresh(self)
+        self.cache = cache
+
+    def set_epoch(self, epoch):
+        """Change the shuffle order; call before iterating each epoch."""
+        self.epoch = epoch
+
+    def load_image(self, index):
+        """Decode one screenshot as an HxWx3 RGB array."""
+        with Image.open(self.images[index]) as image:
+            return np.asarray(image.convert('RGB'))
+
+    def crop(self, image, label):
+        """
+        Cut one element out of a decoded screenshot.
+
+        Args:
+            image: HxWx3 RGB array
+            label: (class, xc, yc, w, h) row with normalized coordinates
+
+        Returns:
+            numpy.ndarray: crop_size x crop_size x 3 uint8 crop
+        """
+        height, width = image.shape[:2]
+        _, xc, yc, w, h = label
+        w, h = w * (1 + 2 * self.context), h * (1 + 2 * self.context)
+        x1 = int(np.clip((xc - w / 2) * width, 0, width - 1))
+        y1 = int(np.clip((yc - h / 2) * height, 0, height - 1))
+        x2 = int(np.clip(np.ceil((xc + w / 2) * width), x1 + 1, width))
+        y2 = int(np.clip(np.ceil((yc + h / 2) * height), y1 + 1, height))
+        crop, _, _ = letterbox(np.ascontiguousarray(image[y1:y2, x1:x2]), self.crop_size)
+        return crop
+
+    def _image_order(self):
+        """Screenshot indices handled by this worker, in epoch order."""
+        order = list(range(len(self.images)))
+        if self.shuffle:
+            # Same permutation in every worker, then sharded
+            random.Random(self.seed + self.epoch).shuffle(order)
+        worker = get_worker_info()
+        if worker is not None:
+            order = order[worker.id::worker.num_workers]
+        return order
+
+    def _sample(self, image, label):
+        crop = self.crop(image, label)
+        return torch.from_numpy(crop.transpose(2, 0, 1).copy()), int(label[0])
+
+    def _iter_cached(self):
+        """Yield crops from the memory-mapped cache in a global random order."""
+        crops = self.cache.open()
+        classes = np.concatenate([labels[:, 0] for labels in self.labels]).astype(np.int64)
+        order = np.arange(len(classes))
+        if self.shuffle:
+            # Rows are independent here, so every batch mixes screenshots
+            np.random.default_rng(self.seed + self.epoch).shuffle(order)
+        worker = get_worker_info()
+        if worker is not None:
+            order = order[worker.id::worker.num_workers]
+        for row in order:
+            yield torch.from_numpy(crops[row]), int(classes[row])
+
+    def __iter__(self):
+        if self.cache is not None:
+            yield from self._iter_cached()
+            return
+
+        worker = get_worker_info()
+        rng = random.Random((self.seed + self.epoch) * 1000 + (worker.id if worker else 0))
+        order = iter(self._image_order())
+
+        # Pool of (image, pending rows): each screenshot is decoded once and
+        # released as soon as all of its crops have been produced
+        pool = []
+        while True:
+            while len(pool) < self.open_images:
+                index = next(order, None)
+                if index is None:
+                    break
+                # Rows are popped from the end
+                rows = list(range(len(self.labels[index])))[::-1]
+                if self.shuffle:
+                    rng.shuffle(rows)
+                pool.append((index, self.load_image(index), rows))
+            if not pool:
+                return
+
+            slot = rng.randrange(len(pool)) if self.shuffle else 0
+            index, image, rows = pool[slot]
+            yield self._sample(image, self.labels[index][rows.pop()])
+            if not rows:
+                pool.pop(slot)
+
+
+def create_data_loader(dataset, batch_size=32, num_workers=None, device=None):
+    """
+    Create a DataLoader streaming batches of uint8 crops.
+
+    Args:
+        dataset: FormElementDataset
+        batch_size: Samples per batch
+        num_workers: Loader processes (defaults to min(4, cpu count))
+        device: Training device; batches are pinned for fast copies to CUDA
+
+    Returns:
+        DataLoader: Loader yielding (uint8 images, class ids)
+    """
+    if num_workers is None:
+        num_workers = min(4, os.cpu_count() or 1)
+    # Without a cache work is sharded by screenshot, so more workers than
+    # screenshots would sit idle
+    if dataset.cache is None:
+        num_workers = min(num_workers, len(dataset.images))
+    pin_memory = device is not None and torch.device(device).type == 'cuda'
+
+    return DataLoader(
+        dataset,
+        batch_size=batch_size,
+        num_workers=num_workers,
+        pin_memory=pin_memory,
+        prefetch_factor=2 if num_workers > 0 else None
+    )
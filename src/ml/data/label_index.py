@@ -0,0 +1,252 @@
+"""
+Columnar index of the YOLO label files in data/labels.
+
+All boxes are kept in one compact .npz file (image id, class id and xywh as
+flat float32/int arrays, plus a per-file table of mtime, size and row
+range). Refreshing the index only stats the label directory and re-parses
+files whose mtime or size changed, so loading labels for training or
+dataset stats costs O(changed files) rather than parsing every file.
+
+Rows are validated when parsed: class ids must be below nc from data.yaml
+and boxes must lie inside the normalized image. Invalid rows are logged
+and left out of the index.
+"""
+
+import argparse
+import os
+import time
+import numpy as np
+from .dataset_config import DEFAULT_DATA_CONFIG, load_class_names
+from ...utils.logger import logger
+
+INDEX_VERSION = 1
+
+# Tolerance for boxes drawn slightly past the image border
+BOUNDS_EPS = 1e-3
+
+
+def parse_label_lines(lines, num_classes):
+    """
+    Parse and validate YOLO label lines.
+
+    Args:
+        lines: Iterable of 'class xc yc w h' strings
+        num_classes: Number of classes in data.yaml
+
+    Returns:
+        tuple: ((N, 5) float32 array of class, xc, yc, w, h,
+                list of (line number, reason) for rejected rows)
+    """
+    rows = []
+    errors = []
+    for line_no, line in enumerate(lines, 1):
+        parts = line.split()
+        if not parts:
+            continue
+        if len(parts) != 5:
+            errors.append((line_no, f"expected 5 values, got {len(parts)}"))
+            continue
+        try:
+            values = [float(v) for v in parts]
+        except ValueError:
+            errors.append((line_no, "non-numeric value"))
+            continue
+
+        cls, xc, yc, w, h = values
+        if cls != int(cls) or not 0 <= cls < num_classes:
+            errors.append((line_no, f"class {parts[0]} outside 0..{num_classes - 1}"))
+            continue
+        if not (w > 0 and h > 0
+                and xc - w / 2 >= -BOUNDS_EPS and xc + w / 2 <= 1 + BOUNDS_EPS
+                and yc - h / 2 >= -BOUNDS_EPS and yc + h / 2 <= 1 + BOUNDS_EPS):
+            errors.append((line_no, "box outside the image"))
+            continue
+        rows.append(values)
+    return np.array(rows, dtype=np.float32).reshape(-1, 5), errors
+
+
+class LabelIndex:
+    def __init__(self, labels_dir, data_config=DEFAULT_DATA_CONFIG, index_path=None):
+        """
+        Load the stored index (if any) and bring it up to date.
+
+        Args:
+            labels_dir: Directory of YOLO .txt label files
+            data_config: Path to data.yaml, used to validate class ids
+            index_path: Where to store the index (defaults to <labels_dir>.index.npz)
+        """
+        self.labels_dir = labels_dir
+        self.index_path = index_path or os.path.normpath(labels_dir) + '.index.npz'
+        self.class_names = load_class_names(data_config)
+        self.num_classes = len(self.class_names)
+        # stem -> ((mtime_ns, size), rows)
+        self._entries = {}
+        # Entries changed since the last save()
+        self.dirty = False
+        self._load()
+        self.refresh()
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with np.load(self.index_path) as data:
+                if int(data['version']) != INDEX_VERSION or int(data['num_classes']) != self.num_classes:
+                    return
+                stems = data['stems']
+                signatures = data['signatures']
+                starts = data['starts']
+                counts = data['counts']
+                rows = np.concatenate([data['cls'][:, None].astype(np.float32), data['xywh']], axis=1)
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable label index {self.index_path}: {str(e)}")
+            return
+
+        for stem, signature, start, count in zip(stems, signatures, starts, counts):
+            self._entries[str(stem)] = ((int(signature[0]), int(signature[1])), rows[start:start + count])
+
+    def _read_file(self, stem, signature):
+        path = os.path.join(self.labels_dir, stem + '.txt')
+        with open(path, 'r', encoding='utf-8') as f:
+            rows, errors = parse_label_lines(f, self.num_classes)
+        for line_no, reason in errors:
+            logger.warning(f"{path}:{line_no}: {reason}, row skipped")
+        self._entries[stem] = (signature, rows)
+
+    def refresh(self):
+        """
+        Re-parse label files added or changed since the last refresh.
+
+        Returns:
+            int: Number of files parsed or removed
+        """
+        start = time.perf_counter()
+        seen = set()
+        changed = 0
+        with os.scandir(self.labels_dir) as entries:
+            for entry in entries:
+                stem, ext = os.path.splitext(entry.name)
+                if ext != '.txt' or stem == 'classes':
+                    continue
+                seen.add(stem)
+                stat = entry.stat()
+                signature = (stat.st_mtime_ns, stat.st_size)
+                cached = self._entries.get(stem)
+                if cached is None or cached[0] != signature:
+                    self._read_file(stem, signature)
+                    changed += 1
+
+        for stem in set(self._entries) - seen:
+            del self._entries[stem]
+            changed += 1
+
+        if changed:
+            self.save()
+        logger.debug(
+            f"Label index refreshed: {changed} changed of {len(seen)} files "
+            f"in {(time.perf_counter() - start) * 1000:.1f}ms"
+        )
+        return changed
+
+    def update_file(self, stem, save=True):
+        """
+        Re-index one label file after it was written (or deleted).
+
+        Args:
+            stem: Label file name without extension
+            save: Write the index file now. Callers updating many files in a
+                row can save() once at the end; a stale index file is only
+                a cache, since the next refresh() re-parses changed files.
+        """
+        path = os.path.join(self.labels_dir, stem + '.txt')
+        if os.path.exists(path):
+            stat = os.stat(path)
+            self._read_file(stem, (stat.st_mtime_ns, stat.st_size))
+        else:
+            self._entries.pop(stem, None)
+        self.dirty = True
+        if save:
+            self.save()
+
+    def save(self):
+        """Write the index atomically."""
+        stems = sorted(self._entries)
+        counts = np.array([len(self._entries[s][1]) for s in stems], dtype=np.int64)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+        rows = (np.concatenate([self._entries[s][1] for s in stems])
+                if stems else np.zeros((0, 5), dtype=np.float32))
+
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                version=INDEX_VERSION,
+                num_classes=self.num_classes,
+                stems=np.array(stems, dtype=str),
+                signatures=np.array([self._entries[s][0] for s in stems], dtype=np.int64).reshape(-1, 2),
+                starts=starts,
+                counts=counts,
+                image_id=np.repeat(np.arange(len(stems), dtype=np.int32), counts),
+                cls=rows[:, 0].astype(np.int16),
+                xywh=rows[:, 1:].astype(np.float32)
+            )
+        os.replace(tmp_path, self.index_path)
+        self.dirty = False
+
+    def __contains__(self, stem):
+        return stem in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stems(self):
+        """Sorted names of all indexed label files."""
+        return sorted(self._entries)
+
+    def signature(self, stem):
+        """(mtime_ns, size) of a label file when it was last indexed, or None."""
+        entry = self._entries.get(stem)
+        return entry[0] if entry is not None else None
+
+    def labels(self, stem):
+        """
+        Valid rows of one label file.
+
+        Args:
+            stem: Label file name without extension
+
+        Returns:
+            numpy.ndarray: (N, 5) float32 array of class, xc, yc, w, h
+        """
+        entry = self._entries.get(stem)
+        return entry[1] if entry is not None else np.zeros((0, 5), dtype=np.float32)
+
+    def class_counts(self):
+        """Number of boxes per class id."""
+        if not self._entries:
+            return np.zeros(self.num_classes, dtype=np.int64)
+        cls = np.concatenate([rows[:, 0] for _, rows in self._entries.values()]).astype(np.int64)
+        return np.bincount(cls, minlength=self.num_classes)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Index YOLO labels and print dataset stats')
+    parser.add_argument('--labels-dir', type=str, default='data/labels',
+                        help='Directory of YOLO label files')
+    parser.add_argument('--data-config', type=str, default=DEFAULT_DATA_CONFIG,
+                        help='Path to data.yaml')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    index = LabelIndex(args.labels_dir, data_config=args.data_config)
+    counts = index.class_counts()
+    print(f"{len(index)} label files, {int(counts.sum())} boxes")
+    for name, count in zip(index.class_names, counts):
+        if count:
+            print(f"  {name:<32} {count}")
+
+
+if __name__ == '__main__':
+    main()
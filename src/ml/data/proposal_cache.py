@@ -0,0 +1,207 @@
+"""
+Cache of detector proposals used to pre-annotate screenshots.
+
+The labeling tool shows the current detector's boxes as proposals that the
+annotator accepts or rejects. Inference runs ahead of time, either for the
+whole folder with
+
+    python -m src.ml.data.proposal_cache --model models/best.onnx
+
+or in the tool's background worker. Results go to <data_dir>/proposals.json
+keyed by screenshot name, as normalized (class, xc, yc, w, h, score) rows.
+Proposals the annotator rejects are moved to the entry's 'rejected' rows and
+not offered again. An entry is invalidated when its image's mtime or size
+changes, and the whole cache when the model file changes.
+"""
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+from PIL import Image
+from ...utils.logger import logger
+from .crop_cache import file_signature
+
+CACHE_VERSION = 1
+
+# Results written between saves while precomputing
+SAVE_EVERY = 50
+
+
+def detect_proposals(detector, image_path):
+    """
+    Run a detector on one screenshot.
+
+    Tall full-page captures are tiled (FormElementDetector.predict_tiled).
+
+    Args:
+        detector: Loaded FormElementDetector
+        image_path: Screenshot file
+
+    Returns:
+        numpy.ndarray: (N, 6) float32 array of class, xc, yc, w, h (normalized) and score
+    """
+    with Image.open(image_path) as image:
+        image = image.convert('RGB')
+    detections = detector.predict_tiled(image)
+    size = np.array([image.width, image.height, image.width, image.height], dtype=np.float32)
+    xyxy = detections.xyxy / size
+    return np.column_stack([
+        detections.class_ids.astype(np.float32),
+        (xyxy[:, 0] + xyxy[:, 2]) / 2,
+        (xyxy[:, 1] + xyxy[:, 3]) / 2,
+        xyxy[:, 2] - xyxy[:, 0],
+        xyxy[:, 3] - xyxy[:, 1],
+        detections.scores
+    ]).astype(np.float32).reshape(-1, 6)
+
+
+class ProposalCache:
+    def __init__(self, cache_path, model_path=None):
+        """
+        Load stored proposals.
+
+        Args:
+            cache_path: JSON file (e.g. data/proposals.json)
+            model_path: Detector the proposals must come from; stored proposals
+                of another model (or another version of it) are discarded.
+                None keeps whatever is stored.
+        """
+        self.cache_path = cache_path
+        self.model_signature = file_signature(model_path) if model_path else None
+        # name -> {'signature': [mtime_ns, size], 'boxes': [[cls, xc, yc, w, h, score], ...],
+        #          'rejected': [...] (optional, same rows)}
+        self.images = {}
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable proposal cache {self.cache_path}: {str(e)}")
+            return
+        if data.get('version') != CACHE_VERSION:
+            return
+        if self.model_signature is not None and data.get('model_signature') != self.model_signature:
+            logger.info(f"Model changed, discarding proposals in {self.cache_path}")
+            self.dirty = True
+            return
+        self.model_signature = data.get('model_signature')
+        self.images = data.get('images', {})
+
+    def get(self, name, image_path):
+        """
+        Cached proposals of a screenshot.
+
+        Returns:
+            numpy.ndarray: (N, 6) proposals, or None when missing or stale
+        """
+        entry = self.images.get(name)
+        if entry is None or entry['signature'] != file_signature(image_path):
+            return None
+        return np.array(entry['boxes'], dtype=np.float32).reshape(-1, 6)
+
+    def put(self, name, image_path, proposals):
+        """Store the proposals of a screenshot (written by the next save())."""
+        self.images[name] = {
+            'signature': file_signature(image_path),
+            'boxes': np.round(np.asarray(proposals, dtype=np.float64), 6).tolist()
+        }
+        self.dirty = True
+
+    def reject(self, name, proposals):
+        """
+        Record proposals of a screenshot as rejected, so get() no longer returns them.
+
+        Args:
+            name: Screenshot file name
+            proposals: (N, 6) rows as returned by get()
+        """
+        entry = self.images.get(name)
+        rejected = np.asarray(proposals, dtype=np.float64).reshape(-1, 6)
+        if entry is None or not len(rejected):
+            return
+        boxes = np.array(entry['boxes'], dtype=np.float64).reshape(-1, 6)
+        # Rows went through float32 in the tool, so match with a tolerance
+        hit = np.isclose(boxes[:, None, :], rejected[None, :, :], atol=1e-5).all(axis=2).any(axis=1)
+        if not hit.any():
+            return
+        entry['boxes'] = boxes[~hit].tolist()
+        entry['rejected'] = entry.get('rejected', []) + boxes[hit].tolist()
+        self.dirty = True
+
+    def save(self):
+        """Write the cache atomically if anything changed."""
+        if not self.dirty:
+            return
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'model_signature': self.model_signature, 'images': self.images}, f)
+        os.replace(tmp_path, self.cache_path)
+        self.dirty = False
+
+
+def precompute_proposals(detector, cache, images_dir, names):
+    """
+    Fill the cache for every screenshot without up-to-date proposals.
+
+    Args:
+        detector: Loaded FormElementDetector
+        cache: ProposalCache
+        images_dir: Directory of the screenshots
+        names: Screenshot file names
+
+    Returns:
+        int: Number of screenshots run through the detector
+    """
+    todo = [name for name in names if cache.get(name, os.path.join(images_dir, name)) is None]
+    start = time.perf_counter()
+    for i, name in enumerate(todo, 1):
+        path = os.path.join(images_dir, name)
+        try:
+            cache.put(name, path, detect_proposals(detector, path))
+        except Exception as e:
+            logger.warning(f"No proposals for {name}: {str(e)}")
+        if i % SAVE_EVERY == 0:
+            cache.save()
+            logger.info(f"Proposals: {i}/{len(todo)} images ({(time.perf_counter() - start) / i:.2f}s per image)")
+    cache.save()
+    return len(todo)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Precompute detector proposals for the labeling tool')
+    parser.add_argument('--data-dir', type=str, default='data',
+                        help='Directory containing images/')
+    parser.add_argument('--model', type=str, required=True,
+                        help='Detector weights (.pt, .onnx, .torchscript or export manifest)')
+    parser.add_argument('--backend', type=str, default='auto', choices=['auto', 'torch', 'torchscript', 'onnx'],
+                        help='Detector inference backend')
+    parser.add_argument('--conf-thres', type=float, default=0.25,
+                        help='Minimum confidence of a proposal')
+    return parser.parse_args()
+
+
+def main():
+    from ..models.form_detector import FormElementDetector
+    from .form_dataset import IMAGE_EXTENSIONS
+
+    args = parse_args()
+    images_dir = os.path.join(args.data_dir, 'images')
+    names = sorted(f for f in os.listdir(images_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+
+    detector = FormElementDetector(backend=args.backend, conf_thres=args.conf_thres)
+    detector.load_model(args.model)
+    cache = ProposalCache(os.path.join(args.data_dir, 'proposals.json'), model_path=args.model)
+    computed = precompute_proposals(detector, cache, images_dir, names)
+    print(f"Proposals for {computed} new or changed images written to {cache.cache_path} "
+          f"({len(cache.images)} images cached)")
+
+
+if __name__ == '__main__':
+    main()
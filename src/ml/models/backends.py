@@ -0,0 +1,279 @@
+"""
+Inference backends for the form element detector.
+"""
+
+import json
+import os
+import sys
+import numpy as np
+from ...utils.logger import logger
+from ..data.crop_cache import file_signature
+from ..data.dataset_config import PROJECT_ROOT
+
+
+def load_checkpoint(model_path):
+    """Unpickle a .pt file on the CPU."""
+    import torch
+
+    # YOLOv5 checkpoints pickle model classes from the yolov5 repository
+    yolov5_dir = os.path.join(PROJECT_ROOT, 'yolov5')
+    if os.path.isdir(yolov5_dir) and yolov5_dir not in sys.path:
+        sys.path.append(yolov5_dir)
+    return torch.load(model_path, map_location='cpu')
+
+
+def detector_model(checkpoint):
+    """Fused fp32 eval-mode model from a loaded YOLOv5 checkpoint."""
+    model = checkpoint
+    if isinstance(checkpoint, dict):
+        model = checkpoint.get('ema') or checkpoint['model']
+    model = model.float()
+    if hasattr(model, 'fuse'):
+        model = model.fuse()
+    return model.eval()
+
+
+class DetectorBackend:
+    """
+    Runs a YOLO model on a preprocessed batch.
+
+    Subclasses take an (N, 3, H, W) float32 array scaled to [0, 1] and return
+    the raw (N, anchors, 5 + nc) prediction array.
+    """
+
+    name = None
+
+    # Whether the model accepts input shapes other than the export shape
+    dynamic_shape = True
+
+    def infer(self, batch):
+        raise NotImplementedError
+
+
+class TorchBackend(DetectorBackend):
+    name = 'torch'
+
+    def __init__(self, model_path, num_threads=None):
+        """
+        Load an eager PyTorch YOLOv5 checkpoint.
+
+        Args:
+            model_path: Path to a .pt checkpoint
+            num_threads: Optional number of intra-op threads
+        """
+        import torch
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+
+        self.model = detector_model(load_checkpoint(model_path))
+        self._torch = torch
+
+    def infer(self, batch):
+        with self._torch.inference_mode():
+            output = self.model(self._torch.from_numpy(batch))
+        if isinstance(output, (list, tuple)):
+            output = output[0]
+        return output.numpy()
+
+
+class TorchScriptBackend(DetectorBackend):
+    name = 'torchscript'
+
+    def __init__(self, model_path, num_threads=None):
+        """
+        Load a TorchScript model written by tools/export_model.py.
+
+        Traced models are specialized to the export input shape, which is
+        read from the config.txt stored inside the archive.
+
+        Args:
+            model_path: Path to a .torchscript file
+            num_threads: Optional number of intra-op threads
+        """
+        import torch
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+
+        extra_files = {'config.txt': ''}
+        self.model = torch.jit.load(model_path, map_location='cpu', _extra_files=extra_files).eval()
+        config = json.loads(extra_files['config.txt'] or '{}')
+        self.input_shape = config.get('input_shape')
+        self.dynamic_shape = config.get('dynamic_shape', False)
+        self.dynamic_batch = config.get('dynamic_batch', False)
+        self._torch = torch
+
+    def infer(self, batch):
+        with self._torch.inference_mode():
+            if self.dynamic_batch or len(batch) == 1:
+                outputs = [self.model(self._torch.from_numpy(batch))]
+            else:
+                outputs = [self.model(self._torch.from_numpy(batch[i:i + 1])) for i in range(len(batch))]
+        outputs = [output[0] if isinstance(output, (list, tuple)) else output for output in outputs]
+        return np.concatenate([output.numpy() for output in outputs])
+
+
+class OnnxBackend(DetectorBackend):
+    name = 'onnx'
+
+    def __init__(self, model_path, quantize=False, num_threads=None):
+        """
+        Create an ONNX Runtime CPU session.
+
+        Args:
+            model_path: Path to an exported .onnx model
+            quantize: Apply dynamic int8 quantization (cached next to the model)
+            num_threads: Optional number of intra-op threads
+        """
+        import onnxruntime as ort
+
+        if quantize:
+            model_path = quantize_onnx_model(model_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.session = ort.InferenceSession(model_path, sess_options=options,
+                                            providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_shape = model_input.shape
+        self.dynamic_shape = not all(isinstance(dim, int) for dim in self.input_shape[2:])
+        self.dynamic_batch = not isinstance(self.input_shape[0], int)
+
+    def infer(self, batch):
+        if self.dynamic_batch or len(batch) == 1:
+            return self.session.run(None, {self.input_name: batch})[0]
+
+        # Models exported with a fixed batch size of 1
+        return np.concatenate([self.session.run(None, {self.input_name: batch[i:i + 1]})[0]
+                               for i in range(len(batch))])
+
+
+def quantize_onnx_model(model_path):
+    """
+    Dynamically quantize an ONNX model to int8, reusing a cached result.
+
+    Args:
+        model_path: Path to the fp32 .onnx model
+
+    Returns:
+        str: Path to the int8 model
+    """
+    quantized_path = os.path.splitext(model_path)[0] + '.int8.onnx'
+    if os.path.exists(quantized_path) and os.path.getmtime(quantized_path) >= os.path.getmtime(model_path):
+        return quantized_path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    logger.info(f"Quantizing {model_path} to int8...")
+    quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QUInt8)
+    logger.info(f"Quantized model saved to {quantized_path}")
+    return quantized_path
+
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    TorchScriptBackend.name: TorchScriptBackend,
+    OnnxBackend.name: OnnxBackend
+}
+
+BACKEND_EXTENSIONS = {
+    '.onnx': OnnxBackend.name,
+    '.torchscript': TorchScriptBackend.name
+}
+
+
+def manifest_path(model_path):
+    """Export manifest written next to a checkpoint by tools/export_model.py."""
+    return os.path.splitext(model_path)[0] + '.export.json'
+
+
+def select_artifact(manifest, quantize=False):
+    """
+    Pick the exported variant with the lowest steady-state latency.
+
+    Only variants that passed the parity check against the eager model are
+    considered.
+
+    Args:
+        manifest: Path to an export manifest (.export.json)
+        quantize: Only consider int8 variants
+
+    Returns:
+        dict: Manifest entry of the chosen variant with an absolute 'path',
+              or None when no variant qualifies
+    """
+    with open(manifest, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    candidates = [v for v in data.get('variants', [])
+                  if v.get('passed') and v.get('steady_ms') is not None and (v.get('int8') or not quantize)]
+    if not candidates:
+        return None
+    best = dict(min(candidates, key=lambda v: v['steady_ms']))
+    best['path'] = os.path.join(os.path.dirname(os.path.abspath(manifest)), best['path'])
+    return best
+
+
+def resolve_model(model_path, quantize=False):
+    """
+    Resolve 'auto' to a backend name and model file.
+
+    A manifest path selects its fastest variant; a checkpoint with an
+    up-to-date manifest next to it is replaced by the fastest exported
+    variant; otherwise the backend follows the file extension.
+
+    Returns:
+        tuple: (backend name, model path, whether quantization still has to be applied)
+    """
+    manifest = model_path if model_path.endswith('.export.json') else manifest_path(model_path)
+    if os.path.exists(manifest):
+        with open(manifest, 'r', encoding='utf-8') as f:
+            source_signature = json.load(f).get('source_signature')
+        fresh = manifest == model_path or source_signature == file_signature(model_path)
+        variant = select_artifact(manifest, quantize=quantize) if fresh else None
+        if variant is not None:
+            logger.info(f"Using exported {variant['name']} model ({variant['steady_ms']:.1f}ms steady-state)")
+            return variant['backend'], variant['path'], False
+        if manifest == model_path:
+            raise ValueError(f"{manifest} lists no exported variant that passed the parity check")
+        if not fresh:
+            logger.warning(f"{manifest} is older than {model_path}, re-run the export to use it")
+
+    name = BACKEND_EXTENSIONS.get(os.path.splitext(model_path)[1], TorchBackend.name)
+    return name, model_path, quantize
+
+
+def create_backend(name, model_path, quantize=False, num_threads=None):
+    """
+    Create a detector backend by name.
+
+    Args:
+        name: 'torch', 'torchscript', 'onnx' or 'auto' (the fastest exported
+            variant from the model's export manifest, else chosen from the
+            model file extension)
+        model_path: Path to the model file or export manifest
+        quantize: Use int8 dynamic quantization (ONNX backend, or the int8
+            variants of an export manifest)
+        num_threads: Optional number of intra-op threads
+
+    Returns:
+        DetectorBackend: Loaded backend
+    """
+    if name == 'auto':
+        name, model_path, quantize = resolve_model(model_path, quantize=quantize)
+
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown detector backend '{name}', expected one of {sorted(BACKENDS)}")
+
+    if name == OnnxBackend.name:
+        return OnnxBackend(model_path, quantize=quantize, num_threads=num_threads)
+
+    if quantize:
+        logger.warning("Quantization is only supported by the ONNX backend, ignoring.")
+    return BACKENDS[name](model_path, num_threads=num_threads)
@@ -0,0 +1,97 @@
+"""
+Array-backed container for detected form element boxes.
+"""
+
+from collections import namedtuple
+import numpy as np
+
+
+class Box(namedtuple('Box', ['class_id', 'name', 'score', 'x1', 'y1', 'x2', 'y2'])):
+    """A single detected box in screen coordinates."""
+    __slots__ = ()
+
+    @property
+    def center(self):
+        """Center point (x, y) of the box, rounded to whole pixels."""
+        return (int(round((self.x1 + self.x2) / 2)), int(round((self.y1 + self.y2) / 2)))
+
+
+class Detections:
+    def __init__(self, xyxy, scores, class_ids, names):
+        """
+        Initialize a set of detections.
+
+        Args:
+            xyxy: (N, 4) box corners
+            scores: (N,) confidence scores
+            class_ids: (N,) class indices into names
+            names: Sequence of class names
+        """
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        self.class_ids = np.asarray(class_ids, dtype=np.int32).reshape(-1)
+        self.names = list(names)
+
+    @classmethod
+    def empty(cls, names):
+        """Create a detection set without boxes."""
+        return cls(np.zeros((0, 4)), np.zeros(0), np.zeros(0), names)
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __getitem__(self, index):
+        """Select a subset of boxes with a slice, index array or boolean mask."""
+        return Detections(self.xyxy[index], self.scores[index], self.class_ids[index], self.names)
+
+    def __iter__(self):
+        for (x1, y1, x2, y2), score, class_id in zip(self.xyxy.tolist(), self.scores.tolist(), self.class_ids.tolist()):
+            yield Box(class_id, self.names[class_id], score, x1, y1, x2, y2)
+
+    def __repr__(self):
+        return f"Detections({len(self)} boxes)"
+
+    def class_id(self, name):
+        """Class index for a class name, or -1 if the detector does not know it."""
+        try:
+            return self.names.index(name)
+        except ValueError:
+            return -1
+
+    def offset(self, dx, dy):
+        """Return a copy with every box shifted by (dx, dy)."""
+        shift = np.array([dx, dy, dx, dy], dtype=np.float32)
+        return Detections(self.xyxy + shift, self.scores, self.class_ids, self.names)
+
+    def filter(self, min_score=0.0, classes=None):
+        """
+        Keep boxes above a confidence threshold and optionally of given classes.
+
+        Args:
+            min_score: Minimum confidence score
+            classes: Optional iterable of class names to keep
+
+        Returns:
+            Detections: Filtered detections
+        """
+        mask = self.scores >= min_score
+        if classes is not None:
+            mask &= np.isin(self.class_ids, [self.class_id(name) for name in classes])
+        return self[mask]
+
+    def sorted_by_position(self):
+        """Return boxes in reading order (top to bottom, then left to right)."""
+        return self[np.lexsort((self.xyxy[:, 0], self.xyxy[:, 1]))]
+
+    def best(self, name):
+        """Highest scoring box of a class, or None if there is none."""
+        indices = np.flatnonzero(self.class_ids == self.class_id(name))
+        if len(indices) == 0:
+            return None
+        i = indices[np.argmax(self.scores[indices])]
+        return next(iter(self[i:i + 1]))
+
+    def max_score(self, name):
+        """Highest confidence for a class, 0.0 if it was not detected."""
+        box = self.best(name)
+        return box.score if box is not None else 0.0
@@ -0,0 +1,73 @@
+"""
+Small CNN classifying cropped form elements.
+"""
+
+import torch
+from torch import nn
+
+
+class FormElementClassifier(nn.Module):
+    def __init__(self, num_classes=38, input_size=64):
+        """
+        Initialize the classifier.
+
+        Args:
+            num_classes: Number of element classes (see data.yaml)
+            input_size: Side of the square crops the model is trained on
+        """
+        super().__init__()
+        self.num_classes = num_classes
+        self.input_size = input_size
+        # Saved alongside the weights (e.g. which labels the model was trained on)
+        self.metadata = {}
+
+        def block(in_channels, out_channels):
+            return nn.Sequential(
+                nn.Conv2d(in_channels, out_channels, 3, padding=1, bias=False),
+                nn.BatchNorm2d(out_channels),
+                nn.ReLU(inplace=True),
+                nn.MaxPool2d(2)
+            )
+
+        self.features = nn.Sequential(
+            block(3, 32),
+            block(32, 64),
+            block(64, 128),
+            block(128, 256)
+        )
+        self.classifier = nn.Sequential(
+            nn.AdaptiveAvgPool2d(1),
+            nn.Flatten(),
+            nn.Dropout(0.2),
+            nn.Linear(256, num_classes)
+        )
+
+    def forward(self, x):
+        """
+        Args:
+            x: (N, 3, input_size, input_size) float tensor scaled to [0, 1]
+
+        Returns:
+            torch.Tensor: (N, num_classes) logits
+        """
+        return self.classifier(self.features(x))
+
+    def save_model(self, path):
+        """Save weights, architecture parameters and metadata."""
+        torch.save({
+            'state_dict': self.state_dict(),
+            'num_classes': self.num_classes,
+            'input_size': self.input_size,
+            'metadata': self.metadata
+        }, path)
+
+    def load_model(self, path):
+        """Load weights saved with save_model, rebuilding the head if needed."""
+        checkpoint = torch.load(path, map_location='cpu')
+        if checkpoint['num_classes'] != self.num_classes:
+            self.num_classes = checkpoint['num_classes']
+            self.classifier[-1] = nn.Linear(self.classifier[-1].in_features, self.num_classes)
+        self.input_size = checkpoint['input_size']
+        self.metadata = checkpoint.get('metadata', {})
+        self.load_state_dict(checkpoint['state_dict'])
+        return self
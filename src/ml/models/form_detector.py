@@ -0,0 +1,281 @@
+"""
+Form element detector running a trained YOLO model on window captures.
+"""
+
+import time
+import numpy as np
+from ...utils.logger import logger
+from ..data.dataset_config import DEFAULT_DATA_CONFIG, load_data_config
+from ..utils.image_ops import as_frame, letterbox, to_rgb_array
+from .backends import create_backend
+from .detections import Detections
+from .postprocess import batched_nms, class_thresholds, merge_cut_boxes, non_max_suppression, scale_boxes
+
+
+class FormElementDetector:
+    def __init__(self, backend='auto', img_size=640, conf_thres=0.25, iou_thres=0.45,
+                 max_det=300, class_names=None, quantize=False, num_threads=None,
+                 tile_size=640, tile_overlap=128, tile_batch_size=None,
+                 data_config=DEFAULT_DATA_CONFIG):
+        """
+        Initialize the form element detector.
+
+        Args:
+            backend: 'torch', 'torchscript', 'onnx' or 'auto' (the fastest exported variant
+                when an export manifest exists, else chosen from the model file extension)
+            img_size: Model input size
+            conf_thres: Default minimum confidence for a box to be returned; per-class
+                overrides are read from the optional 'conf_thres' mapping in data.yaml
+            iou_thres: IoU threshold for non-max suppression
+            max_det: Maximum number of boxes per image
+            class_names: Class names indexed by class id (defaults to data.yaml)
+            quantize: Use a dynamically int8-quantized model (ONNX backend)
+            num_threads: Optional number of CPU threads used for inference
+            tile_size: Side of the square tiles cut by predict_tiled, in image pixels
+            tile_overlap: Overlap between neighbouring tiles; elements larger than it are
+                reassembled from the pieces on either side of a seam
+            tile_batch_size: Max tiles per forward pass (None runs all tiles in one pass)
+            data_config: Path to data.yaml with class names and thresholds
+        """
+        self.backend_name = backend
+        self.img_size = img_size
+        self.conf_thres = conf_thres
+        self.iou_thres = iou_thres
+        self.max_det = max_det
+        config = load_data_config(data_config)
+        self.class_names = class_names or config['names']
+        self.class_conf_thres = class_thresholds(self.class_names, config.get('conf_thres'), conf_thres)
+        self.quantize = quantize
+        self.num_threads = num_threads
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.tile_batch_size = tile_batch_size
+        self.backend = None
+        self.last_tile_timings = []
+
+    def load_model(self, model_path):
+        """
+        Load trained weights into the configured backend.
+
+        Args:
+            model_path: Path to a .pt checkpoint, an exported .onnx/.torchscript model
+                or an export manifest (.export.json)
+        """
+        try:
+            start = time.perf_counter()
+            self.backend = create_backend(self.backend_name, model_path,
+                                          quantize=self.quantize, num_threads=self.num_threads)
+            logger.info(f"Detector loaded from {model_path} ({self.backend.name} backend, "
+                        f"{time.perf_counter() - start:.2f}s)")
+        except Exception as e:
+            logger.error(f"Error loading detector: {str(e)}")
+            raise
+
+    def eval(self):
+        """Backends always run in inference mode; kept for API compatibility."""
+        return self
+
+    def preprocess(self, image, auto=None):
+        """
+        Letterbox an image into a model input batch.
+
+        The full-size frame is only resized; channel conversion happens on
+        the small letterboxed image, so BGRA capture views are never copied.
+
+        Args:
+            image: PIL Image, HxWx3 RGB array or HxWx4 BGRA capture frame
+            auto: Pad only to the model stride (defaults to whether the backend
+                accepts dynamic shapes)
+
+        Returns:
+            tuple: (1x3xHxW float32 batch, scale ratio, padding, original (height, width))
+        """
+        if auto is None:
+            auto = self.backend.dynamic_shape
+        array = as_frame(image)
+        padded, ratio, pad = letterbox(array, self.img_size, auto=auto)
+        batch = np.ascontiguousarray(to_rgb_array(padded).transpose(2, 0, 1)[None], dtype=np.float32)
+        batch /= 255.0
+        return batch, ratio, pad, array.shape[:2]
+
+    def predict(self, image, offset=(0, 0)):
+        """
+        Detect form elements in an image.
+
+        Args:
+            image: PIL Image, HxWx3 RGB array or HxWx4 BGRA capture frame
+            offset: (x, y) added to every box, e.g. the window position on screen
+
+        Returns:
+            Detections: Boxes in image coordinates shifted by offset
+        """
+        if self.backend is None:
+            raise RuntimeError("No detector model loaded. Call load_model() first.")
+
+        start = time.perf_counter()
+        batch, ratio, pad, shape = self.preprocess(image)
+        preprocess_done = time.perf_counter()
+        prediction = self.backend.infer(batch)[0]
+        inference_done = time.perf_counter()
+
+        detections = self._postprocess(prediction, ratio, pad, shape, offset)
+
+        logger.debug(
+            f"Detected {len(detections)} elements in {(time.perf_counter() - start) * 1000:.1f}ms "
+            f"(inference {(inference_done - preprocess_done) * 1000:.1f}ms)"
+        )
+        return detections
+
+    def predict_batch(self, images, offsets=None):
+        """
+        Detect form elements in several images with one forward pass.
+
+        Images of the same size (e.g. identical worker windows) keep
+        stride-padded rectangular input; mixed sizes are padded to squares.
+
+        Args:
+            images: List of PIL Images or capture frames
+            offsets: Optional list of (x, y) offsets, one per image
+
+        Returns:
+            list: Detections for each image
+        """
+        if self.backend is None:
+            raise RuntimeError("No detector model loaded. Call load_model() first.")
+
+        offsets = offsets or [(0, 0)] * len(images)
+        start = time.perf_counter()
+        inputs = [self.preprocess(image) for image in images]
+        if len({batch.shape for batch, _, _, _ in inputs}) > 1:
+            inputs = [self.preprocess(image, auto=False) for image in images]
+        predictions = self.backend.infer(np.concatenate([batch for batch, _, _, _ in inputs]))
+
+        results = [
+            self._postprocess(prediction, ratio, pad, shape, offset)
+            for prediction, (_, ratio, pad, shape), offset in zip(predictions, inputs, offsets)
+        ]
+        logger.debug(f"Detected elements in {len(images)} images in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return results
+
+    def _postprocess(self, prediction, ratio, pad, shape, offset):
+        """Turn one raw prediction into Detections in offset image coordinates."""
+        boxes, scores, class_ids = non_max_suppression(
+            prediction, self.class_conf_thres, self.iou_thres, self.max_det
+        )
+        boxes = scale_boxes(boxes, ratio, pad, shape)
+        return Detections(boxes, scores, class_ids, self.class_names).offset(*offset)
+
+    def tile_origins(self, height, width):
+        """
+        Top-left corners of overlapping tiles covering an image.
+
+        Args:
+            height: Image height
+            width: Image width
+
+        Returns:
+            list: (x, y) tile origins, row by row
+        """
+        stride = max(self.tile_size - self.tile_overlap, 1)
+
+        def starts(length):
+            if length <= self.tile_size:
+                return [0]
+            positions = list(range(0, length - self.tile_size, stride))
+            positions.append(length - self.tile_size)
+            return positions
+
+        return [(x, y) for y in starts(height) for x in starts(width)]
+
+    def predict_tiled(self, image, offset=(0, 0)):
+        """
+        Detect form elements in a tall full-page capture by tiling it.
+
+        The page is cut into overlapping tiles at native resolution so small
+        widgets survive, the tiles are batched through the model, and boxes
+        are merged with cross-tile NMS. A box cut by an inner tile border is
+        dropped when a neighbouring tile has a complete copy of it; elements
+        larger than the overlap are reassembled from the pieces detected on
+        either side of the seam (postprocess.merge_cut_boxes). Per-tile
+        timings are kept in last_tile_timings.
+
+        Args:
+            image: PIL Image, HxWx3 RGB array or HxWx4 BGRA capture frame
+            offset: (x, y) added to every box
+
+        Returns:
+            Detections: Boxes in image coordinates shifted by offset
+        """
+        if self.backend is None:
+            raise RuntimeError("No detector model loaded. Call load_model() first.")
+
+        start = time.perf_counter()
+        array = as_frame(image)
+        height, width = array.shape[:2]
+        origins = self.tile_origins(height, width)
+
+        tiles = []
+        letterbox_params = []
+        preprocess_times = []
+        for x, y in origins:
+            tile_start = time.perf_counter()
+            tile = array[y:y + self.tile_size, x:x + self.tile_size]
+            padded, ratio, pad = letterbox(tile, self.img_size)
+            tiles.append(to_rgb_array(padded).transpose(2, 0, 1))
+            letterbox_params.append((ratio, pad, tile.shape[:2]))
+            preprocess_times.append(time.perf_counter() - tile_start)
+
+        batch_size = self.tile_batch_size or len(tiles)
+        predictions = []
+        inference_times = []
+        for i in range(0, len(tiles), batch_size):
+            chunk = np.stack(tiles[i:i + batch_size]).astype(np.float32)
+            chunk /= 255.0
+            batch_start = time.perf_counter()
+            predictions.extend(self.backend.infer(chunk))
+            inference_times.extend([(time.perf_counter() - batch_start) / len(chunk)] * len(chunk))
+
+        all_boxes, all_scores, all_class_ids, all_cuts = [], [], [], []
+        self.last_tile_timings = []
+        for (x, y), prediction, (ratio, pad, shape), preprocess_time, inference_time in zip(
+                origins, predictions, letterbox_params, preprocess_times, inference_times):
+            boxes, scores, class_ids = non_max_suppression(
+                prediction, self.class_conf_thres, self.iou_thres, self.max_det
+            )
+            boxes = scale_boxes(boxes, ratio, pad, shape)
+
+            # Flag sides truncated by a tile border that is not an image border
+            margin = 2
+            cuts = np.column_stack([
+                (boxes[:, 0] <= margin) & (x > 0),
+                (boxes[:, 1] <= margin) & (y > 0),
+                (boxes[:, 2] >= shape[1] - margin) & (x + shape[1] < width),
+                (boxes[:, 3] >= shape[0] - margin) & (y + shape[0] < height)
+            ]).reshape(-1, 4)
+
+            all_boxes.append(boxes + np.array([x, y, x, y], dtype=np.float32))
+            all_scores.append(scores)
+            all_class_ids.append(class_ids)
+            all_cuts.append(cuts)
+            self.last_tile_timings.append({
+                'origin': (x, y),
+                'preprocess_ms': preprocess_time * 1000,
+                'inference_ms': inference_time * 1000,
+                'boxes': len(boxes)
+            })
+
+        merge_start = time.perf_counter()
+        boxes, scores, class_ids = merge_cut_boxes(
+            np.concatenate(all_boxes), np.concatenate(all_scores), np.concatenate(all_class_ids),
+            np.concatenate(all_cuts)
+        )
+        keep = batched_nms(boxes, scores, class_ids, self.iou_thres)
+        detections = Detections(boxes[keep], scores[keep], class_ids[keep], self.class_names).offset(*offset)
+        merge_time = time.perf_counter() - merge_start
+
+        logger.debug(
+            f"Detected {len(detections)} elements in {len(origins)} tiles in "
+            f"{(time.perf_counter() - start) * 1000:.1f}ms "
+            f"(inference {sum(inference_times) * 1000:.1f}ms, merge {merge_time * 1000:.1f}ms)"
+        )
+        return detections
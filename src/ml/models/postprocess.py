@@ -0,0 +1,312 @@
+"""
+Vectorized post-processing of raw YOLO outputs into boxes.
+"""
+
+import numpy as np
+
+# Candidates beyond this many (by score) are dropped before NMS
+MAX_NMS_CANDIDATES = 30000
+
+# Upper bound on candidate box pairs examined at once by NMS
+MAX_PAIRS_PER_CHUNK = 4_000_000
+
+
+def xywh2xyxy(boxes):
+    """Convert (N, 4) center/size boxes to corner boxes."""
+    out = np.empty_like(boxes)
+    out[:, :2] = boxes[:, :2] - boxes[:, 2:] / 2
+    out[:, 2:] = boxes[:, :2] + boxes[:, 2:] / 2
+    return out
+
+
+def box_iou(boxes1, boxes2):
+    """
+    Pairwise IoU between two sets of boxes.
+
+    Args:
+        boxes1: (N, 4) xyxy boxes
+        boxes2: (M, 4) xyxy boxes
+
+    Returns:
+        numpy.ndarray: (N, M) IoU matrix
+    """
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    top_left = np.maximum(boxes1[:, None, :2], boxes2[None, :, :2])
+    bottom_right = np.minimum(boxes1[:, None, 2:], boxes2[None, :, 2:])
+    wh = np.clip(bottom_right - top_left, 0, None)
+    inter = wh[..., 0] * wh[..., 1]
+    return inter / (area1[:, None] + area2[None, :] - inter + 1e-7)
+
+
+def pair_iou(boxes1, boxes2):
+    """Element-wise IoU between two (N, 4) xyxy box arrays."""
+    wh = np.clip(np.minimum(boxes1[:, 2:], boxes2[:, 2:]) - np.maximum(boxes1[:, :2], boxes2[:, :2]), 0, None)
+    inter = wh[:, 0] * wh[:, 1]
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    return inter / (area1 + area2 - inter + 1e-7)
+
+
+def overlapping_pairs(boxes, iou_thres):
+    """
+    Find all box pairs whose IoU exceeds a threshold.
+
+    Boxes are swept along x: after sorting by x1, a box can only overlap the
+    boxes whose x1 falls before its own x2, so candidate pairs are expanded
+    from searchsorted ranges instead of a dense N x N matrix.
+
+    Args:
+        boxes: (N, 4) xyxy boxes
+        iou_thres: IoU threshold
+
+    Returns:
+        tuple: (first, second) index arrays of overlapping pairs
+    """
+    n = len(boxes)
+    order = np.argsort(boxes[:, 0], kind='stable')
+    sorted_boxes = boxes[order]
+    ends = np.searchsorted(sorted_boxes[:, 0], sorted_boxes[:, 2], side='left')
+    counts = np.maximum(ends - np.arange(1, n + 1), 0)
+    cumulative = np.cumsum(counts)
+
+    first, second = [], []
+    start = 0
+    while start < n:
+        budget = (cumulative[start - 1] if start else 0) + MAX_PAIRS_PER_CHUNK
+        stop = max(int(np.searchsorted(cumulative, budget, side='right')), start + 1)
+        chunk_counts = counts[start:stop]
+        a = np.repeat(np.arange(start, stop), chunk_counts)
+        b = a + 1 + np.arange(len(a)) - np.repeat(np.cumsum(chunk_counts) - chunk_counts, chunk_counts)
+        overlap = pair_iou(sorted_boxes[a], sorted_boxes[b]) > iou_thres
+        first.append(order[a[overlap]])
+        second.append(order[b[overlap]])
+        start = stop
+
+    return np.concatenate(first), np.concatenate(second)
+
+
+def nms(boxes, scores, iou_thres):
+    """
+    Exact greedy non-max suppression without a Python loop per box.
+
+    The overlap graph is built once (see overlapping_pairs) with every edge
+    pointing from the higher to the lower scoring box. Suppression is then
+    resolved with Cluster-NMS iterations: a box survives when no surviving
+    higher-scoring box overlaps it. The iteration converges to exactly the
+    result of traditional greedy NMS, usually in a handful of passes.
+
+    Args:
+        boxes: (N, 4) xyxy boxes
+        scores: (N,) scores
+        iou_thres: Boxes overlapping a kept box above this IoU are dropped
+
+    Returns:
+        numpy.ndarray: Indices of kept boxes, highest score first
+    """
+    order = np.argsort(-scores, kind='stable')
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+
+    a, b = overlapping_pairs(boxes, iou_thres)
+    higher = rank[a] < rank[b]
+    source = np.where(higher, a, b)
+    target = np.where(higher, b, a)
+
+    keep = np.ones(len(order), dtype=bool)
+    while True:
+        new_keep = np.ones(len(order), dtype=bool)
+        new_keep[target[keep[source]]] = False
+        if np.array_equal(new_keep, keep):
+            break
+        keep = new_keep
+
+    return order[keep[order]]
+
+
+def batched_nms(boxes, scores, class_ids, iou_thres):
+    """
+    Class-aware non-max suppression in a single pass.
+
+    Boxes are shifted by a per-class offset larger than any coordinate so
+    boxes of different classes can never overlap.
+
+    Returns:
+        numpy.ndarray: Indices of kept boxes, highest score first
+    """
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    # float64 keeps IoU exact after shifting by large per-class offsets
+    boxes = boxes.astype(np.float64)
+    offsets = class_ids[:, None] * (boxes.max() + 1)
+    return nms(boxes + offsets, scores, iou_thres)
+
+
+def merge_cut_boxes(boxes, scores, class_ids, cuts, containment=0.5, min_overlap=0.5):
+    """
+    Reassemble boxes cut by the inner borders of overlapping tiles.
+
+    A cut box is dropped when a complete box of the same class (from a
+    neighbouring tile) covers it. The other cut boxes of the same class that
+    overlap across a seam cutting at least one of them, and line up along
+    it (or lie mostly inside one another), are joined into their union, repeatedly, so elements spanning several tiles
+    come out whole. Run NMS on the result.
+
+    Args:
+        boxes: (N, 4) xyxy boxes in image coordinates
+        scores: (N,) confidences
+        class_ids: (N,) class ids
+        cuts: (N, 4) bools, True where the left, top, right or bottom side of
+            a box lies on an inner tile border
+        containment: Share of a cut box a complete box must cover to replace it
+        min_overlap: 1D IoU along the seam for two cut boxes to be joined
+
+    Returns:
+        tuple: (boxes, scores, class_ids) with cut boxes dropped or joined
+    """
+    cut = cuts.any(axis=1)
+    if not cut.any():
+        return boxes, scores, class_ids
+
+    keep = ~cut
+    cut_idx = np.flatnonzero(cut)
+    if keep.any():
+        complete = boxes[keep]
+        top_left = np.maximum(boxes[cut_idx, None, :2], complete[None, :, :2])
+        bottom_right = np.minimum(boxes[cut_idx, None, 2:], complete[None, :, 2:])
+        wh = np.clip(bottom_right - top_left, 0, None)
+        area = (boxes[cut_idx, 2] - boxes[cut_idx, 0]) * (boxes[cut_idx, 3] - boxes[cut_idx, 1])
+        covered = wh[..., 0] * wh[..., 1] >= containment * (area[:, None] + 1e-7)
+        covered &= class_ids[cut_idx, None] == class_ids[keep][None, :]
+        cut_idx = cut_idx[~covered.any(axis=1)]
+
+    # [box, score, class id, cuts] of every remaining cut box
+    parts = [[boxes[i].astype(np.float32), float(scores[i]), class_ids[i], cuts[i].copy()] for i in cut_idx]
+    joined = True
+    while joined:
+        joined = False
+        for i in range(len(parts)):
+            for j in range(i + 1, len(parts)):
+                if _seam_neighbours(parts[i], parts[j], containment, min_overlap):
+                    parts[i] = _join_parts(parts[i], parts.pop(j))
+                    joined = True
+                    break
+            if joined:
+                break
+
+    if not parts:
+        return boxes[keep], scores[keep], class_ids[keep]
+    return (
+        np.concatenate([boxes[keep], np.stack([part[0] for part in parts])]).astype(boxes.dtype),
+        np.concatenate([scores[keep], np.array([part[1] for part in parts], dtype=scores.dtype)]),
+        np.concatenate([class_ids[keep], np.array([part[2] for part in parts], dtype=class_ids.dtype)])
+    )
+
+
+def _range_iou(a0, a1, b0, b1):
+    inter = max(0.0, min(a1, b1) - max(a0, b0))
+    return inter / (max(a1, b1) - min(a0, b0) + 1e-7)
+
+
+def _seam_neighbours(a, b, containment, min_overlap):
+    """Whether two cut boxes are pieces of one element meeting across a seam."""
+    (box_a, _, cls_a, cuts_a), (box_b, _, cls_b, cuts_b) = a, b
+    if cls_a != cls_b:
+        return False
+    # A piece mostly inside an already reassembled box belongs to it
+    wh = np.clip(np.minimum(box_a[2:], box_b[2:]) - np.maximum(box_a[:2], box_b[:2]), 0, None)
+    smaller = min(np.prod(box_a[2:] - box_a[:2]), np.prod(box_b[2:] - box_b[:2]))
+    if wh[0] * wh[1] >= containment * (smaller + 1e-7):
+        return True
+    for axis in (0, 1):
+        lo, hi = axis, axis + 2
+        other = 1 - axis
+        if box_a[lo] > box_b[lo]:
+            box_a, box_b, cuts_a, cuts_b = box_b, box_a, cuts_b, cuts_a
+        # The pieces overlap across a seam that cuts at least one of them
+        if ((cuts_a[hi] or cuts_b[lo]) and box_b[lo] < box_a[hi]
+                and _range_iou(box_a[other], box_a[other + 2], box_b[other], box_b[other + 2]) >= min_overlap):
+            return True
+    return False
+
+
+def _join_parts(a, b):
+    """Union of two pieces; each side keeps the cut flag of the piece providing it."""
+    box = np.concatenate([np.minimum(a[0][:2], b[0][:2]), np.maximum(a[0][2:], b[0][2:])])
+    cuts = np.empty(4, dtype=bool)
+    for side in range(4):
+        pick_a = a[0][side] <= b[0][side] if side < 2 else a[0][side] >= b[0][side]
+        cuts[side] = a[3][side] if pick_a else b[3][side]
+    return [box, max(a[1], b[1]), a[2], cuts]
+
+
+def non_max_suppression(prediction, conf_thres=0.25, iou_thres=0.45, max_det=300):
+    """
+    Filter raw YOLO predictions for one image.
+
+    Args:
+        prediction: (N, 5 + nc) array of [x, y, w, h, objectness, class scores...]
+        conf_thres: Minimum objectness * class score, either one value or an
+            (nc,) array of per-class thresholds
+        iou_thres: IoU threshold for class-aware NMS
+        max_det: Maximum number of boxes returned
+
+    Returns:
+        tuple: (xyxy boxes, scores, class ids)
+    """
+    conf_thres = np.asarray(conf_thres, dtype=np.float32)
+    prediction = prediction[prediction[:, 4] > conf_thres.min()]
+
+    class_scores = prediction[:, 5:] * prediction[:, 4:5]
+    class_ids = class_scores.argmax(axis=1)
+    scores = np.take_along_axis(class_scores, class_ids[:, None], axis=1)[:, 0]
+
+    mask = scores > (conf_thres[class_ids] if conf_thres.ndim else conf_thres)
+    boxes = xywh2xyxy(prediction[mask, :4])
+    scores, class_ids = scores[mask], class_ids[mask]
+
+    if len(scores) > MAX_NMS_CANDIDATES:
+        top = np.argpartition(-scores, MAX_NMS_CANDIDATES)[:MAX_NMS_CANDIDATES]
+        boxes, scores, class_ids = boxes[top], scores[top], class_ids[top]
+
+    keep = batched_nms(boxes, scores, class_ids, iou_thres)[:max_det]
+    return boxes[keep], scores[keep], class_ids[keep]
+
+
+def scale_boxes(boxes, ratio, pad, image_shape):
+    """
+    Map boxes from letterboxed model input back to the original image.
+
+    Args:
+        boxes: (N, 4) xyxy boxes in model input coordinates
+        ratio: Scale ratio used by letterbox
+        pad: (pad_left, pad_top) used by letterbox
+        image_shape: (height, width) of the original image
+
+    Returns:
+        numpy.ndarray: Boxes in original image coordinates
+    """
+    boxes = (boxes - np.array([pad[0], pad[1], pad[0], pad[1]], dtype=boxes.dtype)) / ratio
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, image_shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, image_shape[0])
+    return boxes
+
+
+def class_thresholds(class_names, thresholds=None, default=0.25):
+    """
+    Build a per-class confidence threshold array.
+
+    Args:
+        class_names: Class names indexed by class id (see data.yaml)
+        thresholds: Optional mapping of class name to threshold
+        default: Threshold for classes not in the mapping
+
+    Returns:
+        numpy.ndarray: (nc,) float32 thresholds
+    """
+    values = np.full(len(class_names), default, dtype=np.float32)
+    for name, value in (thresholds or {}).items():
+        if name not in class_names:
+            raise ValueError(f"Unknown class '{name}' in confidence thresholds")
+        values[class_names.index(name)] = value
+    return values
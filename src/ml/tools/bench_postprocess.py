@@ -0,0 +1,85 @@
+"""
+Benchmark NumPy post-processing against torchvision's NMS.
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from src.ml.models.postprocess import batched_nms
+
+
+def make_candidates(num_boxes, num_classes, clustered, seed=0):
+    """
+    Generate random candidate boxes on a 1904x985 capture.
+
+    Args:
+        num_boxes: Number of candidates
+        num_classes: Number of classes
+        clustered: Draw boxes around a few centers (heavy overlap) instead of uniformly
+        seed: Random seed
+
+    Returns:
+        tuple: (xyxy boxes, scores, class ids)
+    """
+    rng = np.random.default_rng(seed)
+    if clustered:
+        centers = rng.uniform((0, 0), (1904, 985), (num_boxes // 200 + 1, 2))
+        xy = centers[rng.integers(0, len(centers), num_boxes)] + rng.normal(0, 8, (num_boxes, 2))
+        wh = rng.uniform(30, 60, (num_boxes, 2))
+    else:
+        xy = rng.uniform((0, 0), (1904, 985), (num_boxes, 2))
+        wh = rng.uniform(10, 200, (num_boxes, 2))
+    boxes = np.concatenate([xy, xy + wh], axis=1).astype(np.float32)
+    scores = rng.random(num_boxes).astype(np.float32)
+    class_ids = rng.integers(0, num_classes, num_boxes)
+    return boxes, scores, class_ids
+
+
+def time_call(fn, repeats):
+    """Median wall time of fn() in milliseconds, plus its last result."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times)), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark NMS implementations')
+    parser.add_argument('--num-boxes', type=int, default=10000, help='Number of candidate boxes')
+    parser.add_argument('--num-classes', type=int, default=38, help='Number of classes')
+    parser.add_argument('--iou-thres', type=float, default=0.45, help='NMS IoU threshold')
+    parser.add_argument('--repeats', type=int, default=10, help='Timed repetitions per case')
+    args = parser.parse_args()
+
+    try:
+        import torch
+        from torchvision.ops import batched_nms as torchvision_batched_nms
+    except ImportError:
+        torch = None
+        print("torchvision not available, timing the NumPy implementation only")
+
+    for clustered in (False, True):
+        boxes, scores, class_ids = make_candidates(args.num_boxes, args.num_classes, clustered)
+        numpy_ms, keep = time_call(lambda: batched_nms(boxes, scores, class_ids, args.iou_thres), args.repeats)
+
+        print(f"\n{'clustered' if clustered else 'uniform'} candidates: {args.num_boxes}")
+        print(f"  numpy       {numpy_ms:8.2f} ms  kept {len(keep)}")
+
+        if torch is not None:
+            tensors = (torch.from_numpy(boxes), torch.from_numpy(scores), torch.from_numpy(class_ids))
+            torch_ms, torch_keep = time_call(
+                lambda: torchvision_batched_nms(*tensors, args.iou_thres), args.repeats
+            )
+            agree = np.array_equal(np.sort(keep), np.sort(torch_keep.numpy()))
+            print(f"  torchvision {torch_ms:8.2f} ms  kept {len(torch_keep)}  identical: {agree}")
+
+
+if __name__ == "__main__":
+    main()
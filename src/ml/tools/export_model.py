@@ -0,0 +1,401 @@
+"""
+Export a trained model to TorchScript and ONNX and benchmark every variant.
+
+The checkpoint (a YOLOv5 detector or a crop classifier saved by
+ModelTrainer) is exported as fp32 and int8 TorchScript and ONNX files next
+to it. Each variant is run on held-out screenshots (data/val.txt when it
+exists; otherwise the first images, with a warning and "held_out": false
+in the manifest) and compared with the eager model: detectors must produce
+the same boxes after NMS, classifiers the same top-1 class, on at least
+--min-agreement of the outputs.
+
+Load time is measured in a fresh interpreter, so it includes importing
+torch or onnxruntime; first-inference and steady-state latency are
+measured on the first held-out input. The results are written to
+<checkpoint>.export.json, from which the 'auto' detector backend picks the
+fastest variant that passed the parity check.
+
+int8 TorchScript uses dynamic quantization, which only covers Linear
+layers; it is skipped for models without any (e.g. YOLOv5). int8 ONNX is
+quantized with ONNX Runtime and covers convolutions as well.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+import numpy as np
+import torch
+from PIL import Image
+from torch import nn
+
+# Add the project root to the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(PROJECT_ROOT)
+
+from src.utils.logger import logger
+from src.ml.data.form_dataset import IMAGE_EXTENSIONS, FormElementDataset, read_image_list
+from src.ml.models.backends import (DetectorBackend, OnnxBackend, TorchBackend, TorchScriptBackend,
+                                    detector_model, file_signature, load_checkpoint, manifest_path,
+                                    quantize_onnx_model)
+from src.ml.models.form_classifier import FormElementClassifier
+from src.ml.models.postprocess import non_max_suppression
+from src.ml.training.metrics import match_detections
+from src.ml.utils.image_ops import letterbox, to_rgb_array
+
+MANIFEST_VERSION = 1
+
+FORMATS = ('torchscript', 'onnx')
+
+# Run in a fresh interpreter: argv = project root, kind, backend, model path, input shape
+LOAD_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+import numpy as np
+kind, backend, path, shape = sys.argv[2], sys.argv[3], sys.argv[4], json.loads(sys.argv[5])
+if kind == 'classifier' and backend == 'torch':
+    from src.ml.tools.export_model import ClassifierBackend as Backend
+else:
+    from src.ml.models.backends import BACKENDS
+    Backend = BACKENDS[backend]
+model = Backend(path)
+loaded = time.perf_counter()
+model.infer(np.zeros(shape, dtype=np.float32))
+print(json.dumps({'load_ms': (loaded - start) * 1000, 'first_ms': (time.perf_counter() - loaded) * 1000}))
+"""
+
+
+class ClassifierBackend(DetectorBackend):
+    """Eager crop classifier behind the backend interface."""
+
+    name = 'torch'
+
+    def __init__(self, model_path, num_threads=None):
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.model = FormElementClassifier().load_model(model_path).eval()
+
+    def infer(self, batch):
+        with torch.inference_mode():
+            return self.model(torch.from_numpy(batch)).numpy()
+
+
+def load_eager_model(model_path):
+    """
+    Load a checkpoint as an eval-mode module.
+
+    Returns:
+        tuple: ('detector' or 'classifier', model)
+    """
+    checkpoint = load_checkpoint(model_path)
+    if isinstance(checkpoint, dict) and 'state_dict' in checkpoint:
+        model = FormElementClassifier(num_classes=checkpoint['num_classes'], input_size=checkpoint['input_size'])
+        model.load_state_dict(checkpoint['state_dict'])
+        return 'classifier', model.eval()
+
+    model = detector_model(checkpoint)
+    # Detect layers return only the concatenated predictions when exporting
+    for module in model.modules():
+        if hasattr(module, 'export'):
+            module.export = True
+    return 'detector', model
+
+
+def held_out_images(data_dir, image_list=None, num_images=8):
+    """
+    Screenshots used for the parity check and benchmark.
+
+    Args:
+        data_dir: Directory containing images/
+        image_list: Optional split list (defaults to data_dir/val.txt, else every image)
+        num_images: Maximum number of images
+
+    Returns:
+        tuple: (image file names, split list used or None when the images
+                are not held out from training)
+    """
+    if image_list is None and os.path.exists(os.path.join(data_dir, 'val.txt')):
+        image_list = os.path.join(data_dir, 'val.txt')
+    if image_list is not None:
+        names = read_image_list(image_list)
+    else:
+        logger.warning(f"No {os.path.join(data_dir, 'val.txt')}, checking parity on the first {num_images} "
+                       f"images, which may have been trained on")
+        names = sorted(f for f in os.listdir(os.path.join(data_dir, 'images'))
+                       if f.lower().endswith(IMAGE_EXTENSIONS))
+    if not names:
+        raise ValueError(f"No held-out images found in {data_dir}")
+    return names[:num_images], image_list
+
+
+def detector_inputs(data_dir, names, img_size):
+    """One letterboxed (1, 3, img_size, img_size) batch per screenshot."""
+    inputs = []
+    for name in names:
+        with Image.open(os.path.join(data_dir, 'images', name)) as image:
+            array = np.asarray(image.convert('RGB'))
+        padded, _, _ = letterbox(array, img_size)
+        batch = np.ascontiguousarray(to_rgb_array(padded).transpose(2, 0, 1)[None], dtype=np.float32)
+        inputs.append(batch / 255.0)
+    return inputs
+
+
+def classifier_inputs(data_dir, names, crop_size, batch_size=32):
+    """Batches of element crops cut from the screenshots' labelled boxes."""
+    dataset = FormElementDataset(data_dir, crop_size=crop_size, shuffle=False, image_names=names)
+    if len(dataset) == 0:
+        raise ValueError(f"No labelled elements in the held-out images of {data_dir}")
+    crops = np.stack([crop.numpy() for crop, _ in dataset]).astype(np.float32) / 255.0
+    return [crops[i:i + batch_size] for i in range(0, len(crops), batch_size)]
+
+
+def export_torchscript(model, example, path, config, int8=False):
+    """
+    Trace a model to TorchScript.
+
+    Args:
+        model: Eval-mode module
+        example: Example input tensor fixing the traced shape
+        path: Output .torchscript file
+        config: Dict stored as config.txt inside the archive (read by TorchScriptBackend)
+        int8: Dynamically quantize Linear layers first
+
+    Returns:
+        str: path, or None when int8 was requested for a model without Linear layers
+    """
+    if int8:
+        if not any(isinstance(m, nn.Linear) for m in model.modules()):
+            return None
+        model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    with torch.no_grad():
+        traced = torch.jit.freeze(torch.jit.trace(model, example, strict=False))
+    traced.save(path, _extra_files={'config.txt': json.dumps(config)})
+    return path
+
+
+def export_onnx(model, example, path, dynamic_batch, opset=12):
+    """Export a model to ONNX with a fixed (or batch-dynamic) input shape."""
+    dynamic_axes = {'images': {0: 'batch'}, 'output0': {0: 'batch'}} if dynamic_batch else None
+    torch.onnx.export(model, example, path, opset_version=opset, do_constant_folding=True,
+                      input_names=['images'], output_names=['output0'], dynamic_axes=dynamic_axes)
+    return path
+
+
+def detection_agreement(reference, outputs, conf_thres=0.25, iou_thres=0.45):
+    """
+    Share of boxes two detectors agree on after NMS (matching class, IoU >= 0.5).
+
+    Returns:
+        float: 2 * matches / (reference boxes + variant boxes), 1.0 when both find nothing
+    """
+    matches = 0
+    total = 0
+    for expected, actual in zip(reference, outputs):
+        expected_boxes, _, expected_classes = non_max_suppression(expected[0], conf_thres, iou_thres)
+        actual_boxes, _, actual_classes = non_max_suppression(actual[0], conf_thres, iou_thres)
+        correct = match_detections(actual_boxes, actual_classes, expected_boxes, expected_classes,
+                                   iou_thresholds=[0.5])
+        matches += 2 * int(correct.sum())
+        total += len(expected_boxes) + len(actual_boxes)
+    return matches / total if total else 1.0
+
+
+def class_agreement(reference, outputs):
+    """Share of crops given the same top-1 class."""
+    expected = np.concatenate([output.argmax(axis=1) for output in reference])
+    actual = np.concatenate([output.argmax(axis=1) for output in outputs])
+    return float(np.mean(expected == actual))
+
+
+def measure_load(kind, backend, path, shape):
+    """Load time and first-inference latency in a fresh interpreter, in milliseconds."""
+    result = subprocess.run(
+        [sys.executable, '-c', LOAD_PROBE, PROJECT_ROOT, kind, backend, path, json.dumps(shape)],
+        capture_output=True, text=True, check=True
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    return {key: round(value, 2) for key, value in timings.items()}
+
+
+def benchmark(model, inputs, repeats):
+    """
+    Run every input once and time repeated inference on the first one.
+
+    Returns:
+        tuple: (outputs, median steady-state latency in milliseconds)
+    """
+    outputs = [model.infer(batch) for batch in inputs]
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.infer(inputs[0])
+        times.append((time.perf_counter() - start) * 1000)
+    return outputs, round(float(np.median(times)), 3)
+
+
+def export_model(model_path, data_dir='data', output_dir=None, image_list=None, num_images=8, img_size=640,
+                 formats=FORMATS, int8=True, repeats=20, min_agreement=0.95, opset=12, num_threads=None):
+    """
+    Export a checkpoint, check parity of every variant and write the manifest.
+
+    Args:
+        model_path: Trained .pt checkpoint (detector or crop classifier)
+        data_dir: Directory containing images/ (and labels/ for classifiers)
+        output_dir: Directory receiving the artifacts (defaults to the checkpoint's)
+        image_list: Optional split list of held-out images
+        num_images: Held-out screenshots used for parity and benchmarks
+        img_size: Detector input size
+        formats: Export formats ('torchscript', 'onnx')
+        int8: Also export int8 variants
+        repeats: Timed runs for the steady-state latency
+        min_agreement: Minimum output agreement with the eager model for a variant to pass
+        opset: ONNX opset version
+        num_threads: Optional number of intra-op threads while benchmarking
+
+    Returns:
+        dict: The manifest
+    """
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    output_dir = output_dir or os.path.dirname(os.path.abspath(model_path))
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_file = manifest_path(model_path)
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_file))
+    stem = os.path.join(output_dir, os.path.splitext(os.path.basename(model_path))[0])
+
+    kind, model = load_eager_model(model_path)
+    names, split = held_out_images(data_dir, image_list, num_images)
+    if kind == 'detector':
+        inputs = detector_inputs(data_dir, names, img_size)
+        reference_backend = TorchBackend(model_path, num_threads=num_threads)
+        agreement_fn = detection_agreement
+    else:
+        inputs = classifier_inputs(data_dir, names, model.input_size)
+        reference_backend = ClassifierBackend(model_path, num_threads=num_threads)
+        agreement_fn = class_agreement
+
+    example = torch.from_numpy(inputs[0])
+    dynamic_batch = kind == 'classifier'
+    config = {'kind': kind, 'input_shape': list(example.shape), 'dynamic_shape': False,
+              'dynamic_batch': dynamic_batch}
+
+    variants = [('torch-fp32', TorchBackend.name, False, lambda: os.path.abspath(model_path))]
+    if 'torchscript' in formats:
+        variants.append(('torchscript-fp32', TorchScriptBackend.name, False,
+                         lambda: export_torchscript(model, example, stem + '.torchscript', config)))
+        if int8:
+            variants.append(('torchscript-int8', TorchScriptBackend.name, True,
+                             lambda: export_torchscript(model, example, stem + '.int8.torchscript', config,
+                                                        int8=True)))
+    if 'onnx' in formats:
+        variants.append(('onnx-fp32', OnnxBackend.name, False,
+                         lambda: export_onnx(model, example, stem + '.onnx', dynamic_batch, opset=opset)))
+        if int8:
+            variants.append(('onnx-int8', OnnxBackend.name, True, lambda: quantize_onnx_model(stem + '.onnx')))
+
+    reference, _ = benchmark(reference_backend, inputs, 1)
+    results = []
+    for name, backend, quantized, export in variants:
+        entry = {'name': name, 'backend': backend, 'int8': quantized, 'passed': False}
+        results.append(entry)
+        try:
+            path = export()
+            if path is None:
+                entry['skipped'] = 'no Linear layers to quantize dynamically'
+                print(f"{name:<18} skipped: {entry['skipped']}")
+                continue
+            entry['path'] = os.path.relpath(path, manifest_dir)
+            entry['size_mb'] = round(os.path.getsize(path) / (1024 * 1024), 2)
+
+            entry.update(measure_load(kind, backend, path, config['input_shape']))
+            if backend == TorchBackend.name:
+                runner = reference_backend
+            else:
+                runner = TorchScriptBackend(path) if backend == TorchScriptBackend.name else OnnxBackend(path)
+            outputs, entry['steady_ms'] = benchmark(runner, inputs, repeats)
+            entry['max_abs_diff'] = float(max(np.abs(a - b).max() for a, b in zip(reference, outputs)))
+            entry['agreement'] = agreement_fn(reference, outputs)
+            entry['passed'] = entry['agreement'] >= min_agreement
+        except Exception as e:
+            entry['error'] = str(e)
+            print(f"{name:<18} failed: {str(e)}")
+            continue
+
+        print(f"{name:<18} load {entry['load_ms']:8.1f}ms  first {entry['first_ms']:8.1f}ms  "
+              f"steady {entry['steady_ms']:8.2f}ms  agreement {entry['agreement']:.3f}  "
+              f"max diff {entry['max_abs_diff']:.2e}  {'ok' if entry['passed'] else 'FAILED'}")
+
+    passed = [entry for entry in results if entry['passed']]
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'source': os.path.relpath(os.path.abspath(model_path), manifest_dir),
+        'source_signature': file_signature(model_path),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'kind': kind,
+        'input_shape': config['input_shape'],
+        'parity': {'images': names, 'held_out': split is not None,
+                   'split': os.path.relpath(os.path.abspath(split), manifest_dir) if split else None,
+                   'min_agreement': min_agreement, 'repeats': repeats},
+        'fastest': min(passed, key=lambda entry: entry['steady_ms'])['name'] if passed else None,
+        'variants': results
+    }
+    tmp_path = manifest_file + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_file)
+    return manifest
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Export a trained model to TorchScript/ONNX and benchmark it')
+    parser.add_argument('model', help='Trained .pt checkpoint (YOLOv5 detector or crop classifier)')
+    parser.add_argument('--data-dir', default='data',
+                        help='Directory containing images/ and labels/')
+    parser.add_argument('--output-dir', default=None,
+                        help='Directory receiving the exported models (defaults to the checkpoint directory)')
+    parser.add_argument('--image-list', default=None,
+                        help='Held-out images for the parity check (defaults to <data-dir>/val.txt)')
+    parser.add_argument('--num-images', type=int, default=8,
+                        help='Held-out screenshots used for parity and benchmarks')
+    parser.add_argument('--img-size', type=int, default=640,
+                        help='Detector input size')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS),
+                        help='Formats to export')
+    parser.add_argument('--no-int8', action='store_true',
+                        help='Skip the int8 variants')
+    parser.add_argument('--repeats', type=int, default=20,
+                        help='Timed runs for the steady-state latency')
+    parser.add_argument('--min-agreement', type=float, default=0.95,
+                        help='Minimum agreement with the eager model for a variant to pass')
+    parser.add_argument('--opset', type=int, default=12,
+                        help='ONNX opset version')
+    parser.add_argument('--threads', type=int, default=None,
+                        help='Intra-op threads while benchmarking')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    manifest = export_model(
+        args.model,
+        data_dir=args.data_dir,
+        output_dir=args.output_dir,
+        image_list=args.image_list,
+        num_images=args.num_images,
+        img_size=args.img_size,
+        formats=args.formats,
+        int8=not args.no_int8,
+        repeats=args.repeats,
+        min_agreement=args.min_agreement,
+        opset=args.opset,
+        num_threads=args.threads
+    )
+    print(f"Manifest written to {manifest_path(args.model)}; fastest: {manifest['fastest']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,302 @@
 """
 Interactive tool for labeling UI screenshots.
+
+The decoded screenshot is kept in memory together with a pyramid of
+half-size copies. Only the part of the page visible in the canvas is
+resampled, from the smallest pyramid level that is still at least as large
+as the current zoom, so zooming and scrolling tall captures stays cheap.
+Boxes are separate canvas items drawn over the image.
+
+Screenshots next to the current one are decoded (and their pyramids built)
+on a small thread pool ahead of time and kept in an LRU, so moving to the
+next or previous image does not wait on PNG decoding.
+
+Labels are read from the image's label file itself, not from the label
+index, which drops invalid rows. Rows the tool cannot show (unknown class,
+box outside the image, malformed line) are kept verbatim and written back
+unchanged with the boxes on every save.
+
+With --model, a detector runs on a background thread (current image first,
+then the rest of the folder) and its boxes are shown as dashed proposals:
+right-click accepts one, Ctrl+right-click accepts it with the selected
+class, Shift+right-click rejects it, and the Proposals buttons accept or
+reject all of them. Rejections are remembered, so a rejected proposal is not
+offered again. Proposals are cached in data/proposals.json; precompute them
+for a whole folder with src/ml/data/proposal_cache.py.
+
+Dragging the border or a corner of any box, e.g. a just accepted proposal,
+resizes it.
+
+Labels are saved automatically shortly after the last edit and before
+moving to another image. Files are written to a temporary file and renamed
+into place by a background writer, which also updates the label index in
+memory and rewrites its file every few saves and on close (training
+re-parses any label file newer than the index). Every edit is appended to
+data/labels.journal first; edits that never reached a label file (e.g.
+after a crash) are replayed on the next start.
 """
 
 import os
+import queue
+import sys
 import json
+import threading
 import tkinter as tk
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk
+import numpy as np
 from PIL import Image, ImageTk
 import argparse
 from datetime import datetime
 
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from src.ml.data.label_index import LabelIndex, parse_label_lines
+from src.ml.data.proposal_cache import ProposalCache, detect_proposals
+from src.ml.models.postprocess import box_iou, xywh2xyxy
+from src.utils.logger import logger
+
+# Zoom limits
+MIN_ZOOM = 0.05
+MAX_ZOOM = 8.0
+
+# Pyramid levels stop once the longer side would drop below this many pixels
+PYRAMID_MIN_SIZE = 256
+
+# Images decoded ahead of and behind the current one
+PREFETCH_AHEAD = 2
+PREFETCH_BEHIND = 1
+
+# Milliseconds between checks for finished background proposals
+PROPOSAL_POLL_MS = 200
+
+# Finished proposals written to the cache between saves
+PROPOSAL_SAVE_EVERY = 20
+
+# Proposals overlapping a labelled box of the same class this much are hidden
+PROPOSAL_DUPLICATE_IOU = 0.5
+
+# Canvas pixels from a box border within which a drag resizes the box
+EDGE_GRAB_PX = 5
+
+# Milliseconds without edits before the labels are saved
+AUTOSAVE_DELAY_MS = 1500
+
+# Label files written between saves of the label index
+INDEX_SAVE_EVERY = 20
+
+
+def write_label_file(path, boxes, kept_lines=()):
+    """
+    Write YOLO labels atomically (an empty list marks an image without elements).
+
+    Args:
+        path: Label .txt file
+        boxes: (class_idx, x_center, y_center, width, height) tuples
+        kept_lines: Rows the tool could not parse, written back verbatim
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        for class_idx, x_center, y_center, width, height in boxes:
+            f.write(f"{class_idx} {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}\n")
+        for line in kept_lines:
+            f.write(line + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class LabelJournal:
+    """Append-only log of the box list after every edit, replayed after a crash."""
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Journal file (JSON lines)
+        """
+        self.path = path
+        # Number of the last appended edit
+        self.seq = 0
+        self._lock = threading.Lock()
+
+    def append(self, stem, boxes, kept_lines=()):
+        """Durably record the boxes (and unparsed rows) of an image after an edit."""
+        with self._lock:
+            self.seq += 1
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'seq': self.seq, 'image': stem, 'boxes': [list(box) for box in boxes],
+                                    'kept': list(kept_lines)}) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def pending(self):
+        """Last recorded (boxes, kept lines) of every image in the journal."""
+        boxes = {}
+        if not os.path.exists(self.path):
+            return boxes
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn last line from a crash mid-write
+                    continue
+                boxes[entry['image']] = ([tuple(box) for box in entry['boxes']], entry.get('kept', []))
+        return boxes
+
+    def clear(self, seq=None):
+        """Empty the journal, unless edits newer than seq have been appended since."""
+        with self._lock:
+            if seq is not None and seq != self.seq:
+                return
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+def build_pyramid(image):
+    """
+    Successively halved copies of an image.
+
+    Args:
+        image: Decoded RGB PIL Image
+
+    Returns:
+        list: (scale, image) pairs from full size (scale 1.0) down
+    """
+    levels = [(1.0, image)]
+    while max(levels[-1][1].size) // 2 >= PYRAMID_MIN_SIZE:
+        scale, level = levels[-1]
+        levels.append((scale / 2, level.reduce(2)))
+    return levels
+
+
+def decode_image(path):
+    """Decode a screenshot to RGB and build its pyramid (runs on prefetch threads)."""
+    with Image.open(path) as image:
+        image = image.convert('RGB')
+    return image, build_pyramid(image)
+
+
+class ImagePrefetcher:
+    """LRU of decoded screenshots filled by a background thread pool."""
+
+    def __init__(self, load_fn, capacity=PREFETCH_AHEAD + PREFETCH_BEHIND + 2, workers=2):
+        """
+        Args:
+            load_fn: callable(key) -> decoded value, run on a worker thread
+            capacity: Number of decoded images kept
+            workers: Decoding threads (PIL releases the GIL while decoding)
+        """
+        self.load_fn = load_fn
+        self.capacity = capacity
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch')
+        # key -> Future, least recently used first
+        self._cache = OrderedDict()
+
+    def _submit(self, key):
+        future = self._cache.get(key)
+        if future is None:
+            future = self._cache[key] = self.executor.submit(self.load_fn, key)
+        self._cache.move_to_end(key)
+        return future
+
+    def get(self, key):
+        """Decoded value for key, waiting only if it has not been prefetched."""
+        return self._submit(key).result()
+
+    def prefetch(self, keys):
+        """Start decoding keys in the background and evict the least recently used."""
+        for key in keys:
+            self._submit(key)
+        while len(self._cache) > self.capacity:
+            _, future = self._cache.popitem(last=False)
+            future.cancel()
+
+    def close(self):
+        """Stop the worker threads, dropping queued work."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self._cache.clear()
+
+
+class ProposalWorker(threading.Thread):
+    """Runs the detector on screenshots in the background, most wanted first."""
+
+    def __init__(self, model_path, images_dir, backend='auto', conf_thres=0.25):
+        """
+        Args:
+            model_path: Detector weights
+            images_dir: Directory of the screenshots
+            backend: Detector inference backend
+            conf_thres: Minimum confidence of a proposal
+        """
+        super().__init__(daemon=True, name='proposals')
+        self.model_path = model_path
+        self.images_dir = images_dir
+        self.backend = backend
+        self.conf_thres = conf_thres
+        # (name, (N, 6) proposals) pairs for the Tk thread
+        self.results = queue.Queue()
+        self._todo = deque()
+        self._condition = threading.Condition()
+        self._stopped = False
+
+    def request(self, names):
+        """Move screenshots to the front of the queue, the first name first."""
+        with self._condition:
+            for name in reversed(names):
+                if name in self._todo:
+                    self._todo.remove(name)
+                self._todo.appendleft(name)
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def run(self):
+        # Imported here so the window opens without waiting for torch/onnxruntime
+        from src.ml.models.form_detector import FormElementDetector
+
+        try:
+            detector = FormElementDetector(backend=self.backend, conf_thres=self.conf_thres)
+            detector.load_model(self.model_path)
+        except Exception as e:
+            logger.error(f"Proposals disabled, could not load {self.model_path}: {str(e)}")
+            return
+
+        while True:
+            with self._condition:
+                while not self._todo and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                name = self._todo.popleft()
+            try:
+                self.results.put((name, detect_proposals(detector, os.path.join(self.images_dir, name))))
+            except Exception as e:
+                logger.warning(f"No proposals for {name}: {str(e)}")
+
+
 class LabelingTool:
-    def __init__(self, data_dir):
+    def __init__(self, data_dir, model_path=None, backend='auto', conf_thres=0.25):
         """
         Initialize the labeling tool.
         
         Args:
             data_dir: Directory containing images and labels
+            model_path: Optional detector whose boxes are offered as proposals
+            backend: Detector inference backend
+            conf_thres: Minimum confidence of a proposal
         """
         # Initialize zoom variables first
         self.zoom_level = 1.0
         self.original_image = None
+        self.pyramid = []
+        self.image_item = None
+        self._render_pending = None
         
         self.data_dir = data_dir
         self.images_dir = os.path.join(data_dir, "images")
@@ -29,9 +305,31 @@ class LabelingTool:
         # Create labels directory if it doesn't exist
         os.makedirs(self.labels_dir, exist_ok=True)
         
+        # Parsed, validated labels for every image (re-parses only changed files)
+        self.label_index = LabelIndex(self.labels_dir)
+        
         # Get list of images
         self.images = [f for f in os.listdir(self.images_dir) if f.endswith(('.png', '.jpg', '.jpeg'))]
         self.current_image_idx = 0
+        self.prefetcher = ImagePrefetcher(lambda name: decode_image(os.path.join(self.images_dir, name)))
+        
+        # Autosave: edits are journaled, then written by a single background writer
+        self.journal = LabelJournal(os.path.normpath(self.labels_dir) + '.journal')
+        self.label_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='label-writer')
+        self._pending_writes = {}  # stem -> Future of its latest write
+        self._failed_writes = set()  # Stems whose last write failed (writer thread only)
+        self._index_updates = 0
+        self._autosave_job = None
+        self._unsaved = False
+        self.recover_journal()
+        
+        # Detector proposals: cached ones are shown even without a model
+        self.proposal_cache = ProposalCache(os.path.join(data_dir, "proposals.json"), model_path)
+        self.proposal_worker = None
+        self._proposals_received = 0
+        if model_path:
+            self.proposal_worker = ProposalWorker(model_path, self.images_dir, backend=backend,
+                                                  conf_thres=conf_thres)
         
         # Define classes from data.yaml
         self.classes = [
@@ -50,6 +348,10 @@ class LabelingTool:
         # Bounding box variables
         self.current_box = None
         self.boxes = []  # List of (class_idx, x, y, w, h) tuples
+        self.kept_lines = []  # Invalid rows of the label file, written back unchanged
+        self.box_items = []  # Canvas (rectangle, text) ids, one pair per box
+        self.proposals = []  # (class_idx, x, y, w, h, score) tuples not yet accepted or rejected
+        self.resizing = None  # (box index, edges such as 'lt') while a border is dragged
         self.start_x = None
         self.start_y = None
         
@@ -57,8 +359,19 @@ class LabelingTool:
         self.root = tk.Tk()
         self.root.title("UI Element Labeling Tool")
         self.root.state('zoomed')  # Start maximized
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.setup_gui()
         
+        if self.proposal_worker is not None:
+            # Current image first, then the rest of the folder in order
+            order = self.images[self.current_image_idx:] + self.images[:self.current_image_idx]
+            self.proposal_worker.request([
+                name for name in order
+                if self.proposal_cache.get(name, os.path.join(self.images_dir, name)) is None
+            ])
+            self.proposal_worker.start()
+            self.root.after(PROPOSAL_POLL_MS, self.poll_proposals)
+        
     def setup_gui(self):
         """Setup the GUI components."""
         # Main frame
@@ -77,7 +390,9 @@ class LabelingTool:
         self.scrollbar_y = ttk.Scrollbar(self.canvas_frame, orient="vertical", command=self.canvas.yview)
         self.scrollbar_x = ttk.Scrollbar(self.canvas_frame, orient="horizontal", command=self.canvas.xview)
         
-        self.canvas.configure(yscrollcommand=self.scrollbar_y.set, xscrollcommand=self.scrollbar_x.set)
+        # Every view change (scrolling, resizing, zooming) re-renders the visible region
+        self.canvas.configure(yscrollcommand=lambda *view: self.on_view_change(self.scrollbar_y, *view),
+                              xscrollcommand=lambda *view: self.on_view_change(self.scrollbar_x, *view))
         
         self.scrollbar_y.pack(side="right", fill="y")
         self.scrollbar_x.pack(side="bottom", fill="x")
@@ -93,7 +408,7 @@ class LabelingTool:
         
         ttk.Button(zoom_frame, text="Zoom In (+)", command=lambda: self.zoom(1.2)).pack(fill="x", pady=2)
         ttk.Button(zoom_frame, text="Zoom Out (-)", command=lambda: self.zoom(0.8)).pack(fill="x", pady=2)
-        ttk.Button(zoom_frame, text="Reset Zoom (1)", command=lambda: self.zoom(1.0)).pack(fill="x", pady=2)
+        ttk.Button(zoom_frame, text="Reset Zoom (1)", command=lambda: self.set_zoom(1.0)).pack(fill="x", pady=2)
         
         # Class selection with search
         class_frame = ttk.LabelFrame(right_panel, text="Select Class")
@@ -122,6 +437,13 @@ class LabelingTool:
         ttk.Button(box_frame, text="Delete Last Box (Backspace)", command=self.delete_last_box).pack(fill="x", pady=2)
         ttk.Button(box_frame, text="Clear All Boxes (C)", command=self.clear_boxes).pack(fill="x", pady=2)
         
+        # Proposal controls
+        proposal_frame = ttk.LabelFrame(right_panel, text="Proposals")
+        proposal_frame.pack(fill="x", pady=5)
+        
+        ttk.Button(proposal_frame, text="Accept All", command=self.accept_all_proposals).pack(fill="x", pady=2)
+        ttk.Button(proposal_frame, text="Reject All", command=self.reject_all_proposals).pack(fill="x", pady=2)
+        
         # Navigation buttons
         nav_frame = ttk.Frame(right_panel)
         nav_frame.pack(fill="x", pady=5)
@@ -139,6 +461,10 @@ class LabelingTool:
         self.canvas.bind("<ButtonPress-1>", self.on_mouse_down)
         self.canvas.bind("<B1-Motion>", self.on_mouse_move)
         self.canvas.bind("<ButtonRelease-1>", self.on_mouse_up)
+        self.canvas.bind("<Configure>", lambda e: self.schedule_render())
+        self.canvas.bind("<ButtonPress-3>", lambda e: self.on_proposal_click(e, accept=True))
+        self.canvas.bind("<Control-ButtonPress-3>", lambda e: self.on_proposal_click(e, accept=True, relabel=True))
+        self.canvas.bind("<Shift-ButtonPress-3>", lambda e: self.on_proposal_click(e, accept=False))
         
         # Bind keyboard shortcuts
         self.root.bind("<BackSpace>", lambda e: self.delete_last_box())
@@ -155,20 +481,152 @@ class LabelingTool:
             if search_text in class_name.lower():
                 self.class_listbox.insert(tk.END, class_name)
     
-    def zoom(self, factor):
-        """Zoom the image by the given factor."""
-        self.zoom_level *= factor
-        self.load_current_image()
+    def zoom(self, factor, x=None, y=None):
+        """Zoom the image by the given factor around a canvas window point."""
+        self.set_zoom(self.zoom_level * factor, x, y)
+    
+    def set_zoom(self, zoom_level, x=None, y=None):
+        """
+        Change the zoom level without re-rasterizing the whole image.
+        
+        Args:
+            zoom_level: New zoom level (1.0 shows the image at native size)
+            x: Window x coordinate kept fixed on the image (defaults to the canvas center)
+            y: Window y coordinate kept fixed on the image
+        """
+        zoom_level = min(max(zoom_level, MIN_ZOOM), MAX_ZOOM)
+        if self.original_image is None:
+            self.zoom_level = zoom_level
+            return
+        
+        x = self.canvas.winfo_width() / 2 if x is None else x
+        y = self.canvas.winfo_height() / 2 if y is None else y
+        # Image point under the anchor before zooming
+        image_x = self.canvas.canvasx(x) / self.zoom_level
+        image_y = self.canvas.canvasy(y) / self.zoom_level
+        
+        self.zoom_level = zoom_level
+        width, height = self.update_scrollregion()
+        self.canvas.xview_moveto((image_x * zoom_level - x) / width)
+        self.canvas.yview_moveto((image_y * zoom_level - y) / height)
+        self.redraw_boxes()
+        self.redraw_proposals()
+        self.schedule_render()
     
     def on_mousewheel(self, event):
-        """Handle mouse wheel zoom."""
+        """Handle mouse wheel zoom around the cursor."""
         if event.delta > 0:
-            self.zoom(1.1)
+            self.zoom(1.1, event.x, event.y)
+        else:
+            self.zoom(0.9, event.x, event.y)
+    
+    def on_view_change(self, scrollbar, first, last):
+        """Update a scrollbar and render the newly visible region."""
+        scrollbar.set(first, last)
+        self.schedule_render()
+    
+    def update_scrollregion(self):
+        """Size the scroll region to the zoomed image and return (width, height)."""
+        width = max(1, int(self.original_image.width * self.zoom_level))
+        height = max(1, int(self.original_image.height * self.zoom_level))
+        self.canvas.configure(scrollregion=(0, 0, width, height))
+        return width, height
+    
+    def schedule_render(self):
+        """Render the viewport once the event queue is idle (coalesces bursts of events)."""
+        if self._render_pending is None:
+            self._render_pending = self.root.after_idle(self.render_viewport)
+    
+    def render_viewport(self):
+        """Resample only the visible part of the image at the current zoom."""
+        self._render_pending = None
+        if self.original_image is None:
+            return
+        
+        width = int(self.original_image.width * self.zoom_level)
+        height = int(self.original_image.height * self.zoom_level)
+        x0 = max(0, int(self.canvas.canvasx(0)))
+        y0 = max(0, int(self.canvas.canvasy(0)))
+        x1 = min(width, x0 + self.canvas.winfo_width())
+        y1 = min(height, y0 + self.canvas.winfo_height())
+        if x1 <= x0 or y1 <= y0:
+            return
+        
+        # Smallest pyramid level that is not upsampled at this zoom
+        scale, level = next(((s, im) for s, im in reversed(self.pyramid) if s >= self.zoom_level), self.pyramid[0])
+        ratio = scale / self.zoom_level
+        tile = level.resize((x1 - x0, y1 - y0), Image.Resampling.BILINEAR,
+                            box=(x0 * ratio, y0 * ratio, x1 * ratio, y1 * ratio))
+        photo = ImageTk.PhotoImage(tile)
+        
+        if self.image_item is None:
+            self.image_item = self.canvas.create_image(x0, y0, anchor="nw", image=photo)
         else:
-            self.zoom(0.9)
+            self.canvas.coords(self.image_item, x0, y0)
+            self.canvas.itemconfigure(self.image_item, image=photo)
+        self.canvas.tag_lower(self.image_item)
+        self.canvas.image = photo
+    
+    def box_edges_at(self, x, y):
+        """
+        Box whose border is under a canvas point, most recently drawn first.
+        
+        Returns:
+            tuple: (box index, edges) where edges holds 'l' or 'r' and/or
+                't' or 'b', or None
+        """
+        if self.original_image is None:
+            return None
+        img_width = self.original_image.width * self.zoom_level
+        img_height = self.original_image.height * self.zoom_level
+        for i in range(len(self.boxes) - 1, -1, -1):
+            _, x_center, y_center, width, height = self.boxes[i]
+            x1, x2 = (x_center - width/2) * img_width, (x_center + width/2) * img_width
+            y1, y2 = (y_center - height/2) * img_height, (y_center + height/2) * img_height
+            if not (x1 - EDGE_GRAB_PX <= x <= x2 + EDGE_GRAB_PX and y1 - EDGE_GRAB_PX <= y <= y2 + EDGE_GRAB_PX):
+                continue
+            edges = ''
+            if abs(x - x1) <= EDGE_GRAB_PX:
+                edges += 'l'
+            elif abs(x - x2) <= EDGE_GRAB_PX:
+                edges += 'r'
+            if abs(y - y1) <= EDGE_GRAB_PX:
+                edges += 't'
+            elif abs(y - y2) <= EDGE_GRAB_PX:
+                edges += 'b'
+            if edges:
+                return i, edges
+        return None
+    
+    def resize_box(self, x, y):
+        """Move the dragged edges of the box being resized to a canvas point."""
+        index, edges = self.resizing
+        class_idx, x_center, y_center, width, height = self.boxes[index]
+        x1, x2 = x_center - width/2, x_center + width/2
+        y1, y2 = y_center - height/2, y_center + height/2
+        x = min(max(x / (self.original_image.width * self.zoom_level), 0.0), 1.0)
+        y = min(max(y / (self.original_image.height * self.zoom_level), 0.0), 1.0)
+        if 'l' in edges:
+            x1 = x
+        if 'r' in edges:
+            x2 = x
+        if 't' in edges:
+            y1 = y
+        if 'b' in edges:
+            y2 = y
+        x1, x2 = sorted((x1, x2))
+        y1, y2 = sorted((y1, y2))
+        self.boxes[index] = (class_idx, (x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1)
+        self.canvas.delete(*self.box_items[index])
+        self.box_items[index] = self.draw_box(self.boxes[index])
     
     def on_mouse_down(self, event):
         """Handle mouse button press."""
+        # Grabbing the border of a box resizes it instead of drawing a new one
+        self.resizing = self.box_edges_at(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        if self.resizing is not None:
+            return
+        
         if not self.class_listbox.curselection():
             self.status_var.set("Please select a class first!")
             return
@@ -185,7 +643,9 @@ class LabelingTool:
     
     def on_mouse_move(self, event):
         """Handle mouse movement."""
-        if self.current_box:
+        if self.resizing is not None:
+            self.resize_box(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        elif self.current_box:
             # Update box coordinates
             cur_x = self.canvas.canvasx(event.x)
             cur_y = self.canvas.canvasy(event.y)
@@ -193,14 +653,20 @@ class LabelingTool:
     
     def on_mouse_up(self, event):
         """Handle mouse button release."""
-        if self.current_box:
+        if self.resizing is not None:
+            self.resize_box(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+            index, _ = self.resizing
+            self.resizing = None
+            self.mark_edited()
+            self.status_var.set(f"Resized box for {self.classes[self.boxes[index][0]]}")
+        elif self.current_box:
             # Get final coordinates
             end_x = self.canvas.canvasx(event.x)
             end_y = self.canvas.canvasy(event.y)
             
             # Calculate normalized coordinates
-            img_width = self.original_image.width
-            img_height = self.original_image.height
+            img_width = self.original_image.width * self.zoom_level
+            img_height = self.original_image.height * self.zoom_level
             
             x1 = min(self.start_x, end_x) / img_width
             y1 = min(self.start_y, end_y) / img_height
@@ -216,8 +682,11 @@ class LabelingTool:
             # Get selected class
             class_idx = self.classes.index(self.class_listbox.get(self.class_listbox.curselection()))
             
-            # Add to boxes list
+            # Add to boxes list, replacing the rubber band with a labelled box
+            self.canvas.delete(self.current_box)
             self.boxes.append((class_idx, x_center, y_center, width, height))
+            self.box_items.append(self.draw_box(self.boxes[-1]))
+            self.mark_edited()
             
             # Update status
             self.status_var.set(f"Added box for {self.classes[class_idx]}")
@@ -229,13 +698,17 @@ class LabelingTool:
         """Delete the last drawn box."""
         if self.boxes:
             self.boxes.pop()
-            self.load_current_image()  # Reload to redraw boxes
+            self.canvas.delete(*self.box_items.pop())
+            self.mark_edited()
             self.status_var.set("Deleted last box")
     
     def clear_boxes(self):
         """Clear all boxes."""
-        self.boxes = []
-        self.load_current_image()  # Reload to redraw boxes
+        if self.boxes:
+            self.boxes = []
+            self.box_items = []
+            self.canvas.delete("box")
+            self.mark_edited()
         self.status_var.set("Cleared all boxes")
     
     def load_current_image(self):
@@ -244,105 +717,300 @@ class LabelingTool:
             self.status_var.set("No images found!")
             return
             
-        image_path = os.path.join(self.images_dir, self.images[self.current_image_idx])
-        self.original_image = Image.open(image_path)
-        
-        # Apply zoom
-        width = int(self.original_image.width * self.zoom_level)
-        height = int(self.original_image.height * self.zoom_level)
-        image = self.original_image.resize((width, height), Image.Resampling.LANCZOS)
-        
-        # Convert to PhotoImage
-        photo = ImageTk.PhotoImage(image)
+        # Decoded once (usually ahead of time); zooming and scrolling only resample the pyramid
+        try:
+            self.original_image, self.pyramid = self.prefetcher.get(self.images[self.current_image_idx])
+        except Exception as e:
+            self.status_var.set(f"Error loading image: {str(e)}")
+            return
+        ahead = self.images[self.current_image_idx + 1:self.current_image_idx + 1 + PREFETCH_AHEAD]
+        behind = self.images[max(0, self.current_image_idx - PREFETCH_BEHIND):self.current_image_idx]
+        self.prefetcher.prefetch(ahead + behind[::-1])
         
         # Update canvas
         self.canvas.delete("all")
-        self.canvas.create_image(0, 0, anchor="nw", image=photo)
-        self.canvas.image = photo
-        
-        # Update scroll region
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        
-        # Draw existing boxes
-        self.draw_boxes()
+        self.image_item = None
+        self.update_scrollregion()
+        self.canvas.xview_moveto(0)
+        self.canvas.yview_moveto(0)
         
         # Update status
         self.status_var.set(
             f"Image {self.current_image_idx + 1}/{len(self.images)}: {self.images[self.current_image_idx]}"
         )
         
-        # Load existing label if any
+        # Load existing label if any, then draw the boxes
         self.load_existing_label()
+        self.redraw_boxes()
+        self.load_proposals()
+        self.render_viewport()
         
         # Update class list
         self.filter_classes()
     
-    def draw_boxes(self):
-        """Draw all boxes on the canvas."""
-        if not self.original_image:
+    def draw_box(self, box):
+        """
+        Draw one box and its class name as canvas items.
+        
+        Args:
+            box: (class_idx, x_center, y_center, width, height) in normalized coordinates
+        
+        Returns:
+            tuple: (rectangle id, text id)
+        """
+        class_idx, x_center, y_center, width, height = box
+        img_width = self.original_image.width * self.zoom_level
+        img_height = self.original_image.height * self.zoom_level
+        
+        # Convert normalized coordinates to canvas coordinates
+        x1 = (x_center - width/2) * img_width
+        y1 = (y_center - height/2) * img_height
+        x2 = (x_center + width/2) * img_width
+        y2 = (y_center + height/2) * img_height
+        
+        rectangle = self.canvas.create_rectangle(
+            x1, y1, x2, y2,
+            outline='red', width=2, tags=("box",)
+        )
+        text = self.canvas.create_text(
+            x1, y1-10,
+            text=self.classes[class_idx],
+            fill='red',
+            anchor='sw',
+            tags=("box",)
+        )
+        return rectangle, text
+    
+    def redraw_boxes(self):
+        """Recreate the box items at the current zoom (the image is left alone)."""
+        self.canvas.delete("box")
+        self.box_items = [self.draw_box(box) for box in self.boxes] if self.original_image else []
+    
+    def load_proposals(self):
+        """Show the cached proposals of the current image, or ask the worker for them."""
+        name = self.images[self.current_image_idx]
+        proposals = self.proposal_cache.get(name, os.path.join(self.images_dir, name))
+        if proposals is None:
+            self.proposals = []
+            if self.proposal_worker is not None:
+                self.proposal_worker.request([name])
+        else:
+            self.set_proposals(proposals)
+        self.redraw_proposals()
+    
+    def set_proposals(self, proposals):
+        """Keep the proposals that do not duplicate an existing box of the same class."""
+        proposals = np.asarray(proposals, dtype=np.float32).reshape(-1, 6)
+        if len(proposals) and self.boxes:
+            boxes = np.array(self.boxes, dtype=np.float32)
+            iou = box_iou(xywh2xyxy(proposals[:, 1:5]), xywh2xyxy(boxes[:, 1:5]))
+            iou[proposals[:, 0][:, None] != boxes[:, 0][None, :]] = 0
+            proposals = proposals[iou.max(axis=1) < PROPOSAL_DUPLICATE_IOU]
+        self.proposals = [(int(row[0]), *map(float, row[1:])) for row in proposals]
+    
+    def poll_proposals(self):
+        """Collect proposals finished by the background worker (runs on the Tk thread)."""
+        current = self.images[self.current_image_idx] if self.images else None
+        try:
+            while True:
+                name, proposals = self.proposal_worker.results.get_nowait()
+                self.proposal_cache.put(name, os.path.join(self.images_dir, name), proposals)
+                self._proposals_received += 1
+                if self._proposals_received % PROPOSAL_SAVE_EVERY == 0:
+                    self.proposal_cache.save()
+                if name == current and self.original_image is not None:
+                    self.set_proposals(proposals)
+                    self.redraw_proposals()
+                    self.status_var.set(f"{len(self.proposals)} proposals")
+        except queue.Empty:
+            pass
+        self.root.after(PROPOSAL_POLL_MS, self.poll_proposals)
+    
+    def redraw_proposals(self):
+        """Draw the proposals as dashed boxes with class name and score."""
+        self.canvas.delete("proposal")
+        if self.original_image is None:
             return
-            
-        img_width = self.original_image.width
-        img_height = self.original_image.height
-        
-        for class_idx, x_center, y_center, width, height in self.boxes:
-            # Convert normalized coordinates to canvas coordinates
-            x1 = (x_center - width/2) * img_width * self.zoom_level
-            y1 = (y_center - height/2) * img_height * self.zoom_level
-            x2 = (x_center + width/2) * img_width * self.zoom_level
-            y2 = (y_center + height/2) * img_height * self.zoom_level
-            
-            # Draw box
-            self.canvas.create_rectangle(
-                x1, y1, x2, y2,
-                outline='red', width=2
-            )
-            
-            # Draw label
-            self.canvas.create_text(
-                x1, y1-10,
-                text=self.classes[class_idx],
-                fill='red',
-                anchor='sw'
-            )
+        img_width = self.original_image.width * self.zoom_level
+        img_height = self.original_image.height * self.zoom_level
+        for class_idx, x_center, y_center, width, height, score in self.proposals:
+            x1 = (x_center - width/2) * img_width
+            y1 = (y_center - height/2) * img_height
+            x2 = (x_center + width/2) * img_width
+            y2 = (y_center + height/2) * img_height
+            self.canvas.create_rectangle(x1, y1, x2, y2, outline='orange', width=2, dash=(4, 2),
+                                         tags=("proposal",))
+            self.canvas.create_text(x1, y2 + 2, text=f"{self.classes[class_idx]} {score:.2f}",
+                                    fill='orange', anchor='nw', tags=("proposal",))
+    
+    def proposal_at(self, event):
+        """Index of the smallest proposal under the cursor, or None."""
+        if self.original_image is None:
+            return None
+        x = self.canvas.canvasx(event.x) / (self.original_image.width * self.zoom_level)
+        y = self.canvas.canvasy(event.y) / (self.original_image.height * self.zoom_level)
+        hits = [
+            (width * height, i)
+            for i, (_, x_center, y_center, width, height, _) in enumerate(self.proposals)
+            if abs(x - x_center) <= width / 2 and abs(y - y_center) <= height / 2
+        ]
+        return min(hits)[1] if hits else None
+    
+    def on_proposal_click(self, event, accept, relabel=False):
+        """Accept (optionally with the selected class) or reject the proposal under the cursor."""
+        index = self.proposal_at(event)
+        if index is None:
+            return
+        if accept and relabel and not self.class_listbox.curselection():
+            self.status_var.set("Please select a class first!")
+            return
+        
+        proposal = self.proposals.pop(index)
+        class_idx, x_center, y_center, width, height, _ = proposal
+        if accept:
+            if relabel:
+                class_idx = self.classes.index(self.class_listbox.get(self.class_listbox.curselection()))
+            self.boxes.append((class_idx, x_center, y_center, width, height))
+            self.box_items.append(self.draw_box(self.boxes[-1]))
+            self.mark_edited()
+            self.status_var.set(f"Accepted {self.classes[class_idx]}")
+        else:
+            self.proposal_cache.reject(self.images[self.current_image_idx], [proposal])
+            self.status_var.set("Rejected proposal")
+        self.redraw_proposals()
+    
+    def accept_all_proposals(self):
+        """Turn every remaining proposal into a box."""
+        for class_idx, x_center, y_center, width, height, _ in self.proposals:
+            self.boxes.append((class_idx, x_center, y_center, width, height))
+            self.box_items.append(self.draw_box(self.boxes[-1]))
+        if self.proposals:
+            self.mark_edited()
+        self.status_var.set(f"Accepted {len(self.proposals)} proposals")
+        self.proposals = []
+        self.redraw_proposals()
+    
+    def reject_all_proposals(self):
+        """Dismiss every remaining proposal of the current image."""
+        if self.proposals:
+            self.proposal_cache.reject(self.images[self.current_image_idx], self.proposals)
+        self.status_var.set(f"Rejected {len(self.proposals)} proposals")
+        self.proposals = []
+        self.redraw_proposals()
     
     def load_existing_label(self):
-        """Load existing label for current image if available."""
-        label_path = os.path.join(
-            self.labels_dir,
-            f"{os.path.splitext(self.images[self.current_image_idx])[0]}.txt"
-        )
+        """
+        Load existing label for current image if available.
         
-        if os.path.exists(label_path):
+        The label file is the source of truth: rows that cannot be shown are
+        kept in self.kept_lines so saving never drops them.
+        """
+        stem = os.path.splitext(self.images[self.current_image_idx])[0]
+        label_path = os.path.join(self.labels_dir, f"{stem}.txt")
+        
+        # A write still in flight must land first
+        pending = self._pending_writes.pop(stem, None)
+        if pending is not None:
             try:
-                with open(label_path, 'r') as f:
-                    self.boxes = []
-                    for line in f:
-                        class_idx, x_center, y_center, width, height = map(float, line.strip().split())
-                        self.boxes.append((int(class_idx), x_center, y_center, width, height))
-                self.status_var.set("Loaded existing labels")
-            except Exception as e:
-                print(f"Error loading label: {str(e)}")
+                pending.result()
+            except Exception:
+                pass
+        
+        self.boxes = []
+        self.kept_lines = []
+        if not os.path.exists(label_path):
+            return
+        try:
+            with open(label_path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except OSError as e:
+            self.status_var.set(f"Error loading label: {str(e)}")
+            return
+        
+        rows, errors = parse_label_lines(lines, len(self.classes))
+        self.boxes = [
+            (int(class_idx), float(x_center), float(y_center), float(width), float(height))
+            for class_idx, x_center, y_center, width, height in rows
+        ]
+        self.kept_lines = [lines[line_no - 1] for line_no, _ in errors]
+        if self.kept_lines:
+            self.status_var.set(f"Loaded existing labels ({len(self.kept_lines)} invalid rows kept unchanged)")
+        else:
+            self.status_var.set("Loaded existing labels")
+    
+    def recover_journal(self):
+        """Write edits that were journaled but never saved (e.g. before a crash)."""
+        pending = self.journal.pending()
+        for stem, (boxes, kept_lines) in pending.items():
+            write_label_file(os.path.join(self.labels_dir, f"{stem}.txt"), boxes, kept_lines)
+            self.label_index.update_file(stem, save=False)
+        if pending:
+            self.label_index.save()
+            logger.info(f"Recovered unsaved labels of {len(pending)} images from {self.journal.path}")
+        self.journal.clear()
+    
+    def mark_edited(self):
+        """Journal the current boxes and (re)start the autosave timer."""
+        self.journal.append(os.path.splitext(self.images[self.current_image_idx])[0], self.boxes, self.kept_lines)
+        self._unsaved = True
+        if self._autosave_job is not None:
+            self.root.after_cancel(self._autosave_job)
+        self._autosave_job = self.root.after(AUTOSAVE_DELAY_MS, self.autosave)
+    
+    def autosave(self):
+        """Save after the edits have paused."""
+        self._autosave_job = None
+        if self.write_labels() is not None:
+            kept = f" ({len(self.kept_lines)} invalid rows kept unchanged)" if self.kept_lines else ""
+            self.status_var.set(f"Autosaved {len(self.boxes)} boxes{kept}")
+    
+    def write_labels(self):
+        """
+        Queue an atomic write of the current image's boxes if they changed.
+        
+        Returns:
+            concurrent.futures.Future: The queued write, or None if nothing changed
+        """
+        if self._autosave_job is not None:
+            self.root.after_cancel(self._autosave_job)
+            self._autosave_job = None
+        if not self.images or not self._unsaved:
+            return None
+        
+        stem = os.path.splitext(self.images[self.current_image_idx])[0]
+        self._unsaved = False
+        future = self.label_writer.submit(self._write_labels, stem, list(self.boxes), list(self.kept_lines),
+                                          self.journal.seq)
+        self._pending_writes[stem] = future
+        return future
+    
+    def _write_labels(self, stem, boxes, kept_lines, seq):
+        """Write one label file and index it (runs on the writer thread)."""
+        try:
+            write_label_file(os.path.join(self.labels_dir, f"{stem}.txt"), boxes, kept_lines)
+            # The in-memory index is current; the .npz is rewritten every few files and on close
+            self.label_index.update_file(stem, save=False)
+            self._index_updates += 1
+            if self._index_updates % INDEX_SAVE_EVERY == 0:
+                self.label_index.save()
+        except Exception as e:
+            # Keep the journal so the edits are replayed on the next start
+            self._failed_writes.add(stem)
+            logger.error(f"Error saving labels of {stem}: {str(e)}")
+            raise
+        self._failed_writes.discard(stem)
+        # Everything journaled up to seq is now on disk, unless an earlier write failed
+        if not self._failed_writes:
+            self.journal.clear(seq)
     
     def save_label(self):
-        """Save the current label."""
+        """Save the current label now (no boxes marks the image as having no elements)."""
         if not self.images:
             return
-            
-        if not self.boxes:
-            self.status_var.set("No boxes to save!")
-            return
-        
-        # Save to YOLO format
-        label_path = os.path.join(
-            self.labels_dir,
-            f"{os.path.splitext(self.images[self.current_image_idx])[0]}.txt"
-        )
         
+        self._unsaved = True
         try:
-            with open(label_path, 'w') as f:
-                for class_idx, x_center, y_center, width, height in self.boxes:
-                    f.write(f"{class_idx} {x_center:.6f} {y_center:.6f} {width:.6f} {height:.6f}\n")
+            self.write_labels().result()
             self.status_var.set("Labels saved successfully!")
         except Exception as e:
             self.status_var.set(f"Error saving labels: {str(e)}")
@@ -350,6 +1018,7 @@ class LabelingTool:
     def next_image(self):
         """Move to next image."""
         if self.current_image_idx < len(self.images) - 1:
+            self.write_labels()
             self.current_image_idx += 1
             self.boxes = []  # Clear boxes for new image
             self.load_current_image()
@@ -357,10 +1026,23 @@ class LabelingTool:
     def previous_image(self):
         """Move to previous image."""
         if self.current_image_idx > 0:
+            self.write_labels()
             self.current_image_idx -= 1
             self.boxes = []  # Clear boxes for new image
             self.load_current_image()
     
+    def on_close(self):
+        """Save pending labels, stop background work and close the window."""
+        self.write_labels()
+        self.label_writer.shutdown(wait=True)
+        if self.label_index.dirty:
+            self.label_index.save()
+        self.prefetcher.close()
+        if self.proposal_worker is not None:
+            self.proposal_worker.stop()
+        self.proposal_cache.save()
+        self.root.destroy()
+    
     def run(self):
         """Run the labeling tool."""
         self.root.mainloop()
@@ -372,9 +1054,26 @@ def main():
         default="data",
         help="Directory containing images and labels"
     )
+    parser.add_argument(
+        "--model",
+        default=None,
+        help="Detector weights whose boxes are offered as proposals"
+    )
+    parser.add_argument(
+        "--backend",
+        default="auto",
+        choices=["auto", "torch", "torchscript", "onnx"],
+        help="Detector inference backend"
+    )
+    parser.add_argument(
+        "--conf-thres",
+        type=float,
+        default=0.25,
+        help="Minimum confidence of a proposal"
+    )
     args = parser.parse_args()
     
-    tool = LabelingTool(args.data_dir)
+    tool = LabelingTool(args.data_dir, model_path=args.model, backend=args.backend, conf_thres=args.conf_thres)
     tool.run()
 
 if __name__ == "__main__":
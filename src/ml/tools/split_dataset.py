@@ -0,0 +1,251 @@
+"""
+Deduplicate the screenshot corpus and write a leakage-free train/val split.
+
+Every image gets a perceptual hash (dhash); images within a small Hamming
+distance of each other are near-duplicates and end up in one cluster.
+Whole clusters (optionally whole domains) are assigned to either train or
+val, so no page is seen in training and then scored in validation. The
+groups sent to val are chosen (by a subset-sum over group sizes) so that
+val ends up as close to --val-fraction as the group sizes allow.
+Near-duplicates with identical label files are represented by a single
+image unless --keep-duplicates is given; captures whose labels differ
+(e.g. a checkbox clicked and unclicked) are all kept.
+
+The lists are written as data/train.txt and data/val.txt with './images/...'
+lines, the format YOLOv5 resolves relative to the list file; data.yaml and
+the crop classifier trainer (--train-list/--val-list) both read them.
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import numpy as np
+from PIL import Image
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from src.utils.image_hash import dhash
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# Rows of the distance matrix computed at once
+DISTANCE_CHUNK = 512
+
+
+def image_domain(name):
+    """Capture source of a screenshot, e.g. 'www_indeed_com' for www_indeed_com12.png."""
+    return re.sub(r'\d+$', '', os.path.splitext(name)[0]) or name
+
+
+def hash_images(images_dir, names, hash_size=16):
+    """
+    Perceptual hashes of the screenshots as an (N, hash_size**2) bit matrix.
+
+    Images are decoded at reduced resolution (JPEG draft / PNG reduce) since
+    the hash only looks at a tiny grid.
+    """
+    bits = np.zeros((len(names), hash_size * hash_size), dtype=bool)
+    for i, name in enumerate(names):
+        with Image.open(os.path.join(images_dir, name)) as image:
+            image.draft('L', (hash_size * 8, hash_size * 8))
+            factor = max(1, min(image.size) // (hash_size * 8))
+            small = image.convert('L').reduce(factor)
+        value = dhash(small, hash_size=hash_size)
+        bits[i] = np.unpackbits(np.frombuffer(value.to_bytes(hash_size * hash_size // 8, 'big'), dtype=np.uint8))
+    return bits
+
+
+def label_contents(labels_dir, name):
+    """Normalized lines of an image's label file, or None without one."""
+    path = os.path.join(labels_dir, os.path.splitext(name)[0] + '.txt')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return tuple(' '.join(line.split()) for line in f if line.strip())
+
+
+def near_duplicate_pairs(bits, max_distance):
+    """
+    Pairs (i, j), i < j, of hashes at most max_distance bits apart.
+
+    The Hamming distance matrix is computed in row chunks as a matrix
+    product of the bit vectors, so memory stays bounded for large corpora.
+    """
+    ones = bits.astype(np.float32)
+    zeros = 1.0 - ones
+    pairs = []
+    for start in range(0, len(bits), DISTANCE_CHUNK):
+        block = slice(start, start + DISTANCE_CHUNK)
+        distance = ones[block] @ zeros.T + zeros[block] @ ones.T
+        i, j = np.nonzero(distance <= max_distance)
+        i += start
+        keep = i < j
+        pairs.extend(zip(i[keep].tolist(), j[keep].tolist()))
+    return pairs
+
+
+def closest_subset(sizes, target, limit):
+    """
+    Indices of sizes whose sum is as close to target as possible, below limit.
+
+    Subset-sum over the reachable totals; each total remembers the first
+    group that reached it, which is enough to walk the subset back.
+    """
+    reachable = np.zeros(limit, dtype=bool)
+    reachable[0] = True
+    via = np.full(limit, -1, dtype=np.int64)
+    for i, size in enumerate(sizes):
+        if size >= limit:
+            continue
+        new = np.zeros(limit, dtype=bool)
+        new[size:] = reachable[:limit - size]
+        new &= ~reachable
+        via[new] = i
+        reachable |= new
+
+    totals = np.flatnonzero(reachable)
+    total = int(totals[np.argmin(np.abs(totals - target))])
+    chosen = []
+    while total:
+        i = int(via[total])
+        chosen.append(i)
+        total -= sizes[i]
+    return chosen
+
+
+class UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, x):
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def split_dataset(data_dir, val_fraction=0.2, max_distance=6, group_by='cluster', keep_duplicates=False,
+                  labelled_only=True, seed=0):
+    """
+    Cluster near-duplicate screenshots and split the clusters into train and val.
+
+    Args:
+        data_dir: Directory containing images/ and labels/
+        val_fraction: Target fraction of (deduplicated) images in val
+        max_distance: Maximum Hamming distance between 256-bit hashes of near-duplicates
+        group_by: 'cluster' keeps near-duplicates together, 'domain' also keeps
+            every capture of one site on the same side
+        keep_duplicates: Keep every image instead of one per cluster and label file
+        labelled_only: Only consider images that have a label file
+        seed: Seed for the group assignment
+
+    Returns:
+        dict: 'train' and 'val' image name lists plus 'clusters' (list of lists of names)
+    """
+    images_dir = os.path.join(data_dir, 'images')
+    labels_dir = os.path.join(data_dir, 'labels')
+    names = sorted(f for f in os.listdir(images_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+    if labelled_only:
+        names = [n for n in names if os.path.exists(os.path.join(labels_dir, os.path.splitext(n)[0] + '.txt'))]
+    if not names:
+        raise ValueError(f"No images found in {images_dir}")
+
+    clusters = UnionFind(len(names))
+    for i, j in near_duplicate_pairs(hash_images(images_dir, names), max_distance):
+        clusters.union(i, j)
+
+    groups = UnionFind(len(names))
+    first_of_domain = {}
+    for i, name in enumerate(names):
+        groups.union(i, clusters.find(i))
+        if group_by == 'domain':
+            groups.union(i, first_of_domain.setdefault(image_domain(name), i))
+
+    # Per cluster, the first image of every distinct label file; differently
+    # labelled states of one page are separate training examples
+    seen = set()
+    kept = []
+    for i, name in enumerate(names):
+        key = (clusters.find(i), label_contents(labels_dir, name))
+        if keep_duplicates or key not in seen:
+            seen.add(key)
+            kept.append(i)
+    members = {}
+    for i in kept:
+        members.setdefault(groups.find(i), []).append(names[i])
+
+    # Groups in random order, so the seed picks among equally close splits;
+    # val never takes every image
+    group_ids = sorted(members)
+    random.Random(seed).shuffle(group_ids)
+    sizes = [len(members[group]) for group in group_ids]
+    val_groups = set(closest_subset(sizes, val_fraction * len(kept), len(kept)))
+    train, val = [], []
+    for i, group in enumerate(group_ids):
+        (val if i in val_groups else train).extend(members[group])
+
+    cluster_members = {}
+    for i, name in enumerate(names):
+        cluster_members.setdefault(clusters.find(i), []).append(name)
+    return {'train': sorted(train), 'val': sorted(val), 'clusters': list(cluster_members.values())}
+
+
+def write_image_list(path, names):
+    """Write image names as './images/<name>' lines."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for name in names:
+            f.write(f"./images/{name}\n")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Deduplicate screenshots and write a grouped train/val split')
+    parser.add_argument('--data-dir', default='data',
+                        help='Directory containing images/ and labels/')
+    parser.add_argument('--val-fraction', type=float, default=0.2,
+                        help='Fraction of images used for validation')
+    parser.add_argument('--max-distance', type=int, default=6,
+                        help='Maximum Hamming distance (of 256 bits) between near-duplicates')
+    parser.add_argument('--group-by', choices=['cluster', 'domain'], default='cluster',
+                        help='Keep near-duplicates (or whole domains) on one side of the split')
+    parser.add_argument('--keep-duplicates', action='store_true',
+                        help='Keep every near-duplicate instead of one image per cluster and label file')
+    parser.add_argument('--all-images', action='store_true',
+                        help='Include images without a label file')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed for the split')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    split = split_dataset(
+        args.data_dir,
+        val_fraction=args.val_fraction,
+        max_distance=args.max_distance,
+        group_by=args.group_by,
+        keep_duplicates=args.keep_duplicates,
+        labelled_only=not args.all_images,
+        seed=args.seed
+    )
+
+    write_image_list(os.path.join(args.data_dir, 'train.txt'), split['train'])
+    write_image_list(os.path.join(args.data_dir, 'val.txt'), split['val'])
+
+    total = sum(len(c) for c in split['clusters'])
+    duplicates = [c for c in split['clusters'] if len(c) > 1]
+    print(f"{total} images in {len(split['clusters'])} clusters ({len(duplicates)} with near-duplicates)")
+    for cluster in sorted(duplicates, key=len, reverse=True)[:10]:
+        print(f"  {len(cluster):>3} x {cluster[0]}")
+    print(f"train: {len(split['train'])} images, val: {len(split['val'])} images")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,115 +3,176 @@ Training script for Project1999 bot ML models.
 """
 
 import argparse
+import logging
 import os
 import sys
-import torch
-from torch.utils.data import DataLoader, TensorDataset
-from torch.optim import Adam
-from torch.nn import CrossEntropyLoss
-from datetime import datetime
 from ..utils.logger import logger
-from .models.form_detector import FormElementDetector
-from .data.form_data_collector import FormDataCollector
 
 # Add the src directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from src.ml.training.trainer import ModelTrainer
-from src.ml.data.data_collector import DataCollector
-from src.ml.models.vision_model import GameElementDetector
+from src.ml.training.sweep import load_sweep_spec, run_sweep
+from src.ml.training.instrumentation import TrainingMonitor
+from src.ml.data.form_dataset import read_image_list
+
+# Detector confidence for evaluation: mAP needs the whole precision/recall curve
+EVAL_CONF_THRES = 0.001
 
 def parse_args():
     parser = argparse.ArgumentParser(description='Train ML models for Project1999 bot')
-    parser.add_argument('--num-samples', type=int, default=100,
-                      help='Number of samples to collect for training')
+    parser.add_argument('command', nargs='?', choices=['train', 'sweep', 'evaluate'], default='train',
+                      help="'train' one model (default), run a hyperparameter 'sweep' or 'evaluate' "
+                           "a detector (mAP@0.5 and mAP@0.5:0.95)")
     parser.add_argument('--num-epochs', type=int, default=10,
                       help='Number of epochs to train for')
     parser.add_argument('--batch-size', type=int, default=32,
                       help='Batch size for training')
-    parser.add_argument('--learning-rate', type=float, default=0.001,
-                      help='Learning rate for training')
+    parser.add_argument('--learning-rate', type=float, default=None,
+                      help='Learning rate for training (default: 0.001, 0.0001 when fine-tuning)')
     parser.add_argument('--data-dir', type=str, default='data',
-                      help='Directory to store training data')
+                      help='Directory containing images/ and labels/')
+    parser.add_argument('--train-list', type=str, default=None,
+                      help='Train only on the images in this split list (see tools/split_dataset.py)')
+    parser.add_argument('--val-list', type=str, default=None,
+                      help='Evaluate on the images in this split list after training')
+    parser.add_argument('--num-workers', type=int, default=None,
+                      help='DataLoader worker processes (default: min(4, cpu count))')
+    parser.add_argument('--no-cache', action='store_true',
+                      help='Decode screenshots every epoch instead of using the crop cache')
+    parser.add_argument('--bf16', action='store_true',
+                      help='Train under bfloat16 autocast (CPU mixed precision)')
+    parser.add_argument('--channels-last', action='store_true',
+                      help='Use the channels-last memory format')
+    parser.add_argument('--compile', action='store_true',
+                      help='Compile the model with torch.compile when available')
+    parser.add_argument('--accumulation-steps', type=int, default=1,
+                      help='Batches per optimizer step (effective batch = batch size x steps)')
     parser.add_argument('--model-dir', type=str, default='models',
                       help='Directory to store trained models')
+    parser.add_argument('--resume', action='store_true',
+                      help='Continue an interrupted run from its last checkpoint')
+    parser.add_argument('--checkpoint-every', type=int, default=1,
+                      help='Epochs between resumable checkpoints')
+    parser.add_argument('--fine-tune', action='store_true',
+                      help='Fine-tune the latest model on newly labelled screenshots only')
+    parser.add_argument('--base-model', type=str, default=None,
+                      help='Model to fine-tune (default: latest in --model-dir)')
+    parser.add_argument('--replay-ratio', type=float, default=1.0,
+                      help='Previously seen screenshots replayed per new one when fine-tuning')
+    parser.add_argument('--log-every', type=int, default=0,
+                      help='Log step timings (data/forward/backward/optimizer, img/s, peak RSS) every N steps')
+    parser.add_argument('--tensorboard', type=str, default=None,
+                      help='Also write step metrics to this TensorBoard log directory')
+    parser.add_argument('--profile-steps', type=int, default=0,
+                      help='Record this many steps with torch.profiler (after 10 warm-up steps)')
+    parser.add_argument('--profile-dir', type=str, default='profiles',
+                      help='Directory receiving the profiler trace')
+    parser.add_argument('--sweep-spec', type=str, default='sweep.yaml',
+                      help='Sweep spec YAML (see src/ml/training/sweep.py)')
+    parser.add_argument('--parallel-trials', type=int, default=None,
+                      help='Sweep trials run at once (default: one per 2 cores)')
+    parser.add_argument('--threads-per-trial', type=int, default=None,
+                      help='torch threads per sweep trial (default: cores / parallel trials)')
+    parser.add_argument('--model', type=str, default=None,
+                      help='Detector to evaluate (.pt, .onnx, .torchscript or export manifest)')
+    parser.add_argument('--backend', type=str, default='auto', choices=['auto', 'torch', 'torchscript', 'onnx'],
+                      help='Detector inference backend for evaluate')
+    parser.add_argument('--no-tiled', action='store_true',
+                      help='Evaluate on whole screenshots instead of tiles')
     parser.add_argument('--debug', action='store_true',
                       help='Enable debug logging')
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.command == 'evaluate' and not args.model:
+        parser.error('evaluate needs --model')
+    # Trials run in separate processes, each would need its own monitor
+    if args.command == 'sweep':
+        for flag, value in (('--log-every', args.log_every), ('--tensorboard', args.tensorboard),
+                            ('--profile-steps', args.profile_steps)):
+            if value:
+                parser.error(f'{flag} is not supported with sweep')
+    # Fine-tuning trains on a small subset without the crop cache and does not evaluate
+    if args.fine_tune and args.no_cache:
+        parser.error('--no-cache has no effect with --fine-tune, which never uses the crop cache')
+    if args.fine_tune and args.val_list:
+        parser.error('--val-list is not evaluated with --fine-tune')
+    return args
 
-def train_model(data_dir, model_dir, num_epochs=10, batch_size=32, learning_rate=0.001):
+def train_model(data_dir, model_dir, num_epochs=10, batch_size=32, learning_rate=0.001, num_workers=None,
+                use_cache=True, **fit_kwargs):
     """
-    Train the form element detector model.
+    Train the form element classifier.
     
     Args:
-        data_dir: Directory containing training data
+        data_dir: Directory containing training data (images/ and labels/)
         model_dir: Directory to save trained model
         num_epochs: Number of training epochs
         batch_size: Batch size for training
         learning_rate: Learning rate for optimizer
+        num_workers: DataLoader worker processes
+        use_cache: Train from the memory-mapped crop cache
+        **fit_kwargs: Options for ModelTrainer.train_vision_model (resume,
+            checkpoint_every, bf16, channels_last, compile_model, accumulation_steps)
     """
     try:
-        # Create model directory
-        os.makedirs(model_dir, exist_ok=True)
-        
-        # Initialize model
-        model = FormElementDetector()
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        model = model.to(device)
-        
-        # Initialize data collector and create dataset
-        collector = FormDataCollector(data_dir=data_dir)
-        X_train, y_train = collector.create_dataset()
-        
-        if X_train is None or y_train is None:
-            raise ValueError("Failed to create dataset")
-        
-        # Convert to PyTorch tensors
-        X_train = torch.FloatTensor(X_train).to(device)
-        y_train = torch.LongTensor(y_train).to(device)
-        
-        # Create data loader
-        train_dataset = TensorDataset(X_train, y_train)
-        train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
-        
-        # Initialize optimizer and loss function
-        optimizer = Adam(model.parameters(), lr=learning_rate)
-        criterion = CrossEntropyLoss()
-        
-        # Training loop
-        logger.info("Starting training...")
-        for epoch in range(num_epochs):
-            model.train()
-            total_loss = 0
-            
-            for batch_X, batch_y in train_loader:
-                # Forward pass
-                optimizer.zero_grad()
-                outputs = model(batch_X)
-                loss = criterion(outputs, batch_y)
-                
-                # Backward pass and optimize
-                loss.backward()
-                optimizer.step()
-                
-                total_loss += loss.item()
-            
-            # Log epoch statistics
-            avg_loss = total_loss / len(train_loader)
-            logger.info(f"Epoch {epoch+1}/{num_epochs}, Average Loss: {avg_loss:.4f}")
-        
-        # Save trained model
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        model_path = os.path.join(model_dir, f"form_detector_{timestamp}.pt")
-        model.save_model(model_path)
-        
-        logger.info(f"Training completed. Model saved to {model_path}")
-        return model
+        trainer = ModelTrainer(model_dir)
+        return trainer.train_vision_model(
+            num_epochs=num_epochs,
+            batch_size=batch_size,
+            learning_rate=learning_rate,
+            data_dir=data_dir,
+            num_workers=num_workers,
+            model_name="form_detector",
+            use_cache=use_cache,
+            **fit_kwargs
+        )
         
     except Exception as e:
         logger.error(f"Error during training: {str(e)}")
         raise
 
+def evaluate_detector(model_path, data_dir, val_list=None, backend='auto', tiled=True, model_dir='models'):
+    """
+    Report mAP@0.5 and mAP@0.5:0.95 of a detector on labelled screenshots.
+    
+    Args:
+        model_path: Detector weights (.pt, .onnx, .torchscript or export manifest)
+        data_dir: Directory containing images/ and labels/
+        val_list: Split list to evaluate on (defaults to data_dir/val.txt, else every image)
+        backend: Detector inference backend
+        tiled: Run tiled inference (full-page screenshots)
+        model_dir: ModelTrainer directory
+    
+    Returns:
+        dict: Metrics from ModelTrainer.evaluate_detector
+    """
+    from src.ml.models.form_detector import FormElementDetector
+    
+    val_list = val_list or os.path.join(data_dir, 'val.txt')
+    if os.path.exists(val_list):
+        image_names = read_image_list(val_list)
+    else:
+        logger.warning(f"No {val_list}, evaluating on every labelled screenshot (including training images)")
+        image_names = None
+    
+    detector = FormElementDetector(backend=backend, conf_thres=EVAL_CONF_THRES)
+    # Per-class thresholds from data.yaml would cut the curves short
+    detector.class_conf_thres[:] = EVAL_CONF_THRES
+    detector.load_model(model_path)
+    
+    trainer = ModelTrainer(model_dir)
+    metrics = trainer.evaluate_detector(detector, data_dir, image_names=image_names, tiled=tiled)
+    
+    class_names = detector.class_names
+    print(f"{'class':<32} {'n':>5} {'P':>6} {'R':>6} {'AP50':>6} {'AP':>6}")
+    for c in range(len(metrics['support'])):
+        if metrics['support'][c]:
+            print(f"{class_names[c]:<32} {metrics['support'][c]:>5} {metrics['precision'][c]:>6.3f} "
+                  f"{metrics['recall'][c]:>6.3f} {metrics['ap50'][c]:>6.3f} {metrics['ap'][c]:>6.3f}")
+    print(f"{'all':<32} {int(metrics['support'].sum()):>5} {'':>6} {'':>6} "
+          f"{metrics['map50']:>6.3f} {metrics['map']:>6.3f}  ({metrics['num_images']} screenshots)")
+    return metrics
+
 def main():
     args = parse_args()
     
@@ -122,26 +183,75 @@ def main():
     
     try:
         # Create necessary directories
-        os.makedirs(args.data_dir, exist_ok=True)
         os.makedirs(args.model_dir, exist_ok=True)
         
-        # Initialize data collector
-        data_collector = DataCollector(args.data_dir)
-        
-        # Collect training data
-        logger.info(f"Collecting {args.num_samples} training samples...")
-        data_collector.collect_training_data(args.num_samples)
-        
         # Initialize model trainer
         trainer = ModelTrainer(args.model_dir)
         
-        # Train vision model
-        logger.info("Training vision model...")
-        trainer.train_vision_model(
-            num_epochs=args.num_epochs,
-            batch_size=args.batch_size,
-            learning_rate=args.learning_rate
+        fit_kwargs = dict(
+            bf16=args.bf16,
+            channels_last=args.channels_last,
+            compile_model=args.compile,
+            accumulation_steps=args.accumulation_steps
         )
+        if args.log_every or args.tensorboard or args.profile_steps:
+            fit_kwargs['monitor'] = TrainingMonitor(
+                log_every=args.log_every,
+                tensorboard_dir=args.tensorboard,
+                profile_steps=args.profile_steps,
+                profile_dir=args.profile_dir
+            )
+        
+        if args.command == 'evaluate':
+            logger.info(f"Evaluating {args.model}...")
+            evaluate_detector(args.model, args.data_dir, val_list=args.val_list, backend=args.backend,
+                              tiled=not args.no_tiled, model_dir=args.model_dir)
+            return
+        
+        if args.command == 'sweep':
+            logger.info(f"Running sweep from {args.sweep_spec}...")
+            run_sweep(
+                load_sweep_spec(args.sweep_spec),
+                data_dir=args.data_dir,
+                model_dir=args.model_dir,
+                train_list=args.train_list,
+                val_list=args.val_list,
+                max_workers=args.parallel_trials,
+                threads_per_trial=args.threads_per_trial,
+                defaults=fit_kwargs
+            )
+        elif args.fine_tune:
+            # Incremental update from the latest weights
+            logger.info("Fine-tuning vision model on new labels...")
+            trainer.fine_tune_vision_model(
+                num_epochs=args.num_epochs,
+                batch_size=args.batch_size,
+                learning_rate=args.learning_rate or 0.0001,
+                data_dir=args.data_dir,
+                num_workers=args.num_workers,
+                base_model=args.base_model,
+                replay_ratio=args.replay_ratio,
+                train_list=args.train_list,
+                resume=args.resume,
+                checkpoint_every=args.checkpoint_every,
+                **fit_kwargs
+            )
+        else:
+            # Train vision model
+            logger.info("Training vision model...")
+            trainer.train_vision_model(
+                num_epochs=args.num_epochs,
+                batch_size=args.batch_size,
+                learning_rate=args.learning_rate or 0.001,
+                data_dir=args.data_dir,
+                num_workers=args.num_workers,
+                use_cache=not args.no_cache,
+                resume=args.resume,
+                checkpoint_every=args.checkpoint_every,
+                train_list=args.train_list,
+                val_list=args.val_list,
+                **fit_kwargs
+            )
         
         logger.info("Training completed successfully!")
         
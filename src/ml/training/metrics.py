@@ -0,0 +1,159 @@
+"""
+Classification and detection metrics used by ModelTrainer.
+"""
+
+import numpy as np
+import torch
+from ..models.postprocess import box_iou
+
+# COCO-style IoU thresholds 0.5:0.05:0.95
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+
+def update_confusion_matrix(matrix, targets, predictions):
+    """
+    Add a batch to a confusion matrix in place with a single bincount.
+
+    Args:
+        matrix: (C, C) int64 tensor indexed [target, prediction]
+        targets: (N,) true class ids
+        predictions: (N,) predicted class ids
+    """
+    num_classes = matrix.shape[0]
+    flat = targets.long() * num_classes + predictions.long()
+    matrix += torch.bincount(flat, minlength=num_classes * num_classes).view(num_classes, num_classes)
+
+
+def precision_recall_from_confusion(matrix):
+    """
+    Per-class precision and recall from a [target, prediction] confusion matrix.
+
+    Returns:
+        tuple: (precision, recall) float arrays; classes never predicted
+               (or never present) get 0
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    tp = np.diag(matrix)
+    predicted = matrix.sum(axis=0)
+    actual = matrix.sum(axis=1)
+    precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+    recall = np.divide(tp, actual, out=np.zeros_like(tp), where=actual > 0)
+    return precision, recall
+
+
+def match_detections(pred_boxes, pred_classes, gt_boxes, gt_classes, iou_thresholds=IOU_THRESHOLDS):
+    """
+    Mark predictions that hit a ground truth box at each IoU threshold.
+
+    Each ground truth box is matched at most once, to the same-class
+    prediction with the highest IoU (YOLOv5/COCO matching).
+
+    Args:
+        pred_boxes: (P, 4) xyxy predicted boxes
+        pred_classes: (P,) predicted class ids
+        gt_boxes: (G, 4) xyxy ground truth boxes
+        gt_classes: (G,) ground truth class ids
+        iou_thresholds: (T,) IoU thresholds
+
+    Returns:
+        numpy.ndarray: (P, T) boolean matrix of true positives
+    """
+    correct = np.zeros((len(pred_boxes), len(iou_thresholds)), dtype=bool)
+    if not len(pred_boxes) or not len(gt_boxes):
+        return correct
+
+    iou = box_iou(np.asarray(gt_boxes, dtype=np.float32), np.asarray(pred_boxes, dtype=np.float32))
+    iou[np.asarray(gt_classes)[:, None] != np.asarray(pred_classes)[None, :]] = 0
+
+    for t, threshold in enumerate(iou_thresholds):
+        gt_idx, pred_idx = np.nonzero(iou >= threshold)
+        if not len(gt_idx):
+            continue
+        # Best pairs first, then keep the first occurrence of every prediction and every target
+        order = np.argsort(-iou[gt_idx, pred_idx], kind='stable')
+        gt_idx, pred_idx = gt_idx[order], pred_idx[order]
+        _, first = np.unique(pred_idx, return_index=True)
+        gt_idx, pred_idx = gt_idx[first], pred_idx[first]
+        _, first = np.unique(gt_idx, return_index=True)
+        correct[pred_idx[first], t] = True
+    return correct
+
+
+def average_precision(recall, precision):
+    """
+    Area under a precision/recall curve (COCO 101-point interpolation).
+
+    Args:
+        recall: Increasing recall values
+        precision: Matching precision values
+
+    Returns:
+        float: Average precision
+    """
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0]))
+    # Precision envelope
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    points = np.linspace(0, 1, 101)
+    values = np.interp(points, mrec, mpre)
+    # Trapezoidal rule
+    return float(np.sum((values[1:] + values[:-1]) / 2 * np.diff(points)))
+
+
+def detection_metrics(correct, scores, pred_classes, gt_classes, num_classes, conf_thres=0.25):
+    """
+    Per-class precision, recall and average precision over a dataset.
+
+    Args:
+        correct: (P, T) true positive matrix from match_detections, all images concatenated
+        scores: (P,) prediction confidences
+        pred_classes: (P,) predicted class ids
+        gt_classes: (G,) class ids of every ground truth box
+        num_classes: Number of classes
+        conf_thres: Confidence at which precision and recall are reported
+
+    Returns:
+        dict: 'precision', 'recall' (at IoU 0.5), 'ap50', 'ap' ((C,) arrays,
+              ap averaged over IoU 0.5:0.95), 'support' (ground truth count
+              per class) and the means 'map50' and 'map' over classes present
+    """
+    correct = np.asarray(correct, dtype=bool)
+    scores = np.asarray(scores, dtype=np.float64)
+    pred_classes = np.asarray(pred_classes, dtype=np.int64)
+    support = np.bincount(np.asarray(gt_classes, dtype=np.int64), minlength=num_classes)
+
+    precision = np.zeros(num_classes)
+    recall = np.zeros(num_classes)
+    ap = np.zeros((num_classes, correct.shape[1]))
+
+    order = np.argsort(-scores, kind='stable')
+    correct, scores, pred_classes = correct[order], scores[order], pred_classes[order]
+
+    for c in np.nonzero(support)[0]:
+        mask = pred_classes == c
+        if not mask.any():
+            continue
+        tp = np.cumsum(correct[mask], axis=0)
+        fp = np.cumsum(~correct[mask], axis=0)
+        curve_recall = tp / support[c]
+        curve_precision = tp / (tp + fp)
+
+        for t in range(correct.shape[1]):
+            ap[c, t] = average_precision(curve_recall[:, t], curve_precision[:, t])
+
+        # Operating point: the last prediction at or above conf_thres
+        above = int(np.count_nonzero(scores[mask] >= conf_thres))
+        if above:
+            precision[c] = curve_precision[above - 1, 0]
+            recall[c] = curve_recall[above - 1, 0]
+
+    present = support > 0
+    return {
+        'precision': precision,
+        'recall': recall,
+        'ap50': ap[:, 0],
+        'ap': ap.mean(axis=1),
+        'support': support,
+        'map50': float(ap[present, 0].mean()) if present.any() else 0.0,
+        'map': float(ap[present].mean()) if present.any() else 0.0
+    }
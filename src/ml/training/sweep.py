@@ -0,0 +1,251 @@
+"""
+Hyperparameter sweeps over the crop classifier, run in a process pool.
+
+A sweep spec (YAML) lists the values to try:
+
+    method: grid            # or random
+    num_trials: 12          # random only
+    grace_epochs: 2         # epochs before a trial may be stopped
+    parameters:
+      learning_rate: {min: 0.0001, max: 0.01, log: true}  # range, random only
+      batch_size: [32, 64]                                 # choices
+      num_epochs: 10                                       # fixed value
+
+Crops are preprocessed into the memory-mapped cache once, before any
+trial starts; every trial maps the same file read-only, so the OS page
+cache holds a single copy. Each trial runs in its own process with a
+bounded number of torch threads and reports its per-epoch score to the
+others; a trial whose score falls below the median of the trials that
+reached the same epoch is stopped (median stopping rule).
+"""
+
+import csv
+import itertools
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import torch
+import yaml
+from ...utils.logger import logger
+from ..data.crop_cache import CropCache
+from ..data.form_dataset import FormElementDataset, create_data_loader, read_image_list
+from ..models.form_classifier import FormElementClassifier
+from .trainer import ModelTrainer
+
+# Options that are not training parameters
+SPEC_KEYS = ('method', 'num_trials', 'grace_epochs', 'parameters')
+
+TRAINING_DEFAULTS = {
+    'num_epochs': 10,
+    'batch_size': 32,
+    'learning_rate': 0.001,
+    'accumulation_steps': 1
+}
+
+# Parameters a sweep may vary
+SWEEP_PARAMETERS = set(TRAINING_DEFAULTS) | {'bf16', 'channels_last', 'compile_model'}
+
+
+def load_sweep_spec(path):
+    """Read and check a sweep spec file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        spec = yaml.safe_load(f) or {}
+    unknown = set(spec) - set(SPEC_KEYS)
+    if unknown:
+        raise ValueError(f"{path}: unknown sweep options {sorted(unknown)}")
+    if spec.setdefault('method', 'grid') not in ('grid', 'random'):
+        raise ValueError(f"{path}: method must be 'grid' or 'random'")
+    if not spec.get('parameters'):
+        raise ValueError(f"{path}: no parameters to sweep")
+    unknown = set(spec['parameters']) - SWEEP_PARAMETERS
+    if unknown:
+        raise ValueError(f"{path}: cannot sweep {sorted(unknown)}, expected some of {sorted(SWEEP_PARAMETERS)}")
+    return spec
+
+
+def _sample(value, rng):
+    if isinstance(value, list):
+        return rng.choice(value)
+    if isinstance(value, dict):
+        low, high = float(value['min']), float(value['max'])
+        if value.get('log'):
+            return math.exp(rng.uniform(math.log(low), math.log(high)))
+        return rng.uniform(low, high)
+    return value
+
+
+def expand_trials(spec, seed=0, defaults=None):
+    """
+    Turn a sweep spec into the list of trial parameter dicts.
+
+    Args:
+        spec: Parsed sweep spec
+        seed: Seed for random search
+        defaults: Training parameters used by every trial unless the spec sweeps them
+
+    Returns:
+        list: One dict of training parameters per trial
+    """
+    parameters = spec['parameters']
+    if spec['method'] == 'grid':
+        if any(isinstance(v, dict) for v in parameters.values()):
+            raise ValueError("Ranges ({min, max}) are only supported by random search")
+        names = list(parameters)
+        choices = [v if isinstance(v, list) else [v] for v in parameters.values()]
+        trials = [dict(zip(names, values)) for values in itertools.product(*choices)]
+    else:
+        rng = random.Random(seed)
+        trials = [
+            {name: _sample(value, rng) for name, value in parameters.items()}
+            for _ in range(int(spec.get('num_trials', 10)))
+        ]
+    base = dict(TRAINING_DEFAULTS, **(defaults or {}))
+    return [dict(base, **trial) for trial in trials]
+
+
+class MedianStopper:
+    """Epoch callback implementing the median stopping rule across processes."""
+
+    def __init__(self, trial_id, scores, grace_epochs, score_fn):
+        """
+        Args:
+            trial_id: Id of the trial being watched
+            scores: Shared dict (Manager proxy) of (trial_id, epoch) -> score
+            grace_epochs: Epochs every trial runs before it can be stopped
+            score_fn: callable(avg_loss, model) -> score, higher is better
+        """
+        self.trial_id = trial_id
+        self.scores = scores
+        self.grace_epochs = grace_epochs
+        self.score_fn = score_fn
+        self.history = []
+
+    def __call__(self, epoch, avg_loss, model):
+        score = self.score_fn(avg_loss, model)
+        self.history.append(score)
+        self.scores[(self.trial_id, epoch)] = score
+        if epoch < self.grace_epochs:
+            return False
+
+        others = [v for (trial, e), v in self.scores.items() if e == epoch and trial != self.trial_id]
+        return len(others) >= 2 and score < statistics.median(others)
+
+
+def _run_trial(trial_id, params, data_dir, model_dir, train_list, val_list, num_threads, scores, grace_epochs):
+    """Train one configuration in a pool process and return its result row."""
+    torch.set_num_threads(num_threads)
+    start = time.perf_counter()
+
+    trainer = ModelTrainer(model_dir)
+
+    # Maps the cache built by the parent; nothing is decoded here
+    dataset = FormElementDataset(data_dir, image_names=read_image_list(train_list) if train_list else None,
+                                 seed=trial_id)
+    dataset.use_cache(CropCache(os.path.join(data_dir, 'crops.cache')))
+    train_loader = create_data_loader(dataset, batch_size=int(params['batch_size']), num_workers=0,
+                                      device=trainer.device)
+
+    if val_list:
+        val_dataset = FormElementDataset(data_dir, image_names=read_image_list(val_list), shuffle=False,
+                                         label_index=dataset.label_index)
+        val_loader = create_data_loader(val_dataset, batch_size=256, num_workers=0)
+
+        def score_fn(avg_loss, model):
+            return trainer.evaluate_model(model, val_loader)['accuracy']
+    else:
+        def score_fn(avg_loss, model):
+            return -avg_loss
+
+    stopper = MedianStopper(trial_id, scores, grace_epochs, score_fn)
+    fit_kwargs = {k: v for k, v in params.items() if k not in ('num_epochs', 'batch_size', 'learning_rate')}
+    model = FormElementClassifier(num_classes=dataset.num_classes, input_size=dataset.crop_size)
+    trainer.fit(model, train_loader, num_epochs=int(params['num_epochs']),
+                learning_rate=float(params['learning_rate']), epoch_callback=stopper, **fit_kwargs)
+
+    epochs_run = len(stopper.history)
+    return dict(
+        trial=trial_id,
+        **params,
+        epochs_run=epochs_run,
+        stopped_early=epochs_run < int(params['num_epochs']),
+        score=stopper.history[-1] if stopper.history else float('nan'),
+        best_score=max(stopper.history) if stopper.history else float('nan'),
+        elapsed=round(time.perf_counter() - start, 1)
+    )
+
+
+def run_sweep(spec, data_dir, model_dir, train_list=None, val_list=None, max_workers=None,
+              threads_per_trial=None, seed=0, defaults=None):
+    """
+    Run every trial of a sweep and write the results table.
+
+    Args:
+        spec: Parsed sweep spec (see load_sweep_spec)
+        data_dir: Directory containing images/ and labels/
+        model_dir: Directory receiving the results CSV
+        train_list: Optional split list of training images
+        val_list: Optional split list scored after every epoch (otherwise
+            trials are compared on training loss)
+        max_workers: Concurrent trials (default: one per 2 cores, at most the number of trials)
+        threads_per_trial: torch threads per trial (default: cores / max_workers)
+        seed: Seed for random search
+        defaults: Training parameters (see SWEEP_PARAMETERS) for every trial
+            unless the spec sweeps them
+
+    Returns:
+        list: Result rows sorted from best to worst
+    """
+    unknown = set(defaults or {}) - SWEEP_PARAMETERS
+    if unknown:
+        raise ValueError(f"Unknown training parameters {sorted(unknown)}")
+    trials = expand_trials(spec, seed=seed, defaults=defaults)
+    cores = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers or cores // 2, len(trials)))
+    threads_per_trial = threads_per_trial or max(1, cores // max_workers)
+    logger.info(f"Sweep: {len(trials)} trials, {max_workers} at a time with {threads_per_trial} threads each")
+
+    # Preprocess once so trials only ever read the cache
+    dataset = FormElementDataset(data_dir, image_names=read_image_list(train_list) if train_list else None)
+    if len(dataset) == 0:
+        raise ValueError(f"No labelled elements found in {data_dir}")
+    dataset.use_cache(CropCache(os.path.join(data_dir, 'crops.cache')))
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    with context.Manager() as manager:
+        scores = manager.dict()
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+            futures = {
+                pool.submit(_run_trial, i, params, data_dir, model_dir, train_list, val_list, threads_per_trial,
+                            scores, int(spec.get('grace_epochs', 2))): i
+                for i, params in enumerate(trials)
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Trial {futures[future]} failed: {str(e)}")
+                    continue
+                results.append(result)
+                logger.info(
+                    f"Trial {result['trial']} finished: score {result['score']:.4f} after "
+                    f"{result['epochs_run']} epochs{' (stopped early)' if result['stopped_early'] else ''}"
+                )
+
+    results.sort(key=lambda r: r['best_score'], reverse=True)
+    if results:
+        os.makedirs(model_dir, exist_ok=True)
+        path = os.path.join(model_dir, f"sweep_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+        fields = list(dict.fromkeys(key for result in results for key in result))
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(results)
+        best = {k: v for k, v in results[0].items() if k in trials[0]}
+        logger.info(f"Sweep results written to {path}; best: {best} (score {results[0]['best_score']:.4f})")
+    return results
@@ -1,17 +1,28 @@
 """
-Model training module for Project1999 bot.
+Model training module for the form element models.
 """
 
+import glob
+import hashlib
+import json
 import os
-import torch
+import random
 import numpy as np
+import torch
+from PIL import Image
 from torch.utils.data import DataLoader, TensorDataset
 from torch.optim import Adam
 from torch.nn import CrossEntropyLoss
 from datetime import datetime
 from ...utils.logger import logger
-from ..models.vision_model import GameElementDetector
-from ..data.data_collector import DataCollector
+from ..models.form_classifier import FormElementClassifier
+from ..data.form_dataset import FormElementDataset, create_data_loader, read_image_list
+from ..data.crop_cache import CropCache
+from ..data.label_index import LabelIndex
+from ..models.postprocess import xywh2xyxy
+from .instrumentation import TrainingMonitor
+from .metrics import (detection_metrics, match_detections, precision_recall_from_confusion,
+                      update_confusion_matrix)
 
 class ModelTrainer:
     def __init__(self, model_dir="models"):
@@ -35,114 +46,432 @@ class ModelTrainer:
             self.logger.error(f"Failed to create model directory: {str(e)}")
             raise
     
-    def train_vision_model(self, num_epochs=10, batch_size=32, learning_rate=0.001):
+    def save_checkpoint(self, path, model, optimizer, epoch, run=None):
         """
-        Train the vision model for game element detection.
-        
+        Atomically save everything needed to resume training after an epoch.
+
+        Args:
+            path: Checkpoint file
+            model: Model being trained
+            optimizer: Its optimizer
+            epoch: Number of completed epochs
+            run: Settings identifying the run (see run_settings)
+        """
+        checkpoint = {
+            'run': run,
+            'model': model.state_dict(),
+            'num_classes': model.num_classes,
+            'input_size': model.input_size,
+            'optimizer': optimizer.state_dict(),
+            'epoch': epoch,
+            'rng': {
+                'python': random.getstate(),
+                'numpy': np.random.get_state(),
+                'torch': torch.get_rng_state(),
+                'cuda': torch.cuda.get_rng_state_all() if torch.cuda.is_available() else None
+            }
+        }
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        torch.save(checkpoint, path + '.tmp')
+        os.replace(path + '.tmp', path)
+
+    def load_checkpoint(self, path, model, optimizer, run=None):
+        """
+        Restore model, optimizer and RNG state from a checkpoint.
+
         Args:
+            path: Checkpoint file
+            model: Model being trained
+            optimizer: Its optimizer
+            run: Settings of the current run; the checkpoint must have been
+                written by a run with the same settings
+
+        Returns:
+            int: Number of epochs already completed
+
+        Raises:
+            ValueError: If the checkpoint belongs to a run with other settings
+        """
+        checkpoint = torch.load(path, map_location=self.device, weights_only=False)
+        if run is not None and checkpoint.get('run') != run:
+            saved = checkpoint.get('run') or {}
+            differences = ', '.join(
+                f"{key} {saved.get(key)!r} != {value!r}" for key, value in run.items() if saved.get(key) != value
+            )
+            raise ValueError(f"Checkpoint {path} belongs to another run ({differences}); "
+                             f"delete it or train without --resume")
+        model.load_state_dict(checkpoint['model'])
+        optimizer.load_state_dict(checkpoint['optimizer'])
+        rng = checkpoint['rng']
+        random.setstate(rng['python'])
+        np.random.set_state(rng['numpy'])
+        torch.set_rng_state(rng['torch'].cpu())
+        if rng['cuda'] is not None and torch.cuda.is_available():
+            torch.cuda.set_rng_state_all(rng['cuda'])
+        self.logger.info(f"Resuming from {path} after epoch {checkpoint['epoch']}")
+        return checkpoint['epoch']
+
+    def fit(self, model, train_loader, num_epochs=10, learning_rate=0.001, bf16=False,
+            channels_last=False, compile_model=False, accumulation_steps=1,
+            checkpoint_path=None, checkpoint_every=1, resume=False, epoch_callback=None, monitor=None):
+        """
+        Train a classifier on batches streamed from a data loader.
+
+        Args:
+            model: Model returning class logits
+            train_loader: DataLoader yielding (uint8 images, class ids)
             num_epochs: Number of training epochs
-            batch_size: Batch size for training
             learning_rate: Learning rate for optimizer
-            
+            bf16: Run forward and loss under bfloat16 autocast (fast on CPUs
+                with AVX512-BF16/AMX, parameters and optimizer stay fp32)
+            channels_last: Use the NHWC memory format preferred by oneDNN convolutions
+            compile_model: Compile the model with torch.compile when available
+            accumulation_steps: Batches whose gradients are summed per
+                optimizer step, emulating a batch that many times larger
+            checkpoint_path: File receiving a resumable checkpoint
+            checkpoint_every: Save the checkpoint every this many epochs
+            resume: Continue from checkpoint_path if it exists; the checkpoint
+                must come from a run with the same settings and data, and is
+                deleted once training completes
+            epoch_callback: Optional callable(epoch, avg_loss, model) run after
+                every epoch; returning True stops training early
+            monitor: TrainingMonitor receiving per-step timings (a default
+                one logs a time breakdown per epoch)
+
         Returns:
-            GameElementDetector: Trained model
+            torch.nn.Module: Trained model
         """
+        model = model.to(self.device)
+        non_blocking = self.device.type == 'cuda'
+        memory_format = torch.channels_last if channels_last else torch.contiguous_format
+        model = model.to(memory_format=memory_format)
+        accumulation_steps = max(1, accumulation_steps)
+
+        # Keep a handle on the original module: compiled wrappers are only
+        # used for the forward pass, weights are shared
+        forward = model
+        if compile_model:
+            if hasattr(torch, 'compile'):
+                forward = torch.compile(model)
+            else:
+                self.logger.warning("torch.compile is not available, training eagerly")
+
+        # Initialize optimizer and loss function
+        optimizer = Adam(model.parameters(), lr=learning_rate)
+        criterion = CrossEntropyLoss()
+
+        monitor = monitor or TrainingMonitor()
+
+        run = self.run_settings(train_loader, num_epochs, learning_rate, accumulation_steps, bf16)
+        start_epoch = 0
+        if resume and checkpoint_path:
+            if os.path.exists(checkpoint_path):
+                start_epoch = self.load_checkpoint(checkpoint_path, model, optimizer, run=run)
+            else:
+                self.logger.info(f"No checkpoint at {checkpoint_path}, training from scratch")
+
+        # The monitor is closed even when a step raises, so the profiler
+        # stops and TensorBoard is flushed
         try:
-            # Initialize model with 27 classes (10 base classes + 16 spell status classes + 1 corpse class)
-            model = GameElementDetector(num_classes=27)
-            model = model.to(self.device)
-            
-            # Initialize data collector
-            data_collector = DataCollector(os.path.join(os.path.dirname(self.model_dir), 'data'))
-            
-            # Collect and preprocess data
-            X_train, y_train = data_collector.create_dataset()
-            if X_train is None or y_train is None:
-                raise ValueError("Failed to create dataset")
-            
-            # Convert to PyTorch tensors
-            X_train = torch.FloatTensor(X_train).to(self.device)
-            y_train = torch.LongTensor(y_train).to(self.device)
-            
-            # Create data loader
-            train_dataset = TensorDataset(X_train, y_train)
-            train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True)
-            
-            # Initialize optimizer and loss function
-            optimizer = Adam(model.parameters(), lr=learning_rate)
-            criterion = CrossEntropyLoss()
-            
-            # Training loop
-            for epoch in range(num_epochs):
+            # Training loop; epochs seed the data order, so a resumed run sees
+            # the same batches it would have seen without the interruption
+            for epoch in range(start_epoch, num_epochs):
                 model.train()
-                total_loss = 0
-                
+                if hasattr(train_loader.dataset, 'set_epoch'):
+                    train_loader.dataset.set_epoch(epoch)
+                # Summed on the device and read once per epoch, so the loop
+                # never waits on a host sync
+                total_loss = torch.zeros((), device=self.device)
+                num_batches = 0
+                optimizer.zero_grad(set_to_none=True)
+                monitor.start(self.device)
+
                 for batch_X, batch_y in train_loader:
+                    # Batches arrive as uint8 and are scaled on the device
+                    batch_X = batch_X.to(self.device, non_blocking=non_blocking).float().div_(255)
+                    batch_X = batch_X.contiguous(memory_format=memory_format)
+                    batch_y = batch_y.to(self.device, non_blocking=non_blocking)
+                    monitor.lap('data')
+
                     # Forward pass
-                    optimizer.zero_grad()
-                    outputs = model(batch_X)
-                    loss = criterion(outputs, batch_y)
-                    
-                    # Backward pass and optimize
-                    loss.backward()
+                    with torch.autocast(device_type=self.device.type, dtype=torch.bfloat16, enabled=bf16):
+                        outputs = forward(batch_X)
+                        loss = criterion(outputs, batch_y)
+                    monitor.lap('forward')
+
+                    # Backward pass, optimizing every accumulation_steps batches
+                    (loss / accumulation_steps).backward()
+                    monitor.lap('backward')
+                    num_batches += 1
+                    if num_batches % accumulation_steps == 0:
+                        optimizer.step()
+                        optimizer.zero_grad(set_to_none=True)
+                    monitor.lap('optimizer')
+
+                    total_loss += loss.detach().float()
+                    monitor.end_step(batch_X.shape[0], loss)
+
+                if num_batches % accumulation_steps:
                     optimizer.step()
-                    
-                    total_loss += loss.item()
-                
+                    optimizer.zero_grad(set_to_none=True)
+
                 # Log epoch statistics
-                avg_loss = total_loss / len(train_loader)
+                avg_loss = total_loss.item() / max(num_batches, 1)
                 self.logger.info(f"Epoch {epoch+1}/{num_epochs}, Average Loss: {avg_loss:.4f}")
-            
-            # Save trained model
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            model_path = os.path.join(self.model_dir, f"vision_model_{timestamp}.pt")
-            model.save_model(model_path)
-            
-            self.logger.info(f"Training completed. Model saved to {model_path}")
+                monitor.end_epoch(epoch + 1)
+
+                if checkpoint_path and (epoch + 1) % max(1, checkpoint_every) == 0 and epoch + 1 < num_epochs:
+                    self.save_checkpoint(checkpoint_path, model, optimizer, epoch + 1, run=run)
+
+                if epoch_callback is not None and epoch_callback(epoch + 1, avg_loss, model):
+                    self.logger.info(f"Stopping early after epoch {epoch+1}")
+                    break
+        finally:
+            monitor.close()
+
+        # A finished run leaves nothing to resume
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        return model.to(memory_format=torch.contiguous_format)
+
+    def run_settings(self, train_loader, num_epochs, learning_rate, accumulation_steps, bf16):
+        """
+        Settings a resumed run must share with the run that wrote the checkpoint.
+
+        The data signature covers the screenshots trained on (so the split
+        list) and their label files.
+        """
+        dataset = train_loader.dataset
+        data = None
+        if hasattr(dataset, 'label_index'):
+            signatures = json.dumps(self._dataset_signatures(dataset), sort_keys=True)
+            data = hashlib.sha1(signatures.encode('utf-8')).hexdigest()
+        return {
+            'num_epochs': num_epochs,
+            'learning_rate': learning_rate,
+            'batch_size': train_loader.batch_size,
+            'accumulation_steps': accumulation_steps,
+            'bf16': bf16,
+            'data': data
+        }
+
+    def checkpoint_path(self, model_name):
+        """Path of the resumable checkpoint of a training run."""
+        return os.path.join(self.model_dir, 'checkpoints', f"{model_name}_last.pt")
+
+    def latest_model_path(self, model_name="vision_model"):
+        """Most recently saved <model_name>_<timestamp>.pt in model_dir, or None."""
+        paths = glob.glob(os.path.join(self.model_dir, f"{model_name}_*.pt"))
+        return max(paths, key=os.path.getmtime) if paths else None
+
+    def _save_trained_model(self, model, model_name):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        model_path = os.path.join(self.model_dir, f"{model_name}_{timestamp}.pt")
+        model.save_model(model_path)
+        self.logger.info(f"Training completed. Model saved to {model_path}")
+        return model_path
+
+    def _dataset_signatures(self, dataset):
+        """Label file signatures of every screenshot in a dataset."""
+        stems = [os.path.splitext(os.path.basename(path))[0] for path in dataset.images]
+        return {stem: list(dataset.label_index.signature(stem)) for stem in stems}
+
+    def train_vision_model(self, num_epochs=10, batch_size=32, learning_rate=0.001,
+                           data_dir=None, num_workers=None, model_name="vision_model", use_cache=True,
+                           resume=False, checkpoint_every=1, train_list=None, val_list=None, **fit_kwargs):
+        """
+        Train the form element classifier on labelled screenshot crops.
+
+        Args:
+            num_epochs: Number of training epochs
+            batch_size: Batch size for training
+            learning_rate: Learning rate for optimizer
+            data_dir: Directory containing images/ and labels/ (defaults to
+                the data directory next to model_dir)
+            num_workers: DataLoader worker processes
+            model_name: Prefix of the saved model file
+            use_cache: Read crops from the memory-mapped cache in data_dir
+                (refreshed for changed screenshots) instead of decoding PNGs
+            resume: Continue an interrupted run from its last checkpoint
+            checkpoint_every: Epochs between checkpoints
+            train_list: Optional split list (see tools/split_dataset.py)
+                restricting training to its images
+            val_list: Optional split list evaluated after training
+            **fit_kwargs: Training options passed to fit (bf16, channels_last,
+                compile_model, accumulation_steps)
+
+        Returns:
+            FormElementClassifier: Trained model
+        """
+        try:
+            if data_dir is None:
+                data_dir = os.path.join(os.path.dirname(os.path.abspath(self.model_dir)), 'data')
+
+            # Crops are decoded lazily by the loader workers
+            image_names = read_image_list(train_list) if train_list else None
+            dataset = FormElementDataset(data_dir, image_names=image_names)
+            if len(dataset) == 0:
+                raise ValueError(f"No labelled elements found in {data_dir}")
+            if use_cache:
+                dataset.use_cache(CropCache(os.path.join(data_dir, 'crops.cache')))
+            train_loader = create_data_loader(dataset, batch_size=batch_size,
+                                              num_workers=num_workers, device=self.device)
+
+            model = FormElementClassifier(num_classes=dataset.num_classes, input_size=dataset.crop_size)
+            model = self.fit(model, train_loader, num_epochs=num_epochs, learning_rate=learning_rate,
+                             checkpoint_path=self.checkpoint_path(model_name),
+                             checkpoint_every=checkpoint_every, resume=resume, **fit_kwargs)
+
+            # Remember which labels the weights have seen, for fine_tune_vision_model
+            model.metadata['trained_on'] = self._dataset_signatures(dataset)
+            if val_list:
+                val_dataset = FormElementDataset(data_dir, image_names=read_image_list(val_list),
+                                                 crop_size=dataset.crop_size, shuffle=False,
+                                                 label_index=dataset.label_index)
+                if len(val_dataset):
+                    val_loader = create_data_loader(val_dataset, batch_size=batch_size,
+                                                    num_workers=num_workers, device=self.device)
+                    model.metadata['val_accuracy'] = self.evaluate_model(model, val_loader)['accuracy']
+                else:
+                    self.logger.warning(f"No labelled elements in {val_list}, skipping validation")
+            self._save_trained_model(model, model_name)
             return model
         except Exception as e:
             self.logger.error(f"Error during vision model training: {str(e)}")
             raise
+
+    def fine_tune_vision_model(self, num_epochs=3, batch_size=32, learning_rate=0.0001, data_dir=None,
+                               num_workers=None, model_name="vision_model", base_model=None,
+                               replay_ratio=1.0, seed=0, train_list=None, resume=False, checkpoint_every=1,
+                               **fit_kwargs):
+        """
+        Fine-tune the latest weights on newly labelled screenshots only.
+
+        Screenshots whose label file is new or changed since the base model
+        was trained are mixed with a random replay sample of already seen
+        screenshots, which keeps the model from forgetting older pages.
+
+        Args:
+            num_epochs: Number of fine-tuning epochs
+            batch_size: Batch size for training
+            learning_rate: Learning rate for optimizer (lower than from scratch)
+            data_dir: Directory containing images/ and labels/
+            num_workers: DataLoader worker processes
+            model_name: Prefix of the model files
+            base_model: Model to start from (defaults to the latest <model_name>_*.pt)
+            replay_ratio: Seen screenshots replayed per new screenshot
+            seed: Seed for the replay sample
+            train_list: Optional split list (see tools/split_dataset.py); new
+                and replayed screenshots are both taken from its images only
+            resume: Continue an interrupted fine-tuning run from its last checkpoint
+            checkpoint_every: Epochs between checkpoints
+            **fit_kwargs: Training options passed to fit
+
+        Returns:
+            FormElementClassifier: Fine-tuned model (the base model when nothing is new)
+        """
+        try:
+            if data_dir is None:
+                data_dir = os.path.join(os.path.dirname(os.path.abspath(self.model_dir)), 'data')
+            base_model = base_model or self.latest_model_path(model_name)
+            if base_model is None:
+                raise ValueError(f"No {model_name}_*.pt in {self.model_dir} to fine-tune, train one first")
+            if base_model.endswith('.torchscript'):
+                raise ValueError(f"{base_model} is an inference-only TorchScript export, "
+                                 f"fine-tune the .pt checkpoint it was exported from")
+            model = self.load_model(base_model)
+            trained_on = model.metadata.get('trained_on', {})
+
+            label_index = LabelIndex(os.path.join(data_dir, 'labels'))
+            # Keep validation screenshots out of both the new and the replay set
+            allowed = set(read_image_list(train_list)) if train_list else None
+            new_images, seen_images = [], []
+            for name in sorted(os.listdir(os.path.join(data_dir, 'images'))):
+                stem = os.path.splitext(name)[0]
+                if allowed is not None and name not in allowed:
+                    continue
+                if not len(label_index.labels(stem)):
+                    continue
+                if trained_on.get(stem) == list(label_index.signature(stem)):
+                    seen_images.append(name)
+                else:
+                    new_images.append(name)
+
+            if not new_images:
+                self.logger.info(f"No new or changed labels since {base_model}, nothing to fine-tune")
+                return model
+
+            replay_count = min(len(seen_images), int(np.ceil(replay_ratio * len(new_images))))
+            replay = random.Random(seed).sample(seen_images, replay_count)
+            self.logger.info(
+                f"Fine-tuning {base_model} on {len(new_images)} new and {len(replay)} replayed screenshots"
+            )
+
+            # The subset is small; the shared crop cache stays sized for full runs
+            dataset = FormElementDataset(data_dir, image_names=new_images + replay, label_index=label_index,
+                                         crop_size=model.input_size, seed=seed)
+            train_loader = create_data_loader(dataset, batch_size=batch_size,
+                                              num_workers=num_workers, device=self.device)
+            model = self.fit(model, train_loader, num_epochs=num_epochs, learning_rate=learning_rate,
+                             checkpoint_path=self.checkpoint_path(f"{model_name}_finetune"),
+                             checkpoint_every=checkpoint_every, resume=resume, **fit_kwargs)
+
+            model.metadata['trained_on'] = dict(trained_on, **self._dataset_signatures(dataset))
+            model.metadata['fine_tuned_from'] = os.path.basename(base_model)
+            self._save_trained_model(model, model_name)
+            return model
+        except Exception as e:
+            self.logger.error(f"Error during fine-tuning: {str(e)}")
+            raise
     
-    def evaluate_model(self, model, test_data):
+    def evaluate_model(self, model, test_data, batch_size=256):
         """
-        Evaluate a trained model on test data.
+        Evaluate a trained classifier, streaming the test set in batches.
         
         Args:
             model: Trained model to evaluate
-            test_data: Tuple of (X_test, y_test)
+            test_data: DataLoader yielding (images, class ids), or a tuple
+                of (X_test, y_test) arrays
+            batch_size: Batch size used when test_data is a tuple
             
         Returns:
             dict: Dictionary containing evaluation metrics
         """
         try:
-            X_test, y_test = test_data
-            
-            # Convert to PyTorch tensors
-            X_test = torch.FloatTensor(X_test).to(self.device)
-            y_test = torch.LongTensor(y_test).to(self.device)
+            if isinstance(test_data, (tuple, list)):
+                X_test, y_test = test_data
+                test_data = DataLoader(
+                    TensorDataset(torch.as_tensor(X_test), torch.as_tensor(y_test)),
+                    batch_size=batch_size
+                )
+            non_blocking = self.device.type == 'cuda'
             
             # Set model to evaluation mode
             model.eval()
+            confusion_matrix = torch.zeros(model.num_classes, model.num_classes,
+                                           dtype=torch.int64, device=self.device)
             
-            # Get predictions
-            with torch.no_grad():
-                outputs = model(X_test)
-                _, predicted = torch.max(outputs.data, 1)
+            # Get predictions batch by batch, counting on the device
+            with torch.inference_mode():
+                for batch_X, batch_y in test_data:
+                    batch_X = batch_X.to(self.device, non_blocking=non_blocking)
+                    if batch_X.dtype == torch.uint8:
+                        batch_X = batch_X.float().div_(255)
+                    batch_y = batch_y.to(self.device, non_blocking=non_blocking)
+                    predicted = model(batch_X).argmax(dim=1)
+                    update_confusion_matrix(confusion_matrix, batch_y, predicted)
             
-            # Calculate accuracy
-            correct = (predicted == y_test).sum().item()
-            total = y_test.size(0)
-            accuracy = correct / total
-            
-            # Calculate confusion matrix
-            confusion_matrix = torch.zeros(model.num_classes, model.num_classes)
-            for t, p in zip(y_test, predicted):
-                confusion_matrix[t.long(), p.long()] += 1
+            confusion_matrix = confusion_matrix.cpu().numpy()
+            total = int(confusion_matrix.sum())
+            correct = int(np.trace(confusion_matrix))
+            accuracy = correct / total if total else 0.0
+            precision, recall = precision_recall_from_confusion(confusion_matrix)
             
             metrics = {
                 'accuracy': accuracy,
-                'confusion_matrix': confusion_matrix.cpu().numpy(),
+                'confusion_matrix': confusion_matrix,
+                'precision': precision,
+                'recall': recall,
                 'total_samples': total,
                 'correct_predictions': correct
             }
@@ -153,18 +482,93 @@ class ModelTrainer:
             self.logger.error(f"Error during model evaluation: {str(e)}")
             raise
     
+    def evaluate_detector(self, detector, data_dir, image_names=None, tiled=True, label_index=None):
+        """
+        Compute detection metrics of a FormElementDetector on labelled screenshots.
+        
+        For meaningful mAP the detector should be created with a low
+        conf_thres (e.g. 0.001); precision and recall are reported at 0.25.
+        
+        Args:
+            detector: Loaded FormElementDetector
+            data_dir: Directory containing images/ and labels/
+            image_names: Optional list of image file names to evaluate on
+            tiled: Run tiled inference (full-page screenshots)
+            label_index: Optional LabelIndex over data_dir/labels
+            
+        Returns:
+            dict: Per-class precision, recall, ap50 and ap plus map50 and map
+        """
+        try:
+            images_dir = os.path.join(data_dir, 'images')
+            label_index = label_index or LabelIndex(os.path.join(data_dir, 'labels'))
+            if image_names is None:
+                image_names = sorted(os.listdir(images_dir))
+            
+            correct, scores, pred_classes, gt_classes = [], [], [], []
+            num_images = 0
+            for name in image_names:
+                stem = os.path.splitext(name)[0]
+                if stem not in label_index:
+                    continue
+                with Image.open(os.path.join(images_dir, name)) as image:
+                    image = image.convert('RGB')
+                width, height = image.size
+                
+                detections = detector.predict_tiled(image) if tiled else detector.predict(image)
+                labels = label_index.labels(stem)
+                gt_boxes = xywh2xyxy(labels[:, 1:]) * np.array([width, height, width, height], dtype=np.float32)
+                
+                correct.append(match_detections(detections.xyxy, detections.class_ids,
+                                                gt_boxes, labels[:, 0].astype(np.int64)))
+                scores.append(detections.scores)
+                pred_classes.append(detections.class_ids)
+                gt_classes.append(labels[:, 0].astype(np.int64))
+                num_images += 1
+            
+            if not num_images:
+                raise ValueError(f"No labelled screenshots found in {data_dir}")
+            
+            metrics = detection_metrics(
+                np.concatenate(correct), np.concatenate(scores), np.concatenate(pred_classes),
+                np.concatenate(gt_classes), label_index.num_classes
+            )
+            metrics['num_images'] = num_images
+            
+            for c in np.nonzero(metrics['support'])[0]:
+                self.logger.debug(
+                    f"{label_index.class_names[c]:<32} n={metrics['support'][c]:<5} "
+                    f"P={metrics['precision'][c]:.3f} R={metrics['recall'][c]:.3f} "
+                    f"AP50={metrics['ap50'][c]:.3f} AP={metrics['ap'][c]:.3f}"
+                )
+            self.logger.info(
+                f"Detector evaluation on {num_images} screenshots: "
+                f"mAP@0.5 {metrics['map50']:.4f}, mAP@0.5:0.95 {metrics['map']:.4f}"
+            )
+            return metrics
+        except Exception as e:
+            self.logger.error(f"Error during detector evaluation: {str(e)}")
+            raise
+    
     def load_model(self, model_path):
         """
         Load a trained model from disk.
         
         Args:
-            model_path: Path to the saved model
+            model_path: Path to the saved model, or a TorchScript export
+                (.torchscript, see tools/export_model.py)
             
         Returns:
-            GameElementDetector: Loaded model
+            FormElementClassifier: Loaded model (a ScriptModule for TorchScript
+                exports, which is inference-only: it has no metadata and
+                cannot be fine-tuned)
         """
         try:
-            model = GameElementDetector()
+            if model_path.endswith('.torchscript'):
+                model = torch.jit.load(model_path, map_location=self.device).eval()
+                self.logger.info(f"TorchScript model loaded from {model_path}")
+                return model
+            model = FormElementClassifier()
             model.load_model(model_path)
             model = model.to(self.device)
             self.logger.info(f"Model loaded from {model_path}")
@@ -0,0 +1,68 @@
+"""
+Image preprocessing helpers shared by inference and training.
+"""
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+def letterbox(image, new_shape=640, color=(114, 114, 114), auto=False, stride=32):
+    """
+    Resize an image keeping its aspect ratio and pad it to the target shape.
+
+    Args:
+        image: HxWxC uint8 array
+        new_shape: Target size as int or (height, width)
+        color: Padding color
+        auto: Pad only up to the next multiple of stride (rectangular inference)
+        stride: Model stride used when auto is set
+
+    Returns:
+        tuple: (padded image, scale ratio, (pad_left, pad_top))
+    """
+    if isinstance(new_shape, int):
+        new_shape = (new_shape, new_shape)
+
+    height, width = image.shape[:2]
+    ratio = min(new_shape[0] / height, new_shape[1] / width)
+    new_unpad = (int(round(width * ratio)), int(round(height * ratio)))
+    pad_w = new_shape[1] - new_unpad[0]
+    pad_h = new_shape[0] - new_unpad[1]
+    if auto:
+        pad_w, pad_h = pad_w % stride, pad_h % stride
+
+    if (width, height) != new_unpad:
+        image = cv2.resize(image, new_unpad, interpolation=cv2.INTER_LINEAR)
+
+    left, top = pad_w // 2, pad_h // 2
+    image = cv2.copyMakeBorder(image, top, pad_h - top, left, pad_w - left,
+                               cv2.BORDER_CONSTANT, value=color)
+    return image, ratio, (left, top)
+
+
+def as_frame(image):
+    """
+    Return an image as an array without touching its channel layout.
+
+    PIL images become RGB arrays; arrays (including BGRA capture frames and
+    views of grab buffers) are returned as is.
+    """
+    if isinstance(image, Image.Image):
+        return np.asarray(image.convert('RGB'))
+    return np.asarray(image)
+
+
+def to_rgb_array(image):
+    """
+    Convert a PIL image or frame to a contiguous HxWx3 uint8 RGB array.
+
+    Four-channel arrays are treated as BGRA screen grabs (see core.capture);
+    three-channel arrays are assumed to already be RGB.
+    """
+    array = as_frame(image)
+    if array.ndim == 2:
+        array = np.stack([array] * 3, axis=-1)
+    elif array.shape[2] == 4:
+        array = array[:, :, 2::-1]
+    return np.ascontiguousarray(array, dtype=np.uint8)
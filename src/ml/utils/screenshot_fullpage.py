@@ -1,14 +1,34 @@
+"""
+Full-page screenshot capture for growing the training corpus.
+
+Interactive mode opens one Chrome window with a persistent profile and
+saves a screenshot whenever [ is pressed. Batch mode (--batch) captures a
+list of URLs or local HTML files headlessly across a pool of browsers:
+
+    python src/ml/utils/screenshot_fullpage.py --batch urls.txt --workers 4
+
+Screenshots are named <domain><n>.png. The output directory is listed once
+at startup and the next number of every domain is then kept in memory.
+
+Batch captures keep a normal viewport height and grab the full page with
+the DevTools captureBeyondViewport option, so pages sized in vh units are
+measured and rendered as they would be in a regular browser window.
+"""
+
+import base64
 import os
 import re
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
 from urllib.parse import urlparse
-import keyboard
 import undetected_chromedriver as uc
 
 OUTPUT_DIR = os.path.join('data', 'images')
 PROFILE_DIR = os.path.abspath('chrome_profile')  # Persistent Chrome profile directory
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-os.makedirs(PROFILE_DIR, exist_ok=True)
+VIEWPORT_HEIGHT = 1080  # Window height of headless browsers; the page is captured beyond it
 
 def get_domain(url):
     parsed = urlparse(url)
@@ -22,13 +42,169 @@ def get_domain(url):
     domain = domain.replace('.', '_')
     return domain if domain else 'screenshot'
 
-def get_next_filename(domain):
-    existing = [f for f in os.listdir(OUTPUT_DIR) if f.startswith(domain)]
-    nums = [int(re.findall(rf'{re.escape(domain)}(\d+)\.png', f)[0]) for f in existing if re.findall(rf'{re.escape(domain)}(\d+)\.png', f)]
-    next_num = max(nums) + 1 if nums else 1
-    return os.path.join(OUTPUT_DIR, f"{domain}{next_num}.png")
+class DomainCounter:
+    """Next free <domain><n>.png name per domain, from a single directory listing."""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self._existing = [f for f in os.listdir(output_dir) if f.endswith('.png')]
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def next_filename(self, domain):
+        with self._lock:
+            if domain not in self._next:
+                # Only the first capture of a domain looks at the initial listing
+                pattern = re.compile(rf'{re.escape(domain)}(\d+)\.png')
+                nums = [int(m.group(1)) for m in map(pattern.fullmatch, self._existing) if m]
+                self._next[domain] = max(nums) + 1 if nums else 1
+            num = self._next[domain]
+            self._next[domain] += 1
+        return os.path.join(self.output_dir, f"{domain}{num}.png")
+
+_counter = None
+
+def get_next_filename(domain, output_dir=OUTPUT_DIR):
+    global _counter
+    if _counter is None or _counter.output_dir != output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        _counter = DomainCounter(output_dir)
+    return _counter.next_filename(domain)
+
+def read_url_list(lines):
+    """URLs from a list (blank lines and # comments skipped); local paths become file:// URLs."""
+    urls = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if urlparse(line).scheme in ('http', 'https', 'file'):
+            urls.append(line)
+        else:
+            urls.append(Path(line).resolve().as_uri())
+    return urls
+
+class BrowserPool:
+    """One headless Chrome per worker thread, created on first use."""
+
+    # undetected-chromedriver patches a shared driver binary on startup
+    _launch_lock = threading.Lock()
+
+    def __init__(self, width=1920, max_height=5000, page_timeout=30, viewport_height=VIEWPORT_HEIGHT):
+        self.width = width
+        self.max_height = max_height
+        self.viewport_height = viewport_height
+        self.page_timeout = page_timeout
+        self._local = threading.local()
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    def driver(self):
+        driver = getattr(self._local, 'driver', None)
+        if driver is None:
+            options = uc.ChromeOptions()
+            options.add_argument('--headless=new')
+            options.add_argument(f'--window-size={self.width},{self.viewport_height}')
+            with self._launch_lock:
+                driver = uc.Chrome(options=options)
+            driver.set_page_load_timeout(self.page_timeout)
+            self._local.driver = driver
+            with self._lock:
+                self._drivers.append(driver)
+        return driver
+
+    def discard(self):
+        """Drop this thread's browser after an error; the next capture starts a new one."""
+        driver = getattr(self._local, 'driver', None)
+        self._local.driver = None
+        if driver is not None:
+            with self._lock:
+                self._drivers.remove(driver)
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def close(self):
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+def capture_page(pool, counter, url, settle=1.0):
+    """Load a page and save a screenshot of its full height (up to the pool's max_height)."""
+    driver = pool.driver()
+    try:
+        driver.get(url)
+        time.sleep(settle)
+        # Measured at the fixed viewport height: resizing the window first
+        # would stretch min-height: 100vh pages to whatever height was set
+        width, height = driver.execute_script(
+            'return [document.documentElement.clientWidth, '
+            'Math.max(document.body ? document.body.scrollHeight : 0, document.documentElement.scrollHeight)]'
+        )
+        height = max(1, min(int(height or pool.viewport_height), pool.max_height))
+        shot = driver.execute_cdp_cmd('Page.captureScreenshot', {
+            'format': 'png',
+            'captureBeyondViewport': True,
+            'clip': {'x': 0, 'y': 0, 'width': int(width or pool.width), 'height': height, 'scale': 1}
+        })
+        filename = counter.next_filename(get_domain(url))
+        with open(filename, 'wb') as f:
+            f.write(base64.b64decode(shot['data']))
+        return filename
+    except Exception:
+        pool.discard()
+        raise
+
+def capture_batch(urls, output_dir=OUTPUT_DIR, workers=4, width=1920, max_height=5000, page_timeout=30,
+                  settle=1.0):
+    """
+    Capture a list of pages headlessly with a pool of browsers.
+
+    Args:
+        urls: Page URLs (http(s):// or file://)
+        output_dir: Directory receiving <domain><n>.png screenshots
+        workers: Concurrent browsers
+        width: Window width
+        max_height: Pages taller than this are cut off
+        page_timeout: Seconds before a page load is abandoned
+        settle: Seconds to wait after load for late rendering
+
+    Returns:
+        dict: 'captured' and 'failed' counts
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = max(1, min(workers, len(urls)))
+    counter = DomainCounter(output_dir)
+    pool = BrowserPool(width=width, max_height=max_height, page_timeout=page_timeout)
+    summary = {'captured': 0, 'failed': 0}
+    start = time.time()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(capture_page, pool, counter, url, settle): url for url in urls}
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    print(f"[Screenshot] Saved: {future.result()} (URL: {url})")
+                    summary['captured'] += 1
+                except Exception as e:
+                    print(f"[ERROR] {url}: {str(e).splitlines()[0] if str(e) else type(e).__name__}")
+                    summary['failed'] += 1
+    finally:
+        pool.close()
+    elapsed = time.time() - start
+    print(f"[INFO] Captured {summary['captured']} pages ({summary['failed']} failed) in {elapsed:.1f}s "
+          f"with {workers} browsers")
+    return summary
+
+def main(width=1920, height=5000, output_dir=OUTPUT_DIR):
+    import keyboard
 
-def main(width=1920, height=5000):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
     options = uc.ChromeOptions()
     options.add_argument(f'--window-size={width},{height}')
     options.add_argument(f'--user-data-dir={PROFILE_DIR}')  # Use persistent profile
@@ -43,7 +219,7 @@ def main(width=1920, height=5000):
         driver.switch_to.window(driver.window_handles[-1])
         url = driver.current_url
         domain = get_domain(url)
-        filename = get_next_filename(domain)
+        filename = get_next_filename(domain, output_dir)
         driver.save_screenshot(filename)
         print(f"[Screenshot] Saved: {filename} (URL: {url})")
 
@@ -61,8 +237,22 @@ def main(width=1920, height=5000):
 
 if __name__ == "__main__":
     import argparse
-    parser = argparse.ArgumentParser(description='Global hotkey full-page screenshot tool (undetected-chromedriver, persistent profile)')
+    parser = argparse.ArgumentParser(description='Full-page screenshot tool (undetected-chromedriver): global hotkey, or headless batch capture')
     parser.add_argument('--width', type=int, default=1920, help='Window width')
-    parser.add_argument('--height', type=int, default=5000, help='Window height (increase for longer pages)')
+    parser.add_argument('--height', type=int, default=5000, help='Window height (increase for longer pages); max page height in batch mode')
+    parser.add_argument('--batch', type=str, help="List of URLs or local HTML files to capture headlessly (one per line, '-' for stdin)")
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent headless browsers (batch mode)')
+    parser.add_argument('--output-dir', type=str, default=OUTPUT_DIR, help='Screenshot directory')
+    parser.add_argument('--page-timeout', type=float, default=30, help='Seconds before a page load is abandoned (batch mode)')
+    parser.add_argument('--settle', type=float, default=1.0, help='Seconds to wait after load before capturing (batch mode)')
     args = parser.parse_args()
-    main(args.width, args.height) 
\ No newline at end of file
+    if args.batch:
+        if args.batch == '-':
+            urls = read_url_list(sys.stdin)
+        else:
+            with open(args.batch, 'r', encoding='utf-8') as f:
+                urls = read_url_list(f)
+        summary = capture_batch(urls, output_dir=args.output_dir, workers=args.workers, width=args.width,
+                                max_height=args.height, page_timeout=args.page_timeout, settle=args.settle)
+        sys.exit(1 if summary['failed'] else 0)
+    main(args.width, args.height, args.output_dir)
@@ -0,0 +1,33 @@
+"""
+Perceptual image hashing helpers.
+"""
+
+import numpy as np
+from PIL import Image
+
+
+def dhash(image, hash_size=8):
+    """
+    Compute the difference hash of an image.
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale grid and
+    each bit records whether a pixel is brighter than its right neighbour, so
+    small rendering noise (caret blink, anti-aliasing) leaves the hash intact.
+
+    Args:
+        image: PIL Image or numpy array (grayscale or RGB)
+        hash_size: Number of rows/columns of the comparison grid
+
+    Returns:
+        int: Hash with hash_size * hash_size bits
+    """
+    if not isinstance(image, Image.Image):
+        image = Image.fromarray(np.asarray(image))
+    small = np.asarray(image.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR), dtype=np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(a, b):
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count('1')